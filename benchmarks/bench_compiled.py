@@ -0,0 +1,71 @@
+"""
+Compare rendering same template many times with different data:
+jinja2 template rendered to xlsx on every call vs table skeleton compiled once:
+
+    python -m benchmarks.bench_compiled --rows 1000 --renders 20
+"""
+
+import argparse
+import io
+import time
+
+from jinja2 import Template
+
+from jinja2xlsx.api import compile_table, render_template
+
+TABLE_HTML = """<table>
+    <colgroup><col width="200"><col width="100"><col width="100"></colgroup>
+    <thead>
+        <tr><th colspan="3" style="border: 1px solid black; text-align: center">Price list</th></tr>
+        <tr>
+            <th style="border: 1px solid black">Name</th>
+            <th style="border: 1px solid black">Price</th>
+            <th style="border: 1px solid black">Count</th>
+        </tr>
+    </thead>
+    <tbody>
+        {% for name, price, count in rows %}
+        <tr style="height: 20px">
+            <td style="border: 1px solid black">{{ name }}</td>
+            <td style="border: 1px solid black; text-align: right">{{ price }}</td>
+            <td style="border: 1px solid black; text-align: right">{{ count }}</td>
+        </tr>
+        {% endfor %}
+    </tbody>
+</table>"""
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, default=1000)
+    arg_parser.add_argument("--renders", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    template = Template(TABLE_HTML)
+    rows = [(f"Product {index}", index * 10, index) for index in range(args.rows)]
+
+    timings = []
+    for _ in range(args.renders):
+        start = time.perf_counter()
+        render_template(template, {"rows": rows}, io.BytesIO())
+        timings.append(time.perf_counter() - start)
+    print(f"{'template':<12}first: {timings[0]:.3f}s, next: {mean(timings[1:]):.3f}s")
+
+    timings = []
+    compiled_table = None
+    for _ in range(args.renders):
+        start = time.perf_counter()
+        if compiled_table is None:
+            # skeleton is template with single data row
+            compiled_table = compile_table(template.render(rows=rows[:1]))
+        compiled_table.render(rows, io.BytesIO())
+        timings.append(time.perf_counter() - start)
+    print(f"{'compiled':<12}first: {timings[0]:.3f}s, next: {mean(timings[1:]):.3f}s")
+
+
+def mean(timings: list) -> float:
+    return sum(timings) / len(timings) if timings else 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure cold import time of jinja2xlsx via python -X importtime:
+
+    python -m benchmarks.bench_import --repeat 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+STATEMENTS = [
+    "import jinja2xlsx",
+    "from jinja2xlsx import render_xlsx",
+    "from jinja2xlsx.parse import Parser; Parser('<table><tbody></tbody></table>').rows",
+]
+
+
+def import_times(statement: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds per top-level import of statement"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        # nested imports are indented, site is imported on interpreter startup
+        if module.startswith("  ") or module.strip() == "site":
+            continue
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for statement in STATEMENTS:
+        runs: List[Dict[str, int]] = [import_times(statement) for _ in range(args.repeat)]
+        medians = {
+            module: statistics.median(run.get(module, 0) for run in runs) for module in runs[0]
+        }
+        total = sum(medians.values())
+
+        print(f"{statement}: {total / 1000:.1f} ms")
+        for module, time_us in sorted(medians.items(), key=lambda item: -item[1])[: args.top]:
+            print(f"    {module:<30}{time_us / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
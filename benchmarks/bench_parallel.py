@@ -0,0 +1,106 @@
+"""
+Measure how streamed render of single large table scales with number of worker processes,
+speedup is relative to render in current process (workers 0), results are written as json:
+
+    python -m benchmarks.bench_parallel --rows 50000 --workers 0 1 2 4 --output parallel.json
+
+Workers are not started on single cpu (all counts render in current process there),
+so run it on machine with at least as many cpus as max number of workers.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import openpyxl
+
+from jinja2xlsx.api import render_stream
+from jinja2xlsx.config import Config
+
+from benchmarks.bench_pipeline import generate_table_html
+
+
+def measure(html_str: str, config: Config, repeat: int) -> float:
+    """Median seconds of repeat renders"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render_stream(html_str, io.BytesIO(), config=config)
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings), 4)
+
+
+def run(
+    html_str: str, workers: List[int], chunk_rows: int, repeat: int
+) -> Dict[int, Dict[str, float]]:
+    results: Dict[int, Dict[str, float]] = {}
+    for worker_count in workers:
+        config = Config(
+            parser="tokenizer",
+            render_workers=worker_count,
+            render_chunk_rows=chunk_rows,
+            render_workers_min_rows=0,
+        )
+        seconds = measure(html_str, config, repeat)
+        # workers 0 is measured first
+        serial_seconds = results[0]["seconds"] if results else seconds
+        results[worker_count] = {
+            "seconds": seconds,
+            "speedup": round(serial_seconds / seconds, 2),
+        }
+        print(
+            f"workers {worker_count:<5}{seconds:>10.3f}s{results[worker_count]['speedup']:>8.2f}x",
+            file=sys.stderr,
+        )
+    return results
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, default=50_000)
+    arg_parser.add_argument("--columns", type=int, default=10)
+    arg_parser.add_argument("--merge-density", type=float, default=0.05)
+    arg_parser.add_argument("--style-diversity", type=int, default=20)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    arg_parser.add_argument("--chunk-rows", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", help="json file path, results are printed if not set")
+    args = arg_parser.parse_args()
+
+    params = {
+        "rows": args.rows,
+        "columns": args.columns,
+        "merge_density": args.merge_density,
+        "style_diversity": args.style_diversity,
+        "chunk_rows": args.chunk_rows,
+        "repeat": args.repeat,
+    }
+    html_str = generate_table_html(
+        args.rows, args.columns, args.merge_density, args.style_diversity
+    )
+    workers = [0] + sorted(set(args.workers) - {0})
+    report = {
+        "params": params,
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "openpyxl": openpyxl.__version__,
+        "html_bytes": len(html_str.encode()),
+        "workers": run(html_str, workers, args.chunk_rows, args.repeat),
+    }
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report_json)
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare html parser backends on test_data tables scaled up to given number of rows:
+
+    python -m benchmarks.bench_parse --rows 100000
+"""
+
+import argparse
+import time
+from typing import Type
+
+from jinja2xlsx.parse import PARSERS, TableParser
+from jinja2xlsx.testing_utils import read_from_test_dir, scale_table_html
+
+FILES = [
+    "table.html",
+    "table_with_inline_styles.html",
+    "table_with_merged_cells.html",
+    "table_with_th.html",
+]
+
+
+def traverse(parser_cls: Type[TableParser], html_str: str) -> float:
+    """Parse html and touch everything Renderer needs, return seconds spent"""
+    start = time.perf_counter()
+
+    parser = parser_cls(html_str)
+    for column in parser.columns:
+        column.attrs.get("width")
+    for row in parser.rows:
+        row.attrs.get("style")
+        for cell in parser.cells(row):
+            cell.attrs.get("style")
+            cell.attrs.get("colspan")
+            cell.text
+            parser.image(cell)
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    arg_parser.add_argument("--parsers", nargs="+", default=list(PARSERS), choices=list(PARSERS))
+    args = arg_parser.parse_args()
+
+    print(f"{'file':<35}" + "".join(f"{name:>16}" for name in args.parsers))
+    for file_ in FILES:
+        with read_from_test_dir(file_) as f:
+            html_str = scale_table_html(f.read(), args.rows)
+
+        timings = [traverse(PARSERS[name], html_str) for name in args.parsers]
+        print(f"{file_:<35}" + "".join(f"{timing:>15.2f}s" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Measure time and peak memory of every render pipeline stage on synthetic table,
+results are written as json to compare them between releases:
+
+    python -m benchmarks.bench_pipeline --rows 10000 --columns 10 --merge-density 0.05 \
+        --style-diversity 20 --images 10 --output pipeline.json
+"""
+
+import argparse
+import base64
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import openpyxl
+from openpyxl import Workbook
+
+from jinja2xlsx.adjust import Adjuster
+from jinja2xlsx.api import render_stream, render_to
+from jinja2xlsx.config import Config
+from jinja2xlsx.css import parse_declarations
+from jinja2xlsx.image import ImageLoader, find_image_tags
+from jinja2xlsx.layout import RowLayout, TableLayout
+from jinja2xlsx.parse import TableParser, create_parser
+from jinja2xlsx.render import Renderer
+from jinja2xlsx.render import style_row
+from jinja2xlsx.style import Style, StyleCache, Stylist
+from jinja2xlsx.testing_utils import get_test_file_path
+from jinja2xlsx.values import ValueParser
+
+BORDER_STYLES = ["1px solid black", "2px solid black", "3px solid black", "1px dashed black"]
+TEXT_ALIGNS = ["left", "center", "right"]
+
+
+def generate_table_html(
+    rows: int,
+    columns: int,
+    merge_density: float = 0,
+    style_diversity: int = 1,
+    images: int = 0,
+    seed: int = 0,
+) -> str:
+    """
+    Table with int, float and text values,
+    merge_density of cells span 2x2 cells, cells have style_diversity distinct inline styles,
+    images cells (spread evenly over table) have same base64 image
+    """
+    random_ = random.Random(seed)
+    with open(get_test_file_path("image.png"), "rb") as f:
+        image_src = f"data:image/png;base64,{base64.b64encode(f.read()).decode()}"
+    image_step = max(rows * columns // images, 1) if images else 0
+
+    widths = "".join(f'<col width="{80 + index % 5 * 20}">' for index in range(columns))
+    body = []
+    # (row index, col index) of cells covered by spans of previous cells
+    covered: Set[Tuple[int, int]] = set()
+    for row_index in range(rows):
+        row_style = ' style="height: 30px"' if row_index % 10 == 0 else ""
+        cells = []
+        for col_index in range(columns):
+            if (row_index, col_index) in covered:
+                continue
+
+            index = row_index * columns + col_index
+            attrs = f' style="{_cell_style(index % style_diversity)}"'
+            can_span = row_index + 1 < rows and col_index + 1 < columns
+            if can_span and (row_index, col_index + 1) not in covered:
+                if random_.random() < merge_density:
+                    attrs += ' colspan="2" rowspan="2"'
+                    covered.update(
+                        (row_index + row_offset, col_index + col_offset)
+                        for row_offset in (0, 1)
+                        for col_offset in (0, 1)
+                    )
+
+            if image_step and index % image_step == 0 and index // image_step < images:
+                content = f'<img src="{image_src}" width="32" height="32">'
+            else:
+                content = [str(index), f"{index / 7:.2f}", f"Item {index % 100}"][col_index % 3]
+            cells.append(f"<td{attrs}>{content}</td>")
+        body.append(f"<tr{row_style}>{''.join(cells)}</tr>")
+
+    return f"<table><colgroup>{widths}</colgroup><tbody>{''.join(body)}</tbody></table>"
+
+
+def _cell_style(index: int) -> str:
+    """Distinct style per index"""
+    return (
+        f"border: {BORDER_STYLES[index % len(BORDER_STYLES)]}; "
+        f"text-align: {TEXT_ALIGNS[index % len(TEXT_ALIGNS)]}; "
+        f"font-size: {8 + index}px" + ("; font-weight: bold" if index % 2 else "")
+    )
+
+
+def parse(html_str: str, config: Config) -> TableParser:
+    """Parse html and touch everything renderers need"""
+    parser = create_parser(html_str, config)
+    for column in parser.columns:
+        column.attrs.get("width")
+    for row in parser.rows:
+        row.attrs.get("style")
+        for html_cell in parser.cells(row):
+            html_cell.attrs.get("style")
+            html_cell.text
+            parser.image(html_cell)
+    return parser
+
+
+def place_cells(parser: TableParser) -> List[RowLayout]:
+    return list(TableLayout(parser))
+
+
+def parse_values(row_layouts: List[RowLayout], config: Config) -> None:
+    values = ValueParser(config)
+    for row_layout in values.infer(iter(row_layouts)):
+        for placed_cell in row_layout.cells:
+            values.parse(placed_cell.html_cell.text, placed_cell.col_index)
+
+
+def build_styles(row_layouts: List[RowLayout]) -> None:
+    # shared caches are warmed by previous renders, so styles are compiled from scratch
+    parse_declarations.cache_clear()
+    stylist = Stylist(Style(), cache=StyleCache())
+    workbook = Workbook()
+    for row_layout in row_layouts:
+        for _, style in style_row(stylist, row_layout).values():
+            stylist.register_style(workbook, style)
+
+
+def adjust(parser: TableParser, row_layouts: List[RowLayout]) -> None:
+    adjuster = Adjuster(Workbook().active)
+    adjuster.adjust_columns(parser.columns)
+    for row_layout in row_layouts:
+        if row_layout.row is not None:
+            adjuster.adjust_row(row_layout.row_index, row_layout.row)
+
+
+def load_images(parser: TableParser, config: Config) -> None:
+    ImageLoader(config).load(find_image_tags(parser))
+
+
+def render_workbook(html_str: str, config: Config) -> Workbook:
+    return Renderer(create_parser(html_str, config), Stylist(Style()), config)()
+
+
+def measure(stage: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Median seconds of repeat runs, and peak of memory allocated by single traced run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(statistics.median(timings), 4), "peak_bytes": peak}
+
+
+def run(html_str: str, config: Config, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Stages are measured one by one, each stage gets results of previous ones"""
+    parser = parse(html_str, config)
+    row_layouts = place_cells(parser)
+    workbook = render_workbook(html_str, config)
+
+    stages: Dict[str, Callable[[], Any]] = {
+        "parse": lambda: parse(html_str, config),
+        "layout": lambda: place_cells(parser),
+        "values": lambda: parse_values(row_layouts, config),
+        "styles": lambda: build_styles(row_layouts),
+        "adjust": lambda: adjust(parser, row_layouts),
+        "images": lambda: load_images(parser, config),
+        "save": lambda: workbook.save(io.BytesIO()),
+        # whole pipelines from html str to xlsx bytes
+        "render": lambda: render_workbook(html_str, config).save(io.BytesIO()),
+        "render_stream": lambda: render_stream(html_str, io.BytesIO(), config=config),
+        "render_to": lambda: render_to(html_str, io.BytesIO(), config=config),
+    }
+    results = {}
+    for name, stage in stages.items():
+        results[name] = measure(stage, repeat)
+        print(
+            f"{name:<15}{results[name]['seconds']:>10.3f}s"
+            f"{results[name]['peak_bytes'] / 1024 / 1024:>10.1f} MB",
+            file=sys.stderr,
+        )
+    return results
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, default=10_000)
+    arg_parser.add_argument("--columns", type=int, default=10)
+    arg_parser.add_argument("--merge-density", type=float, default=0.05)
+    arg_parser.add_argument("--style-diversity", type=int, default=20)
+    arg_parser.add_argument("--images", type=int, default=10)
+    arg_parser.add_argument("--parser", default="tokenizer")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", help="json file path, results are printed if not set")
+    args = arg_parser.parse_args()
+
+    params = {
+        "rows": args.rows,
+        "columns": args.columns,
+        "merge_density": args.merge_density,
+        "style_diversity": args.style_diversity,
+        "images": args.images,
+        "parser": args.parser,
+        "repeat": args.repeat,
+    }
+    html_str = generate_table_html(
+        args.rows, args.columns, args.merge_density, args.style_diversity, args.images
+    )
+    config = Config(parser=args.parser, parse_img=args.images > 0)
+    report = {
+        "params": params,
+        "python": platform.python_version(),
+        "openpyxl": openpyxl.__version__,
+        "html_bytes": len(html_str.encode()),
+        "stages": run(html_str, config, args.repeat),
+    }
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report_json)
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare styling cells attribute by attribute with styling by interned style array
+on table_with_complex_style.html scaled up to given number of rows:
+
+    python -m benchmarks.bench_style --rows 100000
+"""
+
+import argparse
+import time
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell
+
+from jinja2xlsx.parse import TokenParser
+from jinja2xlsx.style import Style, Stylist, StyleCache
+from jinja2xlsx.testing_utils import read_from_test_dir, scale_table_html
+
+
+def style_by_attributes(cell: Cell, style: Style) -> None:
+    """Every assignment looks style object up in workbook style table"""
+    cell.border = style.border
+    cell.alignment = style.alignment
+    cell.font = style.font
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    args = arg_parser.parse_args()
+
+    with read_from_test_dir("table_with_complex_style.html") as f:
+        parser = TokenParser(scale_table_html(f.read(), args.rows))
+    stylist = Stylist(cache=StyleCache())
+    styles = [
+        stylist.build_style_from_html(cell) for row in parser.rows for cell in parser.cells(row)
+    ]
+
+    for name, style_cell in [
+        ("attributes", style_by_attributes),
+        ("style array", stylist.style_single_cell),
+    ]:
+        sheet = Workbook().active
+        cells = [sheet.cell(index + 1, 1) for index in range(len(styles))]
+
+        start = time.perf_counter()
+        for cell, style in zip(cells, styles):
+            style_cell(cell, style)
+        print(f"{name:<15}{len(cells)} cells: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,51 @@
 # flake8: noqa
-from jinja2xlsx.api import render
-from jinja2xlsx.style import Style
+import importlib
+from typing import Any, TYPE_CHECKING
 
-render_xlsx = render
+if TYPE_CHECKING:
+    from jinja2xlsx.api import (
+        render,
+        render_stream,
+        render_to,
+        render_iter,
+        render_template,
+        compile_table,
+        build_model,
+        render_model,
+    )
+    from jinja2xlsx.aio import render_async
+    from jinja2xlsx.batch import render_batch
+    from jinja2xlsx.model import TableModel
+    from jinja2xlsx.style import Style
+
+    render_xlsx = render
+
+# openpyxl and requests_html are slow to import, so public names are imported on first access
+_LAZY_IMPORTS = {
+    "render": ("jinja2xlsx.api", "render"),
+    "render_xlsx": ("jinja2xlsx.api", "render"),
+    "render_stream": ("jinja2xlsx.api", "render_stream"),
+    "render_to": ("jinja2xlsx.api", "render_to"),
+    "render_iter": ("jinja2xlsx.api", "render_iter"),
+    "render_template": ("jinja2xlsx.api", "render_template"),
+    "compile_table": ("jinja2xlsx.api", "compile_table"),
+    "build_model": ("jinja2xlsx.api", "build_model"),
+    "render_model": ("jinja2xlsx.api", "render_model"),
+    "TableModel": ("jinja2xlsx.model", "TableModel"),
+    "render_async": ("jinja2xlsx.aio", "render_async"),
+    "render_batch": ("jinja2xlsx.batch", "render_batch"),
+    "Style": ("jinja2xlsx.style", "Style"),
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module_name, attr = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
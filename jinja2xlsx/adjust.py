@@ -1,41 +1,56 @@
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Iterable, Optional, TYPE_CHECKING
 
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.dimensions import ColumnDimension
 from openpyxl.worksheet.worksheet import Worksheet
-from requests_html import Element
 
-from jinja2xlsx.style import parse_style_attr
-from jinja2xlsx.utils import (
-    try_extract_pixels,
-    width_pixels_to_xlsx_units,
-    height_pixels_to_xlsx_units,
-)
+from jinja2xlsx.css import parse_declarations, parse_length
+from jinja2xlsx.utils import width_pixels_to_xlsx_units, height_pixels_to_xlsx_units
+
+if TYPE_CHECKING:
+    from requests_html import Element
 
 
 @dataclass
 class Adjuster:
     sheet: Worksheet
 
-    def adjust_columns(self, columns: Iterable[Element]) -> None:
+    def adjust_columns(self, columns: Iterable["Element"]) -> None:
         for index, column in enumerate(columns):
-            col_width_in_pixels = int(column.attrs.get("width", 0))
-            if not col_width_in_pixels:
+            width = column_width(column)
+            if not width:
                 continue
 
             column_dimension: ColumnDimension = self.sheet.column_dimensions[
                 get_column_letter(index + 1)
             ]
-            column_dimension.width = width_pixels_to_xlsx_units(col_width_in_pixels)
+            column_dimension.width = width
 
-    def adjust_rows(self, rows: Iterable[Element]) -> None:
+    def adjust_rows(self, rows: Iterable["Element"]) -> None:
         for index, row in enumerate(rows):
-            # todo there must be a better way
-            style_dict = parse_style_attr(row.attrs.get("style"))
-            height_str = style_dict.get("line-height") or style_dict.get("height") or ""
-            row_height = try_extract_pixels(height_str)
-            if not row_height:
-                continue
+            self.adjust_row(index, row)
+
+    def adjust_row(self, index: int, row: "Element") -> None:
+        height = row_height(row)
+        if not height:
+            return
+
+        self.sheet.row_dimensions[index + 1].height = height
+
+
+def column_width(column: "Element") -> Optional[float]:
+    """Column width in xlsx units from col width attr"""
+    col_width_in_pixels = int(column.attrs.get("width", 0))
+    if not col_width_in_pixels:
+        return None
+    return width_pixels_to_xlsx_units(col_width_in_pixels)
+
 
-            self.sheet.row_dimensions[index + 1].height = height_pixels_to_xlsx_units(row_height)
+def row_height(row: "Element") -> Optional[float]:
+    """Row height in xlsx units from row style"""
+    declarations = parse_declarations(row.attrs.get("style"))
+    height_in_pixels = parse_length(declarations.get("line-height") or declarations.get("height"))
+    if not height_in_pixels:
+        return None
+    return height_pixels_to_xlsx_units(height_in_pixels)
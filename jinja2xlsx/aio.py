@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+from openpyxl import Workbook
+
+from jinja2xlsx.config import Config
+from jinja2xlsx.document import DocumentRenderer
+from jinja2xlsx.image import ImageLoader, find_image_tags
+from jinja2xlsx.parse import TableParser, create_parser
+from jinja2xlsx.render import Renderer
+from jinja2xlsx.style import Style, Stylist
+
+if TYPE_CHECKING:
+    from requests_html import Element
+
+
+async def render_async(
+    html_str: str,
+    output: Union[str, BinaryIO, None] = None,
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+    timeout: Optional[float] = None,
+    executor: Optional[Executor] = None,
+) -> Workbook:
+    """
+    Render html to workbook without blocking event loop:
+    html is parsed, rendered and saved to output (if passed) in executor
+    (default executor of loop if not passed), image urls are downloaded via aiohttp.
+    Render is cancelled with its task, or with asyncio.TimeoutError after timeout seconds:
+    stage already running in executor is finished, but next stages are not started.
+    """
+    return await asyncio.wait_for(
+        AsyncRenderer(
+            html_str, Stylist(default_style or Style()), config or Config(), output, executor
+        )(),
+        timeout,
+    )
+
+
+@dataclass
+class AsyncRenderer:
+    """Runs parse, render and save stages in executor, images are downloaded between them"""
+
+    html_str: str
+    stylist: Stylist
+    config: Config
+    output: Union[str, BinaryIO, None] = None
+    executor: Optional[Executor] = None
+    images: ImageLoader = None  # type: ignore
+
+    def __post_init__(self) -> None:
+        if self.images is None:
+            self.images = ImageLoader(self.config)
+
+    async def __call__(self) -> Workbook:
+        loop = asyncio.get_running_loop()
+
+        parser, image_tags = await loop.run_in_executor(self.executor, self._parse)
+        if image_tags:
+            await self.images.load_async(image_tags, self.executor)
+
+        workbook = await loop.run_in_executor(self.executor, self._render, parser)
+        if self.output is not None:
+            await loop.run_in_executor(self.executor, workbook.save, self.output)
+        return workbook
+
+    def _parse(self) -> Tuple[TableParser, List["Element"]]:
+        """Parse html and find image tags of rendered tables"""
+        parser = create_parser(self.html_str, self.config)
+        # stylesheet is parsed here too, so it is not parsed in event loop
+        self.stylist.stylesheet = parser.stylesheet
+        if not self.config.parse_img:
+            return parser, []
+
+        selector = self.config.table_selector
+        parsers: Sequence[TableParser] = parser.tables(selector) if selector else [parser]
+        return parser, [
+            image_tag for table_parser in parsers for image_tag in find_image_tags(table_parser)
+        ]
+
+    def _render(self, parser: TableParser) -> Workbook:
+        # images are already loaded, so renderers do not download them
+        if self.config.table_selector:
+            return DocumentRenderer(parser, self.stylist, self.config, images=self.images)()
+        return Renderer(parser, self.stylist, self.config, images=self.images)()
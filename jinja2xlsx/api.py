@@ -1,21 +1,226 @@
-from typing import Optional
+from typing import Optional, Union, BinaryIO, Dict, Any, Iterator, Sequence, TYPE_CHECKING
 
 from openpyxl import Workbook
 
+from jinja2xlsx.compiled import CompiledTable, TableCompiler
 from jinja2xlsx.config import Config
-from jinja2xlsx.parse import Parser
+from jinja2xlsx.direct import DirectRenderer
+from jinja2xlsx.document import DocumentRenderer
+from jinja2xlsx.image import ImageLoader
+from jinja2xlsx.model import ModelBuilder, TableModel, write_model
+from jinja2xlsx.observe import RenderObserver
+from jinja2xlsx.parse import create_parser, find_sheet_name, IncrementalParser, TableParser
 from jinja2xlsx.render import Renderer
+from jinja2xlsx.stream import StreamRenderer
 from jinja2xlsx.style import Style, Stylist
+from jinja2xlsx.xlsx_writer import ChunkStream, XlsxWriter
+
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+# bytes of xlsx sent per chunk of streaming http response
+RESPONSE_CHUNK_SIZE = 64 * 1024
 
 
 def render(
     html_str: str,
     default_style: Optional[Style] = None,
     config: Optional[Config] = None,
+    observer: Optional[RenderObserver] = None,
+) -> Workbook:
+    """
+    Render first html table to workbook,
+    or every table matching Config.table_selector to its own sheet.
+    If observer is passed, it receives start and finish events of render stages
+    with durations and stats, e.g. StatsCollector summarizes them.
+    """
+    config = config or Config()
+    parser = create_parser(html_str, config)
+    # stylesheet is parsed by renderer in observed parse stage
+    stylist = Stylist(default_style or Style())
+    if config.table_selector:
+        return DocumentRenderer(parser, stylist, config, observer=observer)()
+    return Renderer(parser, stylist, config, observer=observer)()
+
+
+def render_stream(
+    html_str: str,
+    output: Union[str, BinaryIO, None] = None,
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+) -> Workbook:
+    """
+    Render html to write-only workbook, rows are written as soon as they are parsed.
+    If output (file path or binary stream) is passed, workbook is saved to it.
+    Write-only workbook can be saved only once.
+    """
+    config = config or Config()
+    parser = create_parser(html_str, config)
+    stylist = Stylist(default_style or Style(), stylesheet=parser.stylesheet)
+    if config.table_selector:
+        workbook = DocumentRenderer(parser, stylist, config, stream=True)()
+    else:
+        workbook = StreamRenderer(parser, stylist, config)()
+    if output is not None:
+        workbook.save(output)
+    return workbook
+
+
+def render_to(
+    html_str: str,
+    output: Union[str, BinaryIO],
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+) -> None:
+    """
+    Render html straight to xlsx file path or any binary stream (seekable or not)
+    without openpyxl workbook: zip archive is written while rows are rendered.
+    Result is same as of render, every table matching Config.table_selector is its own sheet.
+    """
+    for _ in _render_rows(html_str, output, default_style, config):
+        pass
+
+
+def render_iter(
+    html_str: str,
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+    chunk_size: int = RESPONSE_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Render html to xlsx byte chunks of at least chunk_size bytes (except last one)
+    for streaming http response: first chunks are sent while rest rows are still rendered.
+
+    >>> xlsx_bytes = b"".join(render_iter("<table><tbody><tr><td>1</td></tr></tbody></table>"))
+    >>> xlsx_bytes[:2]
+    b'PK'
+    """
+    stream = ChunkStream()
+    for _ in _render_rows(html_str, stream, default_style, config):
+        if stream.size >= chunk_size:
+            yield stream.pop()
+    yield stream.pop()
+
+
+def _render_rows(
+    html_str: str,
+    output: Union[str, BinaryIO, ChunkStream],
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+) -> Iterator[int]:
+    """Render html via DirectRenderer, index of each row is yielded after row is written"""
+    config = config or Config()
+    parser = create_parser(html_str, config)
+    stylist = Stylist(default_style or Style(), stylesheet=parser.stylesheet)
+    parsers: Sequence[TableParser] = (
+        parser.tables(config.table_selector) if config.table_selector else [parser]
+    )
+    if not parsers:
+        raise ValueError(f"No tables found by selector: {config.table_selector}")
+
+    writer = XlsxWriter(output, shared_strings=config.shared_strings)
+    images = ImageLoader(config)
+    try:
+        for table_parser in parsers:
+            title = find_sheet_name(table_parser) if config.table_selector else None
+            yield from DirectRenderer(
+                table_parser, stylist, config, writer.sheet(title), images
+            ).rows()
+    except BaseException:
+        # including GeneratorExit, if response chunks are not consumed to the end
+        writer.abort()
+        raise
+    writer.close()
+
+
+def build_model(
+    html_str: str,
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+) -> TableModel:
+    """
+    Build compact table model of first html table: values, style ids and merged ranges
+    without html elements and openpyxl cells, so it can be kept, combined or written later.
+    Config.table_selector is not supported, since model is single table.
+
+    >>> model = build_model("<table><tbody><tr><td>1</td><td>a</td></tr></tbody></table>")
+    >>> model.value(0, 0), model.value(0, 1)
+    (1, 'a')
+    """
+    config = config or Config()
+    if config.table_selector:
+        raise ValueError("Config.table_selector is not supported by build_model")
+
+    parser = create_parser(html_str, config)
+    stylist = Stylist(default_style or Style(), stylesheet=parser.stylesheet)
+    return ModelBuilder(parser, stylist, config, find_sheet_name(parser))()
+
+
+def render_model(
+    models: Union[TableModel, Sequence[TableModel]],
+    output: Union[str, BinaryIO],
+    shared_strings: bool = True,
+) -> None:
+    """
+    Write table models (built from html, db cursor rows or dicts) to xlsx file path
+    or binary stream, every model is its own sheet named by model title
+    """
+    writer = XlsxWriter(output, shared_strings=shared_strings)
+    try:
+        for model in [models] if isinstance(models, TableModel) else models:
+            write_model(model, writer.sheet(model.title))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def render_template(
+    template: "Template",
+    context: Optional[Dict[str, Any]] = None,
+    output: Union[str, BinaryIO, None] = None,
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
 ) -> Workbook:
-    renderer = Renderer(
-        Parser(html_str),
-        Stylist(default_style or Style()),
-        config or Config(),
+    """
+    Render jinja2 template to write-only workbook without intermediate html str:
+    template output chunks are tokenized as soon as they are generated,
+    so rows are written while template is still rendered.
+    Only first table is rendered, Config.parser is ignored.
+    """
+    config = config or Config()
+    if config.table_selector:
+        raise ValueError("Config.table_selector is not supported by render_template")
+
+    parser = IncrementalParser(template.generate(context or {}))
+    renderer = StreamRenderer(
+        parser, Stylist(default_style or Style(), stylesheet=parser.stylesheet), config
+    )
+    workbook = renderer()
+    if output is not None:
+        workbook.save(output)
+    return workbook
+
+
+def compile_table(
+    html_str: str,
+    default_style: Optional[Style] = None,
+    config: Optional[Config] = None,
+) -> CompiledTable:
+    """
+    Compile html table skeleton once to render it many times with different data rows:
+    all rows except last one are static header, last row is template of data row.
+
+    >>> compiled_table = compile_table(
+    ...     "<table><tr><th>Name</th><th>Price</th></tr><tr><td></td><td></td></tr></table>",
+    ...     config=Config(parser="tokenizer"),
+    ... )
+    >>> import io
+    >>> workbook = compiled_table.render([["Tea", 10], ["Coffee", 20]], io.BytesIO())
+    """
+    config = config or Config()
+    parser = create_parser(html_str, config)
+    compiler = TableCompiler(
+        parser, Stylist(default_style or Style(), stylesheet=parser.stylesheet), config
     )
-    return renderer()
+    return compiler()
@@ -0,0 +1,130 @@
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    TYPE_CHECKING,
+)
+
+from jinja2xlsx.config import Config
+
+if TYPE_CHECKING:
+    from jinja2xlsx.style import Style
+
+# html str, or template context if batch has template
+JobSource = Union[str, Dict[str, Any]]
+# source, output file path
+Job = Tuple[JobSource, str]
+
+
+class JobResult(NamedTuple):
+    job_index: int
+    output: str
+    seconds: float
+    # formatted traceback of failed job
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchRenderer:
+    """
+    Renders job sources straight to output files, so workbooks are never sent between processes.
+    Failed job is reported by its result and does not abort other jobs.
+    """
+
+    template_str: Optional[str] = None
+    default_style: Optional["Style"] = None
+    config: Optional[Config] = None
+
+    def __call__(self, index: int, source: JobSource, output: str) -> JobResult:
+        start = time.perf_counter()
+        try:
+            self._render(source, output)
+        except Exception:
+            return JobResult(index, output, time.perf_counter() - start, traceback.format_exc())
+        return JobResult(index, output, time.perf_counter() - start)
+
+    def _render(self, source: JobSource, output: str) -> None:
+        from jinja2xlsx.api import render_stream, render_template
+
+        if self.template_str is None:
+            assert isinstance(source, str), "Html str is expected, since batch has no template"
+            render_stream(source, output, self.default_style, self.config)
+        else:
+            assert isinstance(source, dict), "Template context is expected"
+            render_template(self.template, source, output, self.default_style, self.config)
+
+    @property
+    def template(self) -> Any:
+        # jinja2 templates are not picklable, so template is compiled once per process
+        template = self.__dict__.get("_template")
+        if template is None:
+            from jinja2 import Template
+
+            assert self.template_str is not None
+            template = self.__dict__["_template"] = Template(self.template_str)
+        return template
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {key: value for key, value in self.__dict__.items() if key != "_template"}
+
+
+def render_batch(
+    jobs: Iterable[Job],
+    template_str: Optional[str] = None,
+    default_style: Optional["Style"] = None,
+    config: Optional[Config] = None,
+    workers: Optional[int] = None,
+) -> Iterator[JobResult]:
+    """
+    Render jobs of (html str or template context, output file path) over process pool,
+    results are yielded as jobs are done. workers=0 renders jobs in current process.
+    Only a few jobs per worker are submitted at once, so jobs can be generated lazily.
+    Job which can not be sent to worker (e.g. not picklable context) or which worker died on
+    is failed job too.
+    """
+    renderer = BatchRenderer(template_str, default_style, config)
+    if workers == 0:
+        for index, (source, output) in enumerate(jobs):
+            yield renderer(index, source, output)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        # job index and output of submitted jobs
+        pending: Dict[Future, Tuple[int, str]] = {}
+        for index, (source, output) in enumerate(jobs):
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _job_result(future, *pending.pop(future))
+            try:
+                pending[executor.submit(renderer, index, source, output)] = (index, output)
+            except Exception:
+                # pool is broken by worker process which died on previous job
+                yield JobResult(index, output, 0.0, traceback.format_exc())
+
+        for future in as_completed(pending):
+            yield _job_result(future, *pending[future])
+
+
+def _job_result(future: Future, index: int, output: str) -> JobResult:
+    """Result of job done by worker, errors of sending job to worker or of worker process too"""
+    try:
+        return future.result()
+    except Exception:
+        # job is not rendered, so it has no duration
+        return JobResult(index, output, 0.0, traceback.format_exc())
@@ -0,0 +1,212 @@
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    BinaryIO,
+)
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+from jinja2xlsx.adjust import column_width, row_height
+from jinja2xlsx.config import Config
+from jinja2xlsx.image import ImageLoader
+from jinja2xlsx.layout import TableLayout
+from jinja2xlsx.parse import TableParser
+from jinja2xlsx.render import CellSpec, merged_range_str, render_row, style_row
+from jinja2xlsx.style import Style, Stylist
+from jinja2xlsx.utils import create_cell_coordinate, create_cell_range_str
+from jinja2xlsx.values import ValueParser
+from jinja2xlsx.workbook import MediaWorkbook
+
+
+class BodyCell(NamedTuple):
+    # index of value in data row, None for cells inside merged ranges
+    value_index: Optional[int]
+    style: Style
+
+
+@dataclass
+class CompiledTable:
+    """
+    Table skeleton compiled once and rendered many times with different data rows:
+    all html rows except last one are static header, last html row is template of data row.
+    Layout, merged ranges, column widths, row heights and styles are computed on compile,
+    so render only creates cells of data rows and writes them to write-only workbook.
+    """
+
+    stylist: Stylist
+    config: Config
+    header: List[List[Optional[CellSpec]]]
+    header_heights: List[Optional[float]]
+    header_merged_ranges: List[str]
+    body: List[Optional[BodyCell]]
+    body_height: Optional[float]
+    # (col index, colspan) of merged cells of data row
+    body_merges: List[Tuple[int, int]]
+    # column letter => width
+    column_widths: Dict[str, float]
+    # header images are loaded once for all renders
+    images: ImageLoader = field(repr=False)
+
+    def render(
+        self, rows: Iterable[Sequence[Any]], output: Union[str, BinaryIO, None] = None
+    ) -> Workbook:
+        """
+        Render data rows: values of row fill cells of data row template in document order.
+        If output (file path or binary stream) is passed, workbook is saved to it.
+        """
+        workbook = MediaWorkbook(write_only=True, use_shared_strings=self.config.shared_strings)
+        sheet = workbook.create_sheet()
+
+        for column_letter, width in self.column_widths.items():
+            sheet.column_dimensions[column_letter].width = width
+        for cell_range_str in self.header_merged_ranges:
+            sheet.merged_cells.add(cell_range_str)
+
+        for row_index, (header_row, height) in enumerate(zip(self.header, self.header_heights)):
+            if height:
+                sheet.row_dimensions[row_index + 1].height = height
+            sheet.append(
+                [
+                    self._create_header_cell(sheet, header_cell, row_index, col_index)
+                    for col_index, header_cell in enumerate(header_row)
+                ]
+            )
+
+        # style arrays are not changed after write-only cell is written, so they are shared
+        body = [
+            (
+                (body_cell.value_index, self.stylist.register_style(workbook, body_cell.style))
+                if body_cell
+                else None
+            )
+            for body_cell in self.body
+        ]
+        for row_index, values in enumerate(rows, len(self.header)):
+            if self.body_height:
+                sheet.row_dimensions[row_index + 1].height = self.body_height
+            for col_index, colspan in self.body_merges:
+                sheet.merged_cells.add(create_cell_range_str(col_index, colspan, row_index, 1))
+
+            row: List[Optional[Cell]] = []
+            for body_cell in body:
+                if body_cell is None:
+                    row.append(None)
+                    continue
+
+                value_index, style_array = body_cell
+                cell = WriteOnlyCell(sheet)
+                if value_index is not None and value_index < len(values):
+                    cell.value = values[value_index]
+                cell._style = style_array
+                row.append(cell)
+            sheet.append(row)
+
+        if output is not None:
+            workbook.save(output)
+        return workbook
+
+    def _create_header_cell(
+        self,
+        sheet: WriteOnlyWorksheet,
+        header_cell: Optional[CellSpec],
+        row_index: int,
+        col_index: int,
+    ) -> Optional[Cell]:
+        if header_cell is None:
+            return None
+
+        cell = WriteOnlyCell(sheet, header_cell.value)
+        if header_cell.image_tag:
+            image = self.images.image(header_cell.image_tag)
+            sheet.add_image(image, create_cell_coordinate(col_index, row_index))
+        self.stylist.style_single_cell(cell, header_cell.style)
+        if header_cell.number_format:
+            cell.number_format = header_cell.number_format
+        return cell
+
+
+@dataclass
+class TableCompiler:
+    """Compiles html table skeleton to CompiledTable"""
+
+    parser: TableParser
+    stylist: Stylist
+    config: Config
+
+    def __call__(self) -> CompiledTable:
+        row_layouts = list(TableLayout(self.parser))
+        if not row_layouts or row_layouts[-1].row is None:
+            raise ValueError("Last table row should be template of data row")
+
+        *header_layouts, body_layout = row_layouts
+        if body_layout.spans or any(placed_cell.rowspan > 1 for placed_cell in body_layout.cells):
+            raise ValueError("Rowspans should not cross template of data row")
+
+        images = ImageLoader(self.config)
+        # header cells are few, so they are converted without picking column converters
+        values = ValueParser(self.config)
+        header = [
+            render_row(self.parser, self.stylist, self.config, values, row_layout)
+            for row_layout in header_layouts
+        ]
+        header_merged_ranges = [
+            merged_range_str(header_cell.merged_range)
+            for header_row_cells in header
+            for header_cell in header_row_cells
+            if header_cell and header_cell.merged_range
+        ]
+
+        images.load(
+            header_cell.image_tag
+            for header_row_cells in header
+            for header_cell in header_row_cells
+            if header_cell and header_cell.image_tag
+        )
+
+        body: Dict[int, BodyCell] = {}
+        for col_index, (placed_cell, style) in style_row(self.stylist, body_layout).items():
+            value_index = body_layout.cells.index(placed_cell) if placed_cell else None
+            body[col_index] = BodyCell(value_index, style)
+
+        column_widths = {}
+        for index, column in enumerate(self.parser.columns):
+            width = column_width(column)
+            if width:
+                column_widths[get_column_letter(index + 1)] = width
+
+        return CompiledTable(
+            stylist=self.stylist,
+            config=self.config,
+            header=header,
+            header_heights=[
+                row_height(row_layout.row) if row_layout.row is not None else None
+                for row_layout in header_layouts
+            ],
+            header_merged_ranges=header_merged_ranges,
+            body=_to_list(body),
+            body_height=row_height(body_layout.row),
+            body_merges=[
+                (placed_cell.col_index, placed_cell.colspan)
+                for placed_cell in body_layout.cells
+                if placed_cell.is_merged
+            ],
+            column_widths=column_widths,
+            images=images,
+        )
+
+
+def _to_list(cells: Dict[int, Any]) -> List[Any]:
+    if not cells:
+        return []
+    return [cells.get(index) for index in range(max(cells) + 1)]
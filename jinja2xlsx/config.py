@@ -14,3 +14,34 @@ class Config:
     parse_img_url: bool = False
     # required for relative image url like /img/cat.jpg
     base_url: Optional[str] = None
+    # max number of concurrent image downloads
+    image_workers: int = 8
+    # image download timeout in seconds
+    image_timeout: float = 30
+    # directory of downloaded images cache shared by renders, cache is disabled if not set
+    image_cache_dir: Optional[str] = None
+    # max total size of image cache in bytes, least recently used images are removed first
+    image_cache_max_size: int = 100 * 1024 * 1024
+    # downscale and recompress images to width / height of img (requires pil extra)
+    image_resize: bool = False
+    # render every table matching selector (like "table" or "table.report") to its own sheet,
+    # sheet is named by data-sheet-name attr or caption of table; only first table is rendered if not set
+    table_selector: Optional[str] = None
+    # html parser backend: requests_html or tokenizer (single-pass stdlib html.parser)
+    parser: str = "requests_html"
+    # number of worker processes computing values and styles of row chunks of streamed table,
+    # rows are rendered in current process if not set (requires tokenizer parser)
+    render_workers: int = 0
+    # min number of rows per chunk, chunks are split only where no rowspan crosses them
+    render_chunk_rows: int = 2000
+    # tables with fewer rows (and all tables on single cpu) are rendered in current process,
+    # since starting workers and pickling chunks costs more than they save
+    render_workers_min_rows: int = 10000
+    # convert cell texts to numbers, percents and dates with matching number formats
+    # (like "1 234,50 ₽", "12%", "31.01.2020"), converter of each column is picked by first rows
+    infer_types: bool = False
+    # decimal separator of numbers for infer_types, thousands separator is space or "," / "."
+    decimal_separator: str = "."
+    # write strings to shared string table, so repeated strings are stored once in file and memory,
+    # disable for huge streamed tables of unique strings, since table is kept until workbook is saved
+    shared_strings: bool = True
@@ -0,0 +1,554 @@
+import re
+import sys
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# property => value of style attr, shorthands are expanded to longhands
+Declarations = Mapping[str, str]
+
+# declarations are split by ";" and value tokens by whitespace outside of quotes and parentheses,
+# so values like url(http://...) or "Times New Roman" are kept whole
+_DECLARATION_RE = re.compile(r"""(?:[^;"'(]|"[^"]*"|'[^']*'|\([^)]*\))+""")
+_TOKEN_RE = re.compile(r"""(?:[^\s"'(]|"[^"]*"|'[^']*'|\([^)]*\))+""")
+_LENGTH_RE = re.compile(r"([-+]?(?:\d+(?:\.\d*)?|\.\d+))(px|pt|pc|r?em|in|cm|mm)?")
+_IMPORTANT_RE = re.compile(r"\s*!\s*important\s*$", re.I)
+_HEX_COLOR_RE = re.compile(r"#([0-9a-f]{3}|[0-9a-f]{6})")
+_RGB_COLOR_RE = re.compile(r"rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*[\d.]+\s*)?\)")
+
+# em and rem are relative to default font size of 16px
+PIXELS_PER_UNIT = {
+    "px": 1.0,
+    "pt": 4 / 3,
+    "pc": 16.0,
+    "em": 16.0,
+    "rem": 16.0,
+    "in": 96.0,
+    "cm": 96 / 2.54,
+    "mm": 96 / 25.4,
+}
+# values of any property, which are not supported, since cell has no parent to inherit from
+CSS_WIDE_KEYWORDS = frozenset(["inherit", "initial", "unset", "revert"])
+BOX_SIDES = ("top", "right", "bottom", "left")
+BORDER_STYLES = frozenset(
+    "none hidden solid dashed dotted double groove ridge inset outset".split()
+)
+BORDER_WIDTHS = frozenset(["thin", "medium", "thick"])
+FONT_STYLES = frozenset(["normal", "italic", "oblique"])
+FONT_WEIGHTS = frozenset(
+    ["bold", "bolder", "lighter"] + [f"{weight}00" for weight in range(1, 10)]
+)
+# css named colors
+NAMED_COLORS = {
+    "aliceblue": "F0F8FF",
+    "antiquewhite": "FAEBD7",
+    "aqua": "00FFFF",
+    "aquamarine": "7FFFD4",
+    "azure": "F0FFFF",
+    "beige": "F5F5DC",
+    "bisque": "FFE4C4",
+    "black": "000000",
+    "blanchedalmond": "FFEBCD",
+    "blue": "0000FF",
+    "blueviolet": "8A2BE2",
+    "brown": "A52A2A",
+    "burlywood": "DEB887",
+    "cadetblue": "5F9EA0",
+    "chartreuse": "7FFF00",
+    "chocolate": "D2691E",
+    "coral": "FF7F50",
+    "cornflowerblue": "6495ED",
+    "cornsilk": "FFF8DC",
+    "crimson": "DC143C",
+    "cyan": "00FFFF",
+    "darkblue": "00008B",
+    "darkcyan": "008B8B",
+    "darkgoldenrod": "B8860B",
+    "darkgray": "A9A9A9",
+    "darkgreen": "006400",
+    "darkgrey": "A9A9A9",
+    "darkkhaki": "BDB76B",
+    "darkmagenta": "8B008B",
+    "darkolivegreen": "556B2F",
+    "darkorange": "FF8C00",
+    "darkorchid": "9932CC",
+    "darkred": "8B0000",
+    "darksalmon": "E9967A",
+    "darkseagreen": "8FBC8F",
+    "darkslateblue": "483D8B",
+    "darkslategray": "2F4F4F",
+    "darkslategrey": "2F4F4F",
+    "darkturquoise": "00CED1",
+    "darkviolet": "9400D3",
+    "deeppink": "FF1493",
+    "deepskyblue": "00BFFF",
+    "dimgray": "696969",
+    "dimgrey": "696969",
+    "dodgerblue": "1E90FF",
+    "firebrick": "B22222",
+    "floralwhite": "FFFAF0",
+    "forestgreen": "228B22",
+    "fuchsia": "FF00FF",
+    "gainsboro": "DCDCDC",
+    "ghostwhite": "F8F8FF",
+    "gold": "FFD700",
+    "goldenrod": "DAA520",
+    "gray": "808080",
+    "green": "008000",
+    "greenyellow": "ADFF2F",
+    "grey": "808080",
+    "honeydew": "F0FFF0",
+    "hotpink": "FF69B4",
+    "indianred": "CD5C5C",
+    "indigo": "4B0082",
+    "ivory": "FFFFF0",
+    "khaki": "F0E68C",
+    "lavender": "E6E6FA",
+    "lavenderblush": "FFF0F5",
+    "lawngreen": "7CFC00",
+    "lemonchiffon": "FFFACD",
+    "lightblue": "ADD8E6",
+    "lightcoral": "F08080",
+    "lightcyan": "E0FFFF",
+    "lightgoldenrodyellow": "FAFAD2",
+    "lightgray": "D3D3D3",
+    "lightgreen": "90EE90",
+    "lightgrey": "D3D3D3",
+    "lightpink": "FFB6C1",
+    "lightsalmon": "FFA07A",
+    "lightseagreen": "20B2AA",
+    "lightskyblue": "87CEFA",
+    "lightslategray": "778899",
+    "lightslategrey": "778899",
+    "lightsteelblue": "B0C4DE",
+    "lightyellow": "FFFFE0",
+    "lime": "00FF00",
+    "limegreen": "32CD32",
+    "linen": "FAF0E6",
+    "magenta": "FF00FF",
+    "maroon": "800000",
+    "mediumaquamarine": "66CDAA",
+    "mediumblue": "0000CD",
+    "mediumorchid": "BA55D3",
+    "mediumpurple": "9370DB",
+    "mediumseagreen": "3CB371",
+    "mediumslateblue": "7B68EE",
+    "mediumspringgreen": "00FA9A",
+    "mediumturquoise": "48D1CC",
+    "mediumvioletred": "C71585",
+    "midnightblue": "191970",
+    "mintcream": "F5FFFA",
+    "mistyrose": "FFE4E1",
+    "moccasin": "FFE4B5",
+    "navajowhite": "FFDEAD",
+    "navy": "000080",
+    "oldlace": "FDF5E6",
+    "olive": "808000",
+    "olivedrab": "6B8E23",
+    "orange": "FFA500",
+    "orangered": "FF4500",
+    "orchid": "DA70D6",
+    "palegoldenrod": "EEE8AA",
+    "palegreen": "98FB98",
+    "paleturquoise": "AFEEEE",
+    "palevioletred": "DB7093",
+    "papayawhip": "FFEFD5",
+    "peachpuff": "FFDAB9",
+    "peru": "CD853F",
+    "pink": "FFC0CB",
+    "plum": "DDA0DD",
+    "powderblue": "B0E0E6",
+    "purple": "800080",
+    "rebeccapurple": "663399",
+    "red": "FF0000",
+    "rosybrown": "BC8F8F",
+    "royalblue": "4169E1",
+    "saddlebrown": "8B4513",
+    "salmon": "FA8072",
+    "sandybrown": "F4A460",
+    "seagreen": "2E8B57",
+    "seashell": "FFF5EE",
+    "sienna": "A0522D",
+    "silver": "C0C0C0",
+    "skyblue": "87CEEB",
+    "slateblue": "6A5ACD",
+    "slategray": "708090",
+    "slategrey": "708090",
+    "snow": "FFFAFA",
+    "springgreen": "00FF7F",
+    "steelblue": "4682B4",
+    "tan": "D2B48C",
+    "teal": "008080",
+    "thistle": "D8BFD8",
+    "tomato": "FF6347",
+    "turquoise": "40E0D0",
+    "violet": "EE82EE",
+    "wheat": "F5DEB3",
+    "white": "FFFFFF",
+    "whitesmoke": "F5F5F5",
+    "yellow": "FFFF00",
+    "yellowgreen": "9ACD32",
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_declarations(style_attr: Optional[str]) -> Declarations:
+    """
+    Declarations of style attr, each distinct style attr is parsed once.
+    Result is shared by callers, so it should not be mutated.
+    Like browsers do, declarations with unsupported values are skipped, !important is ignored.
+
+    >>> parse_declarations("border: 1px solid black; border-bottom: 0; background: url(http://a/b.png)")
+    ... # doctest: +NORMALIZE_WHITESPACE
+    {'border-top-width': '1px', 'border-top-style': 'solid', 'border-top-color': 'black',
+     'border-right-width': '1px', 'border-right-style': 'solid', 'border-right-color': 'black',
+     'border-bottom-width': '0', 'border-bottom-style': 'none', 'border-bottom-color': 'currentcolor',
+     'border-left-width': '1px', 'border-left-style': 'solid', 'border-left-color': 'black',
+     'background': 'url(http://a/b.png)'}
+    >>> parse_declarations("font: italic bold 12px/30px 'Times New Roman', serif")
+    ... # doctest: +NORMALIZE_WHITESPACE
+    {'font-style': 'italic', 'font-weight': 'bold', 'font-size': '12px', 'line-height': '30px',
+     'font-family': "'Times New Roman', serif"}
+    >>> parse_declarations("font: inherit; color: red !important; border: 1px wavy black")
+    {'color': 'red'}
+    >>> parse_declarations(None)
+    {}
+    >>> parse_declarations("border")
+    Traceback (most recent call last):
+    ...
+    ValueError: Failed to parse style: border
+    """
+    declarations: Dict[str, str] = {}
+    if not style_attr:
+        return declarations
+
+    for declaration in _DECLARATION_RE.findall(style_attr):
+        if not declaration.strip():
+            continue
+        name, colon, value = declaration.partition(":")
+        name, value = sys.intern(name.strip().lower()), _IMPORTANT_RE.sub("", value).strip()
+        if not colon or not name:
+            raise ValueError(f"Failed to parse style: {style_attr}")
+        if value.lower() in CSS_WIDE_KEYWORDS:
+            continue
+
+        expand = SHORTHANDS.get(name)
+        if expand is None:
+            declarations[name] = value
+            continue
+        try:
+            declarations.update(expand(name, value))
+        except ValueError:
+            # shorthand of unsupported value is skipped as whole
+            continue
+    return declarations
+
+
+def parse_length(value: Optional[str]) -> Optional[float]:
+    """
+    Length in pixels, None if value is not a length
+
+    >>> parse_length("100px"), parse_length("12pt"), parse_length("1.5em"), parse_length("0")
+    (100.0, 16.0, 24.0, 0.0)
+    >>> parse_length("1rem"), parse_length("1in")
+    (16.0, 96.0)
+    >>> parse_length("1.5") is None, parse_length("50%") is None, parse_length(None) is None
+    (True, True, True)
+    """
+    if not value:
+        return None
+    match = _LENGTH_RE.fullmatch(value.strip().lower())
+    if not match:
+        return None
+
+    number, unit = float(match[1]), match[2]
+    if unit is None:
+        # only zero length can be unitless
+        return 0.0 if number == 0 else None
+    return number * PIXELS_PER_UNIT[unit]
+
+
+def parse_color(value: Optional[str]) -> Optional[str]:
+    """
+    Color as RRGGBB hex, None if value is not a color
+
+    >>> parse_color("#f00"), parse_color("#00FF00"), parse_color("rgb(0, 0, 255)"), parse_color("navy")
+    ('FF0000', '00FF00', '0000FF', '000080')
+    >>> parse_color("1px") is None
+    True
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value]
+    hex_match = _HEX_COLOR_RE.fullmatch(value)
+    if hex_match:
+        digits = hex_match[1]
+        if len(digits) == 3:
+            digits = "".join(digit * 2 for digit in digits)
+        return digits.upper()
+    rgb_match = _RGB_COLOR_RE.fullmatch(value)
+    if rgb_match:
+        return "".join(f"{min(int(channel), 255):02X}" for channel in rgb_match.groups())
+    return None
+
+
+def _expand_box(name: str, value: str) -> Dict[str, str]:
+    """
+    Box shorthand of 1-4 values to top, right, bottom and left longhands
+
+    >>> _expand_box("padding", "1px 2px")
+    {'padding-top': '1px', 'padding-right': '2px', 'padding-bottom': '1px', 'padding-left': '2px'}
+    """
+    values = _TOKEN_RE.findall(value)
+    if not 1 <= len(values) <= 4:
+        raise ValueError(f"Unsupported {name} value: {value}")
+
+    top, right, bottom, left = {
+        1: lambda: values * 4,
+        2: lambda: values * 2,
+        3: lambda: [*values, values[1]],
+        4: lambda: values,
+    }[len(values)]()
+    # border-width => border-top-width, padding => padding-top
+    prefix, _, suffix = name.partition("-")
+    return {
+        f"{prefix}-{side}{'-' if suffix else ''}{suffix}": side_value
+        for side, side_value in zip(BOX_SIDES, (top, right, bottom, left))
+    }
+
+
+def _expand_border(name: str, value: str) -> Dict[str, str]:
+    """
+    Border shorthand to width, style and color longhands of its sides,
+    not set parts are reset to initial values like css does
+
+    >>> parse_declarations("border-left: 1px solid lightgray")["border-left-color"]
+    'lightgray'
+    >>> _expand_border("border", "1px wavy black")
+    Traceback (most recent call last):
+    ...
+    ValueError: Unsupported border value: 1px wavy black
+    """
+    styles: List[str] = []
+    widths: List[str] = []
+    colors: List[str] = []
+    for token in _TOKEN_RE.findall(value.lower()):
+        if token in BORDER_STYLES:
+            styles.append(token)
+        elif token in BORDER_WIDTHS or parse_length(token) is not None:
+            widths.append(token)
+        else:
+            # any other token is color, colors unknown to parse_color fall back to default one
+            colors.append(token)
+    if len(styles) > 1 or len(widths) > 1 or len(colors) > 1:
+        raise ValueError(f"Unsupported {name} value: {value}")
+    width = widths[0] if widths else "medium"
+    style = styles[0] if styles else "none"
+    color = colors[0] if colors else "currentcolor"
+
+    sides: Sequence[str] = BOX_SIDES if name == "border" else [name.split("-")[1]]
+    declarations = {}
+    for side in sides:
+        declarations[f"border-{side}-width"] = width
+        declarations[f"border-{side}-style"] = style
+        declarations[f"border-{side}-color"] = color
+    return declarations
+
+
+def _expand_font(name: str, value: str) -> Dict[str, str]:
+    """Font shorthand: [style] [weight] size[/line-height] family"""
+    tokens: List[str] = _TOKEN_RE.findall(value)
+    declarations = {}
+    for index, token in enumerate(tokens):
+        size, _, line_height = token.partition("/")
+        if parse_length(size) is not None:
+            declarations["font-size"] = size
+            if line_height:
+                declarations["line-height"] = line_height
+            family = " ".join(tokens[index + 1 :])  # noqa: E203
+            if family:
+                declarations["font-family"] = family
+            return declarations
+
+        if token.lower() in FONT_STYLES:
+            declarations.setdefault("font-style", token.lower())
+        elif token.lower() in FONT_WEIGHTS:
+            declarations["font-weight"] = token.lower()
+        elif token.lower() != "small-caps":
+            break
+    raise ValueError(f"Unsupported {name} value: {value}")
+
+
+SHORTHANDS = {
+    "border": _expand_border,
+    **{f"border-{side}": _expand_border for side in BOX_SIDES},
+    "border-width": _expand_box,
+    "border-style": _expand_box,
+    "border-color": _expand_box,
+    "padding": _expand_box,
+    "font": _expand_font,
+}
+
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+# at-rules (@media, @font-face, @import) are not applied, including rules nested in them
+_AT_RULE_RE = re.compile(r"@[^{;]*(?:;|\{(?:[^{}]*\{[^{}]*\})*[^{}]*\})")
+_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_SELECTOR_RE = re.compile(
+    r"(?P<tag>[a-z][a-z0-9]*|\*)?(?P<classes>(?:\.[-\w]+)*)(?::nth-child\((?P<nth>[^)]*)\))?"
+)
+_NTH_RE = re.compile(r"([+-]?\d*)n(?:([+-])(\d+))?")
+
+# (tag, classes, column) of cell, column is 1-based sheet column
+StyleKey = Tuple[str, FrozenSet[str], int]
+
+
+class StyleRule(NamedTuple):
+    """Rule of simple selector: tag (None for any), classes and nth-child(an+b) column"""
+
+    tag: Optional[str]
+    classes: FrozenSet[str]
+    # (a, b) of nth-child(an+b)
+    nth_child: Optional[Tuple[int, int]]
+    declarations: str
+
+    @property
+    def specificity(self) -> Tuple[int, int]:
+        return len(self.classes) + (self.nth_child is not None), self.tag is not None
+
+    def matches(self, tag: str, classes: FrozenSet[str], column: int) -> bool:
+        if self.tag is not None and self.tag != tag:
+            return False
+        if not self.classes <= classes:
+            return False
+        if self.nth_child is None:
+            return True
+
+        a, b = self.nth_child
+        if a == 0:
+            return column == b
+        return (column - b) % a == 0 and (column - b) // a >= 0
+
+
+class StyleSheet:
+    """
+    Rules of document <style> blocks, css text of rules matching cell is resolved once
+    per distinct (tag, classes, column) of cells, so cells are styled by index lookup.
+    nth-child matches sheet column of cell (first one for colspan cell).
+
+    >>> stylesheet = parse_stylesheet("td { border: 1px solid black } .total { font-weight: bold }")
+    >>> stylesheet.resolve("td", frozenset(["total"]), 1)
+    'border: 1px solid black;font-weight: bold'
+    >>> stylesheet.resolve("th", frozenset(), 1)
+    ''
+    """
+
+    def __init__(self, rules: Sequence[StyleRule]) -> None:
+        # stable sort keeps document order of rules with same specificity
+        self.rules = sorted(rules, key=lambda rule: rule.specificity)
+        self.by_column = any(rule.nth_child is not None for rule in rules)
+        self._index: Dict[StyleKey, str] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # index is filled by cells of every process on its own
+        return {"rules": self.rules, "by_column": self.by_column, "_index": {}}
+
+    def resolve(self, tag: str, classes: FrozenSet[str], column: int) -> str:
+        """Css text of rules matching cell in cascade order, later declarations win"""
+        key = (tag, classes, column if self.by_column else 0)
+        css_text = self._index.get(key)
+        if css_text is None:
+            css_text = self._index[key] = ";".join(
+                rule.declarations for rule in self.rules if rule.matches(tag, classes, column)
+            )
+        return css_text
+
+    def cascade(self, tag: str, class_attr: Any, column: int, style_attr: Optional[str]) -> str:
+        """
+        Style attr of cell with rules css text before inline style
+
+        >>> parse_stylesheet("td.total { color: red }").cascade("td", "total", 1, "color: blue")
+        'color: red;color: blue'
+        """
+        css_text = self.resolve(tag, element_classes(class_attr), column)
+        if not style_attr:
+            return css_text
+        return f"{css_text};{style_attr}" if css_text else style_attr
+
+
+@lru_cache(maxsize=128)
+def parse_stylesheet(css_text: str) -> StyleSheet:
+    """
+    Rules of stylesheet, each distinct stylesheet (e.g. of template rendered many times)
+    is parsed once. Rules with unsupported selectors (descendant, #id, attrs) are skipped.
+
+    >>> stylesheet = parse_stylesheet('''
+    ...     /* zebra */ td:nth-child(odd), th.total { color: red }
+    ...     table td { color: blue } @media print { td { color: green } }
+    ... ''')
+    >>> [(rule.tag, rule.nth_child) for rule in stylesheet.rules]
+    [('td', (2, 1)), ('th', None)]
+    """
+    css_text = _AT_RULE_RE.sub("", _COMMENT_RE.sub("", css_text))
+    rules = []
+    for selectors, declarations in _RULE_RE.findall(css_text):
+        declarations = declarations.strip().rstrip(";")
+        for selector in selectors.split(","):
+            rule = _parse_selector(selector.strip().lower(), declarations)
+            if rule is not None:
+                rules.append(rule)
+    return StyleSheet(rules)
+
+
+def _parse_selector(selector: str, declarations: str) -> Optional[StyleRule]:
+    match = _SELECTOR_RE.fullmatch(selector)
+    if not selector or not match:
+        return None
+
+    nth_child = None
+    if match["nth"] is not None:
+        nth_child = _parse_nth(match["nth"])
+        if nth_child is None:
+            return None
+
+    tag = match["tag"] if match["tag"] != "*" else None
+    classes = frozenset(filter(None, match["classes"].split(".")))
+    return StyleRule(tag, classes, nth_child, declarations)
+
+
+def _parse_nth(nth: str) -> Optional[Tuple[int, int]]:
+    """
+    >>> _parse_nth("odd"), _parse_nth("even"), _parse_nth("3"), _parse_nth("-n + 3"), _parse_nth("x")
+    ((2, 1), (2, 0), (0, 3), (-1, 3), None)
+    """
+    nth = nth.replace(" ", "")
+    if nth in ("odd", "even"):
+        return 2, int(nth == "odd")
+    if nth.lstrip("+-").isdigit():
+        return 0, int(nth)
+
+    match = _NTH_RE.fullmatch(nth)
+    if not match:
+        return None
+    a = int(match[1]) if match[1] not in ("", "+", "-") else int(f"{match[1]}1")
+    b = int(match[3]) * (-1 if match[2] == "-" else 1) if match[3] else 0
+    return a, b
+
+
+def element_classes(class_attr: Any) -> FrozenSet[str]:
+    """
+    Classes of class attr: str of tokenizer element, tuple of requests_html element
+
+    >>> sorted(element_classes("total  wide")), sorted(element_classes(("total",))), element_classes(None)
+    (['total', 'wide'], ['total'], frozenset())
+    """
+    if not class_attr:
+        return frozenset()
+    if isinstance(class_attr, str):
+        return frozenset(class_attr.split())
+    return frozenset(class_attr)
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+
+from jinja2xlsx.adjust import column_width, row_height
+from jinja2xlsx.config import Config
+from jinja2xlsx.image import ImageLoader
+from jinja2xlsx.parse import TableParser
+from jinja2xlsx.render import CellSpec, merged_range_str, render_rows
+from jinja2xlsx.style import Stylist
+from jinja2xlsx.utils import create_cell_coordinate
+from jinja2xlsx.values import ValueParser
+from jinja2xlsx.xlsx_writer import SheetCell, SheetWriter
+
+
+@dataclass
+class DirectRenderer:
+    """
+    Renders rows straight into worksheet xml via SheetWriter, without openpyxl cell objects:
+    each cell is written as value and style id, style tables are built once per distinct style.
+    """
+
+    parser: TableParser
+    stylist: Stylist
+    config: Config
+    sheet: SheetWriter
+    # shared by sheets of workbook, so images are loaded once
+    images: ImageLoader = None  # type: ignore
+
+    def __call__(self) -> None:
+        for _ in self.rows():
+            pass
+
+    def rows(self) -> Iterator[int]:
+        """Render rows one by one, index of each row is yielded after row is written"""
+        if self.images is None:
+            self.images = ImageLoader(self.config)
+
+        # column widths should be set before first row is written
+        for index, column in enumerate(self.parser.columns):
+            width = column_width(column)
+            if width:
+                self.sheet.set_column_width(index, width)
+
+        values = ValueParser(self.config)
+        for row_layout, cells in render_rows(
+            self.parser, self.stylist, self.config, self.images, values
+        ):
+            height = row_height(row_layout.row) if row_layout.row is not None else None
+            self.sheet.write_row(
+                row_layout.row_index, self._sheet_cells(row_layout.row_index, cells), height
+            )
+            yield row_layout.row_index
+
+    def _sheet_cells(
+        self, row_index: int, cell_specs: Sequence[Optional[CellSpec]]
+    ) -> List[SheetCell]:
+        styles = self.sheet.writer.styles
+        cells: List[SheetCell] = []
+        for col_index, cell_spec in enumerate(cell_specs):
+            if cell_spec is None:
+                cells.append(None)
+                continue
+
+            if cell_spec.image_tag:
+                image = self.images.image(cell_spec.image_tag)
+                self.sheet.add_image(image, create_cell_coordinate(col_index, row_index))
+            if cell_spec.merged_range:
+                self.sheet.merge_cells(merged_range_str(cell_spec.merged_range))
+            cells.append(
+                (cell_spec.value, styles.style_id(cell_spec.style, cell_spec.number_format))
+            )
+        return cells
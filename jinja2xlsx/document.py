@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from openpyxl import Workbook
+
+from jinja2xlsx.config import Config
+from jinja2xlsx.image import ImageLoader, find_image_tags, load_images_stage
+from jinja2xlsx.observe import RenderObserver, observe_stage
+from jinja2xlsx.parse import TableParser, find_sheet_name
+from jinja2xlsx.render import Renderer
+from jinja2xlsx.stream import StreamRenderer
+from jinja2xlsx.style import Stylist
+from jinja2xlsx.utils import create_sheet_title
+from jinja2xlsx.workbook import MediaWorkbook
+
+
+@dataclass
+class DocumentRenderer:
+    """
+    Renders every table matching Config.table_selector to its own sheet of single workbook.
+    Html is parsed once, images of all tables are loaded in single concurrent stage.
+    """
+
+    parser: TableParser
+    stylist: Stylist
+    config: Config
+    # render to write-only workbook via StreamRenderer
+    stream: bool = False
+    # already loaded images of tables, e.g. downloaded by ImageLoader.load_async
+    images: ImageLoader = None  # type: ignore
+    # receives stage events of every sheet, stream rendering is not observed
+    observer: Optional[RenderObserver] = None
+
+    def __call__(self) -> Workbook:
+        assert self.config.table_selector
+        with observe_stage(self.observer, "parse"):
+            parsers: Sequence[TableParser] = self.parser.tables(self.config.table_selector)
+            if self.stylist.stylesheet is None:
+                self.stylist.stylesheet = self.parser.stylesheet
+        if not parsers:
+            raise ValueError(f"No tables found by selector: {self.config.table_selector}")
+
+        images = self.images or ImageLoader(self.config)
+        if self.config.parse_img:
+            load_images_stage(
+                images,
+                (image_tag for parser in parsers for image_tag in find_image_tags(parser)),
+                self.observer,
+            )
+
+        workbook = MediaWorkbook(self.stream, use_shared_strings=self.config.shared_strings)
+        for index, parser in enumerate(parsers):
+            title = create_sheet_title(find_sheet_name(parser) or "") or None
+
+            if self.stream:
+                sheet = workbook.create_sheet(title)
+                StreamRenderer(parser, self.stylist, self.config, workbook, sheet, images)()
+            else:
+                sheet = workbook.active if index == 0 else workbook.create_sheet()
+                if title:
+                    sheet.title = title
+                Renderer(
+                    parser, self.stylist, self.config, workbook, sheet, images, self.observer
+                )()
+
+        return workbook
@@ -1,36 +1,323 @@
 import base64
+import hashlib
 import io
 import re
-from dataclasses import dataclass
-from typing import Optional
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, TYPE_CHECKING, Tuple
 from urllib.parse import urljoin
 
-import requests
 from openpyxl.drawing.image import Image
-from requests_html import Element
 
 from jinja2xlsx.config import Config
+from jinja2xlsx.css import parse_declarations, parse_length
+from jinja2xlsx.image_cache import DiskImageCache
+from jinja2xlsx.observe import RenderObserver, observe_stage
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+    from requests import Session
+    from requests_html import Element
+
+    from jinja2xlsx.parse import TableParser
+
+
+XLSX_IMAGE_FORMATS = ("gif", "jpeg", "png")
+
+# width, height, format
+ImageInfo = Tuple[int, int, str]
+
+
+class ContentImage(Image):
+    """
+    Image of already loaded content: media path is made of content digest,
+    so all anchors of same content share single media part in xlsx (see MediaExcelWriter)
+    """
+
+    def __init__(self, content: bytes, digest: str, width: int, height: int, format: str) -> None:
+        self.ref = content
+        self.digest = digest
+        self.width = width
+        self.height = height
+        self.format = format
+
+    def _data(self) -> bytes:
+        return self.ref
+
+    @property
+    def path(self) -> str:
+        return f"/xl/media/image-{self.digest}.{self.format}"
 
 
 @dataclass
 class ImageParse:
     config: Config
 
-    def __call__(self, image_tag: Element) -> Image:
+    def __call__(self, image_tag: "Element") -> Image:
+        return ImageLoader(self.config).image(image_tag)
+
+
+@dataclass
+class ImageLoader:
+    """
+    Resolves img srcs to image content before cells are filled:
+    urls are downloaded concurrently via pooled session, base64 payloads are decoded.
+    Content is stored by its digest, so repeated srcs are fetched or decoded once
+    and same images from different srcs are kept once.
+    If Config.image_cache_dir is set, downloaded images are reused by next renders.
+    If Config.image_resize is set, images are downscaled to img width / height.
+    """
+
+    config: Config
+    disk_cache: Optional[DiskImageCache] = None
+    # src => content digest
+    _digests: Dict[str, str] = field(default_factory=dict, repr=False)
+    # content digest => content
+    _contents: Dict[str, bytes] = field(default_factory=dict, repr=False)
+    # content digest => width, height, format
+    _infos: Dict[str, ImageInfo] = field(default_factory=dict, repr=False)
+    # (content digest, width, height) => resized content digest
+    _resized: Dict[Tuple[str, int, int], str] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    # downloaded (not cached) urls and their bytes
+    fetched_urls: int = field(default=0, init=False)
+    fetched_bytes: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        if self.disk_cache is None and self.config.image_cache_dir:
+            self.disk_cache = DiskImageCache(
+                self.config.image_cache_dir, self.config.image_cache_max_size
+            )
+
+    def load(self, image_tags: Iterable["Element"]) -> None:
+        urls = self._pending_urls(image_tags)
+        if not urls:
+            return
+
+        with self._create_session() as session, ThreadPoolExecutor(
+            self.config.image_workers
+        ) as executor:
+            contents = executor.map(lambda url: self._fetch(session, url), urls)
+            self._store_downloads(urls, contents)
+
+    async def load_async(
+        self, image_tags: Iterable["Element"], executor: Optional[Executor] = None
+    ) -> None:
+        """
+        Same as load, but urls are downloaded via aiohttp (requires async extra),
+        so event loop is not blocked: base64 decoding and disk cache reads and writes
+        are run in executor (default executor of loop if not passed).
+        Pending downloads are cancelled with caller task.
+        """
+        import asyncio
+
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        urls = await loop.run_in_executor(executor, self._pending_urls, image_tags)
+        if not urls:
+            return
+
+        connector = aiohttp.TCPConnector(limit=self.config.image_workers)
+        timeout = aiohttp.ClientTimeout(total=self.config.image_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            contents = await asyncio.gather(*(self._fetch_async(session, url) for url in urls))
+        await loop.run_in_executor(executor, self._store_downloads, urls, contents)
+
+    def image(self, image_tag: "Element") -> Image:
         src = image_tag.attrs["src"]
+        if src not in self._digests:
+            self.load([image_tag])
+
+        digest = self._digests[src]
+        width, height, _ = self._info(digest)
+        if self.config.image_resize:
+            width, height = _fit_size(width, height, *extract_image_size(image_tag))
+        digest = self._recompress(digest, width, height)
+
+        _, _, format = self._info(digest)
+        return ContentImage(self._contents[digest], digest, width, height, format)
+
+    def resolve_url(self, src: str) -> str:
+        """
+        >>> ImageLoader(Config(base_url="http://localhost:8000")).resolve_url("/img/cat.png")
+        'http://localhost:8000/img/cat.png'
+        >>> ImageLoader(Config()).resolve_url("http://localhost:8000/img/cat.png")
+        'http://localhost:8000/img/cat.png'
+        """
+        if is_url(src):
+            return src
+        if self.config.base_url:
+            return urljoin(self.config.base_url, src)
+        raise ValueError(f"No [Config.base_url] set, so cannot resolve image src: {src}")
+
+    def _info(self, digest: str) -> ImageInfo:
+        info = self._infos.get(digest)
+        if info is None:
+            image = Image(io.BytesIO(self._contents[digest]))
+            info = self._infos[digest] = (image.width, image.height, image.format)
+        return info
 
-        base64 = try_base64(src)
-        if base64:
-            image_stream: io.BytesIO = base64_to_stream(base64)
-        elif is_url(src):
-            image_stream = io.BytesIO(requests.get(src).content)
-        elif self.config.base_url:
-            src = urljoin(self.config.base_url, src)
-            image_stream = io.BytesIO(requests.get(src).content)
-        else:
-            raise ValueError(f"No [Config.base_url] set, so cannot resolve image src: {src}")
-
-        return Image(image_stream)
+    def _recompress(self, digest: str, width: int, height: int) -> str:
+        """
+        Downscale and recompress image once per target size, images are never upscaled.
+        Formats which are not supported by xlsx are converted to png.
+        """
+        original_width, original_height, format = self._info(digest)
+        is_downscaled = width < original_width or height < original_height
+        if not is_downscaled and format in XLSX_IMAGE_FORMATS:
+            return digest
+        width, height = min(width, original_width), min(height, original_height)
+
+        key = (digest, width, height)
+        resized_digest = self._resized.get(key)
+        if resized_digest is None:
+            from PIL import Image as PILImage
+
+            with PILImage.open(io.BytesIO(self._contents[digest])) as image:
+                resized_image: "PILImage.Image" = image
+                if image.size != (width, height):
+                    resized_image = image.resize((width, height), PILImage.Resampling.LANCZOS)
+                stream = io.BytesIO()
+                if format == "jpeg":
+                    resized_image.save(stream, format="jpeg", quality=85, optimize=True)
+                else:
+                    resized_image.save(stream, format="png", optimize=True)
+
+            content = stream.getvalue()
+            resized_digest = self._resized[key] = hashlib.sha1(content).hexdigest()
+            self._contents.setdefault(resized_digest, content)
+            self._infos[resized_digest] = (width, height, "jpeg" if format == "jpeg" else "png")
+        return resized_digest
+
+    def _create_session(self) -> "Session":
+        import requests
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.config.image_workers, pool_maxsize=self.config.image_workers
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _fetch(self, session: "Session", url: str) -> bytes:
+        response = session.get(url, timeout=self.config.image_timeout)
+        response.raise_for_status()
+        return response.content
+
+    async def _fetch_async(self, session: "ClientSession", url: str) -> bytes:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    def _pending_urls(self, image_tags: Iterable["Element"]) -> Dict[str, List[str]]:
+        """
+        Store base64 and cached images of not loaded srcs,
+        rest srcs are returned by resolved url to be downloaded
+        """
+        srcs = {image_tag.attrs["src"] for image_tag in image_tags}
+
+        # resolved url => srcs, so same url written differently is downloaded once
+        urls: Dict[str, List[str]] = {}
+        for src in srcs:
+            if src in self._digests:
+                continue
+
+            base64_str = try_base64(src)
+            if base64_str:
+                self._store(src, base64.b64decode(base64_str))
+            else:
+                urls.setdefault(self.resolve_url(src), []).append(src)
+
+        if self.disk_cache:
+            for url in list(urls):
+                cached_content = self.disk_cache.get(url)
+                if cached_content is not None:
+                    for src in urls.pop(url):
+                        self._store(src, cached_content)
+
+        return urls
+
+    def _store_downloads(self, urls: Dict[str, List[str]], contents: Iterable[bytes]) -> None:
+        for (url, url_srcs), content in zip(urls.items(), contents):
+            self.fetched_urls += 1
+            self.fetched_bytes += len(content)
+            if self.disk_cache:
+                self.disk_cache.put(url, content)
+            for src in url_srcs:
+                self._store(src, content)
+
+        if self.disk_cache:
+            self.disk_cache.evict()
+
+    def _store(self, src: str, content: bytes) -> None:
+        digest = hashlib.sha1(content).hexdigest()
+        with self._lock:
+            self._contents.setdefault(digest, content)
+            self._digests[src] = digest
+
+
+def load_images_stage(
+    images: ImageLoader, image_tags: Iterable["Element"], observer: Optional[RenderObserver]
+) -> None:
+    """Load images as observed render stage with downloaded urls and bytes stats"""
+    with observe_stage(observer, "images") as stats:
+        fetched_urls, fetched_bytes = images.fetched_urls, images.fetched_bytes
+        images.load(image_tags)
+        stats["fetched_urls"] = images.fetched_urls - fetched_urls
+        stats["fetched_bytes"] = images.fetched_bytes - fetched_bytes
+
+
+def find_image_tags(parser: "TableParser") -> Iterator["Element"]:
+    for row in parser.rows:
+        for html_cell in parser.cells(row):
+            image_tag = parser.image(html_cell)
+            if image_tag:
+                yield image_tag
+
+
+def extract_image_size(image_tag: "Element") -> Tuple[Optional[int], Optional[int]]:
+    """
+    Rendered image size in pixels from width / height attrs or style
+
+    >>> from jinja2xlsx.tokenizer import HtmlElement
+    >>> extract_image_size(HtmlElement("img", {"width": "40", "style": "height: 30px"}))
+    (40, 30)
+    >>> extract_image_size(HtmlElement("img", {}))
+    (None, None)
+    """
+    declarations = parse_declarations(image_tag.attrs.get("style"))
+
+    def extract(attr: str) -> Optional[int]:
+        size = image_tag.attrs.get(attr, "").replace("px", "").strip()
+        if size.isdigit():
+            return int(size)
+        pixels = parse_length(declarations.get(attr))
+        return int(pixels) if pixels else None
+
+    return extract("width"), extract("height")
+
+
+def _fit_size(
+    width: int, height: int, target_width: Optional[int], target_height: Optional[int]
+) -> Tuple[int, int]:
+    """
+    Target size, missing dimension is computed with respect to aspect ratio
+
+    >>> _fit_size(200, 100, 40, None)
+    (40, 20)
+    >>> _fit_size(200, 100, None, None)
+    (200, 100)
+    """
+    if target_width and target_height:
+        return target_width, target_height
+    if target_width:
+        return target_width, max(round(height * target_width / width), 1)
+    if target_height:
+        return max(round(width * target_height / height), 1), target_height
+    return width, height
 
 
 def is_url(src: str) -> bool:
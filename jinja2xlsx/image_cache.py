@@ -0,0 +1,87 @@
+import hashlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+TEMP_FILE_PREFIX = ".tmp-"
+
+
+@dataclass
+class DiskImageCache:
+    """
+    Image contents cache in directory, shared by renders and worker processes:
+    entry is file named by url digest, entry access time is kept as file mtime.
+    Entries are written to temp file and renamed, so readers never see partial content.
+    Least recently used entries are removed when total size exceeds max_size (in bytes).
+
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     cache = DiskImageCache(directory, max_size=1024)
+    ...     cache.put("http://localhost/cat.png", b"cat")
+    ...     cache.get("http://localhost/cat.png")
+    b'cat'
+    """
+
+    directory: str
+    max_size: int
+
+    def __post_init__(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, url: str) -> Optional[bytes]:
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            _touch(path)
+        except FileNotFoundError:
+            # entry can be evicted by other process at any moment
+            return None
+        return content
+
+    def put(self, url: str, content: bytes) -> None:
+        fd, temp_path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, self._path(url))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        try:
+            _touch(self._path(url))
+        except FileNotFoundError:
+            # entry can be evicted by other process right after it is written
+            pass
+
+    def evict(self) -> None:
+        """Remove least recently used entries until cache fits max_size"""
+        entries: List[Tuple[int, int, str]] = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(TEMP_FILE_PREFIX) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest())
+
+
+def _touch(path: str) -> None:
+    # explicit timestamp, since file system timestamps are too coarse to order accesses
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
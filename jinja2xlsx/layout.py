@@ -0,0 +1,110 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, NamedTuple, Optional, Any, Sequence
+
+from jinja2xlsx.parse import TableParser
+
+
+class PlacedCell(NamedTuple):
+    html_cell: Any
+    row_index: int
+    col_index: int
+    colspan: int
+    rowspan: int
+
+    @property
+    def is_merged(self) -> bool:
+        return self.colspan > 1 or self.rowspan > 1
+
+    @property
+    def last_row_index(self) -> int:
+        return self.row_index + self.rowspan - 1
+
+    @property
+    def last_col_index(self) -> int:
+        return self.col_index + self.colspan - 1
+
+
+class RowLayout(NamedTuple):
+    row_index: int
+    # None for rows which exist only because of rowspan exceeding table
+    row: Optional[Any]
+    cells: List[PlacedCell]
+    # merged cells from previous rows which cover this row
+    spans: List[PlacedCell]
+
+
+@dataclass
+class OccupancyGrid:
+    """
+    Columns occupied by rowspans from previous rows, stored as bitmap per row:
+    bit N is set if column N is taken. Only rows which are not placed yet are kept.
+
+    >>> grid = OccupancyGrid()
+    >>> grid.start_row(0)
+    >>> grid.place(0, 0, colspan=2, rowspan=2)
+    0
+    >>> grid.start_row(1)
+    >>> grid.place(1, 0, colspan=1, rowspan=1)
+    2
+    """
+
+    _rows: Dict[int, int] = field(default_factory=dict)
+    _current_row: int = 0
+
+    def start_row(self, row_index: int) -> None:
+        self._current_row = self._rows.pop(row_index, 0)
+
+    def place(self, row_index: int, col_index: int, colspan: int, rowspan: int) -> int:
+        """Find first free column starting from col_index and occupy it for next rows"""
+        while self._current_row >> col_index & 1:
+            col_index += 1
+
+        if rowspan > 1:
+            span_mask = ((1 << colspan) - 1) << col_index
+            for next_row_index in range(row_index + 1, row_index + rowspan):
+                self._rows[next_row_index] = self._rows.get(next_row_index, 0) | span_mask
+
+        return col_index
+
+
+@dataclass
+class TableLayout:
+    """
+    Places html cells into sheet grid with respect to rowspan and colspan,
+    without touching worksheet, so it can be used by in-memory and streaming renderers
+    """
+
+    parser: TableParser
+    grid: OccupancyGrid = field(default_factory=OccupancyGrid)
+
+    def __iter__(self) -> Iterator[RowLayout]:
+        spans: List[PlacedCell] = []
+        row_index = -1
+
+        for row_index, row in enumerate(self.parser.rows):
+            spans = [span for span in spans if span.last_row_index >= row_index]
+            cells = self._place_row(row_index, self.parser.cells(row))
+            yield RowLayout(row_index, row, cells, spans)
+            spans += [cell for cell in cells if cell.rowspan > 1]
+
+        # rowspan can exceed table rows
+        while True:
+            row_index += 1
+            spans = [span for span in spans if span.last_row_index >= row_index]
+            if not spans:
+                break
+            yield RowLayout(row_index, None, [], spans)
+
+    def _place_row(self, row_index: int, html_cells: Sequence[Any]) -> List[PlacedCell]:
+        self.grid.start_row(row_index)
+
+        cells = []
+        col_index = 0
+        for html_cell in html_cells:
+            colspan = int(html_cell.attrs.get("colspan", 1))
+            rowspan = int(html_cell.attrs.get("rowspan", 1))
+            col_index = self.grid.place(row_index, col_index, colspan, rowspan)
+            cells.append(PlacedCell(html_cell, row_index, col_index, colspan, rowspan))
+            col_index += colspan
+
+        return cells
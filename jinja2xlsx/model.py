@@ -0,0 +1,262 @@
+from array import array
+from dataclasses import dataclass
+from itertools import chain, repeat
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from openpyxl.cell.cell import TIME_FORMATS
+from openpyxl.drawing.image import Image
+
+from jinja2xlsx.adjust import column_width, row_height
+from jinja2xlsx.config import Config
+from jinja2xlsx.image import ImageLoader
+from jinja2xlsx.parse import TableParser
+from jinja2xlsx.render import MergedRange, merged_range_str, render_rows
+from jinja2xlsx.style import Style, Stylist
+from jinja2xlsx.utils import create_cell_coordinate
+from jinja2xlsx.values import ValueParser
+from jinja2xlsx.xlsx_writer import SheetCell, SheetWriter
+
+# style and number format of cell
+CellStyle = Tuple[Style, Optional[str]]
+# style ids are unsigned 16 bit, xlsx allows up to 64000 cell styles
+STYLE_ID_TYPECODE = "H"
+
+
+class TableModel:
+    """
+    Compact table between producers (html parser, db cursor, list of dicts) and xlsx writers:
+    values are kept in per-column lists, cell styles as ids of distinct styles in per-column arrays,
+    merged ranges as list of intervals. Style id 0 means there is no cell at all.
+
+    >>> from openpyxl.styles import Font
+    >>> model = TableModel("Prices")
+    >>> bold = model.style_id(Style(font=Font(bold=True)))
+    >>> model.append_row(["Tea", 10], bold)
+    0
+    >>> model.append_row(["Coffee", 20, "new"], [bold, bold, model.style_id(Style())])
+    1
+    >>> model.column_count, model.row_count, model.value(1, 2), model.value(0, 2)
+    (3, 2, 'new', None)
+    >>> model.style(0, 2) is None, model.style(0, 0)[0].font.bold
+    (True, True)
+    """
+
+    __slots__ = (
+        "title",
+        "columns",
+        "style_ids",
+        "styles",
+        "merges",
+        "row_heights",
+        "column_widths",
+        "images",
+        "row_count",
+        "_style_index",
+    )
+
+    def __init__(self, title: Optional[str] = None) -> None:
+        self.title = title
+        self.columns: List[List[Any]] = []
+        self.style_ids: List["array[int]"] = []
+        # style of id 0 is placeholder of missing cells
+        self.styles: List[CellStyle] = [(Style(), None)]
+        self.merges: List[MergedRange] = []
+        # in xlsx units by row / column index
+        self.row_heights: Dict[int, float] = {}
+        self.column_widths: Dict[int, float] = {}
+        self.images: Dict[Tuple[int, int], Image] = {}
+        self.row_count = 0
+        self._style_index: Dict[CellStyle, int] = {}
+
+    @property
+    def column_count(self) -> int:
+        return len(self.columns)
+
+    def style_id(self, style: Style, number_format: Optional[str] = None) -> int:
+        """Id of distinct style and number format, added on first use"""
+        key = (style, number_format)
+        style_id = self._style_index.get(key)
+        if style_id is None:
+            self.styles.append(key)
+            style_id = self._style_index[key] = len(self.styles) - 1
+        return style_id
+
+    def append_row(
+        self,
+        values: Sequence[Any],
+        style_ids: Union[int, Sequence[int]],
+        height: Optional[float] = None,
+    ) -> int:
+        """
+        Append row of values with same style id or style id per value, index of row is returned.
+        Columns missing in row are empty, columns missing in previous rows are added empty.
+        """
+        row_index = self.row_count
+        while len(self.columns) < len(values):
+            self.columns.append([None] * row_index)
+            self.style_ids.append(array(STYLE_ID_TYPECODE, bytes(2 * row_index)))
+
+        row_style_ids = repeat(style_ids) if isinstance(style_ids, int) else style_ids
+        for column, column_style_ids, value, style_id in zip(
+            self.columns, self.style_ids, values, row_style_ids
+        ):
+            column.append(value)
+            column_style_ids.append(style_id)
+        for index in range(len(values), len(self.columns)):
+            self.columns[index].append(None)
+            self.style_ids[index].append(0)
+
+        if height:
+            self.row_heights[row_index] = height
+        self.row_count += 1
+        return row_index
+
+    def merge(self, first_row: int, first_col: int, last_row: int, last_col: int) -> None:
+        self.merges.append((first_row, first_col, last_row, last_col))
+
+    def add_image(self, row_index: int, col_index: int, image: Image) -> None:
+        self.images[(row_index, col_index)] = image
+
+    def value(self, row_index: int, col_index: int) -> Any:
+        return self.columns[col_index][row_index] if col_index < len(self.columns) else None
+
+    def style(self, row_index: int, col_index: int) -> Optional[CellStyle]:
+        """Style and number format of cell, None if there is no cell"""
+        if col_index >= len(self.columns):
+            return None
+        style_id = self.style_ids[col_index][row_index]
+        return self.styles[style_id] if style_id else None
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Sequence[Any]],
+        header: Optional[Sequence[str]] = None,
+        title: Optional[str] = None,
+        default_style: Optional[Style] = None,
+    ) -> "TableModel":
+        """
+        Table of value rows (like db cursor), header is styled as th, values as td,
+        dates and times get number formats like openpyxl gives them
+
+        >>> from datetime import date
+        >>> model = TableModel.from_rows([("Tea", date(2020, 1, 31))], header=["Name", "Date"])
+        >>> model.style(0, 0)[0].font.bold, model.style(1, 1)[1]
+        (True, 'yyyy-mm-dd')
+        """
+        model = cls(title)
+        stylist = Stylist(default_style or Style())
+        if header is not None:
+            model.append_row(header, model.style_id(stylist.compile_style(None, "th")))
+
+        data_style = stylist.compile_style(None, "td")
+        data_style_id = model.style_id(data_style)
+        type_style_ids = {
+            value_type: model.style_id(data_style, number_format)
+            for value_type, number_format in TIME_FORMATS.items()
+        }
+        for row in rows:
+            model.append_row(
+                row, [type_style_ids.get(type(value), data_style_id) for value in row]
+            )
+        return model
+
+    @classmethod
+    def from_dicts(
+        cls,
+        records: Iterable[Mapping[str, Any]],
+        columns: Optional[Sequence[str]] = None,
+        title: Optional[str] = None,
+        default_style: Optional[Style] = None,
+    ) -> "TableModel":
+        """
+        Table of records with header of columns (keys of first record if not passed)
+
+        >>> model = TableModel.from_dicts([{"name": "Tea", "price": 10}, {"name": "Coffee"}])
+        >>> model.value(0, 1), model.value(2, 0), model.value(2, 1)
+        ('price', 'Coffee', None)
+        """
+        records = iter(records)
+        first_record = next(records, None)
+        if columns is None:
+            columns = list(first_record) if first_record is not None else []
+
+        all_records = chain([first_record], records) if first_record is not None else records
+        rows = ([record.get(column) for column in columns] for record in all_records)
+        return cls.from_rows(rows, columns, title, default_style)
+
+
+@dataclass
+class ModelBuilder:
+    """
+    Builds table model of html table: same values, styles, merged ranges, dimensions and images
+    as rendered to workbook, without keeping html elements or openpyxl cells
+    """
+
+    parser: TableParser
+    stylist: Stylist
+    config: Config
+    title: Optional[str] = None
+    images: ImageLoader = None  # type: ignore
+
+    def __call__(self) -> TableModel:
+        if self.images is None:
+            self.images = ImageLoader(self.config)
+
+        model = TableModel(self.title)
+        for index, column in enumerate(self.parser.columns):
+            width = column_width(column)
+            if width:
+                model.column_widths[index] = width
+
+        values = ValueParser(self.config)
+        for row_layout, cells in render_rows(
+            self.parser, self.stylist, self.config, self.images, values
+        ):
+            row_index = row_layout.row_index
+            row_values: List[Any] = []
+            style_ids: List[int] = []
+            for col_index, cell in enumerate(cells):
+                if cell is None:
+                    row_values.append(None)
+                    style_ids.append(0)
+                    continue
+
+                if cell.image_tag:
+                    model.add_image(row_index, col_index, self.images.image(cell.image_tag))
+                if cell.merged_range:
+                    model.merge(*cell.merged_range)
+                row_values.append(cell.value)
+                style_ids.append(model.style_id(cell.style, cell.number_format))
+
+            height = row_height(row_layout.row) if row_layout.row is not None else None
+            model.append_row(row_values, style_ids, height)
+        return model
+
+
+def write_model(model: TableModel, sheet: SheetWriter) -> None:
+    """Write table model to sheet, model style ids are mapped to workbook style ids once"""
+    styles = sheet.writer.styles
+    sheet_style_ids = [0] + [
+        styles.style_id(style, number_format) for style, number_format in model.styles[1:]
+    ]
+
+    for col_index, width in sorted(model.column_widths.items()):
+        sheet.set_column_width(col_index, width)
+
+    columns = list(zip(model.columns, model.style_ids))
+    for row_index in range(model.row_count):
+        cells: List[SheetCell] = [
+            (
+                (column[row_index], sheet_style_ids[style_ids[row_index]])
+                if style_ids[row_index]
+                else None
+            )
+            for column, style_ids in columns
+        ]
+        sheet.write_row(row_index, cells, model.row_heights.get(row_index))
+
+    for merged_range in model.merges:
+        sheet.merge_cells(merged_range_str(merged_range))
+    for (row_index, col_index), image in model.images.items():
+        sheet.add_image(image, create_cell_coordinate(col_index, row_index))
@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+# stage stats, like {"rows": 10, "cells": 50}
+StageStats = Dict[str, Any]
+
+
+class RenderObserver:
+    """
+    Receives render stage events, methods do nothing by default, so only needed ones are overridden.
+    Stages of render: parse, images, cells (values, styles and dimensions of rows).
+    """
+
+    def stage_started(self, stage: str) -> None:
+        pass
+
+    def stage_finished(self, stage: str, seconds: float, stats: StageStats) -> None:
+        pass
+
+
+@contextmanager
+def observe_stage(observer: Optional[RenderObserver], stage: str) -> Iterator[StageStats]:
+    """
+    Notify observer about stage start and finish with duration and stats filled by stage.
+    Stats are filled once per stage, not per cell, so render without observer pays nothing.
+
+    >>> collector = StatsCollector()
+    >>> with observe_stage(collector, "cells") as stats:
+    ...     stats["rows"] = 10
+    >>> collector.stages["cells"]["rows"]
+    10
+    """
+    stats: StageStats = {}
+    if observer is None:
+        yield stats
+        return
+
+    observer.stage_started(stage)
+    start = time.perf_counter()
+    yield stats
+    observer.stage_finished(stage, time.perf_counter() - start, stats)
+
+
+@dataclass
+class StatsCollector(RenderObserver):
+    """
+    Collects stage durations and stats into summary dict, e.g. to send it to metrics.
+    Stats of repeated stages (e.g. one per sheet) are summed.
+
+    >>> collector = StatsCollector()
+    >>> collector.stage_finished("cells", 0.5, {"rows": 10})
+    >>> collector.stage_finished("cells", 0.25, {"rows": 5})
+    >>> collector.summary()
+    {'seconds': 0.75, 'stages': {'cells': {'seconds': 0.75, 'rows': 15}}}
+    """
+
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    def stage_finished(self, stage: str, seconds: float, stats: StageStats) -> None:
+        stage_stats = self.stages.setdefault(stage, {"seconds": 0.0})
+        stage_stats["seconds"] += seconds
+        for key, value in stats.items():
+            stage_stats[key] = stage_stats.get(key, 0) + value
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seconds": sum(stage_stats["seconds"] for stage_stats in self.stages.values()),
+            "stages": {stage: dict(stage_stats) for stage, stage_stats in self.stages.items()},
+        }
@@ -0,0 +1,132 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from jinja2xlsx.adjust import row_height
+from jinja2xlsx.config import Config
+from jinja2xlsx.css import StyleSheet
+from jinja2xlsx.layout import TableLayout
+from jinja2xlsx.parse import TokenParser
+from jinja2xlsx.render import CellSpec, render_row
+from jinja2xlsx.style import Style, Stylist
+from jinja2xlsx.tokenizer import HtmlElement, HtmlTable
+from jinja2xlsx.values import ValueParser
+
+
+class RowChunk(NamedTuple):
+    # index of first row of chunk in table
+    start_row_index: int
+    rows: List[HtmlElement]
+
+
+class RowSpec(NamedTuple):
+    row_index: int
+    height: Optional[float]
+    # None for columns without cell
+    cells: List[Optional[CellSpec]]
+
+
+def split_row_chunks(
+    rows: Iterable[HtmlElement],
+    cells: Callable[[HtmlElement], Sequence[HtmlElement]],
+    chunk_rows: int,
+) -> Iterator[RowChunk]:
+    """
+    Split rows to chunks of at least chunk_rows rows, no rowspan crosses chunk boundary,
+    so layout of chunk does not depend on other chunks. Rows are consumed lazily.
+
+    >>> rows = [HtmlElement("tr", {}) for _ in range(5)]
+    >>> rows[1].children = [HtmlElement("td", {"rowspan": "3"})]
+    >>> [len(chunk.rows) for chunk in split_row_chunks(rows, lambda row: row.children, 1)]
+    [1, 3, 1]
+    """
+    chunk: List[HtmlElement] = []
+    start_row_index = 0
+    # last row covered by rowspans of chunk
+    span_end_index = -1
+
+    for row_index, row in enumerate(rows):
+        chunk.append(row)
+        for html_cell in cells(row):
+            rowspan = int(html_cell.attrs.get("rowspan", 1))
+            span_end_index = max(span_end_index, row_index + rowspan - 1)
+
+        if len(chunk) >= chunk_rows and span_end_index <= row_index:
+            yield RowChunk(start_row_index, chunk)
+            start_row_index, chunk = row_index + 1, []
+
+    if chunk:
+        yield RowChunk(start_row_index, chunk)
+
+
+@dataclass
+class ChunkRenderer:
+    """
+    Computes values, styles and merged ranges of chunk rows, so it can be run in worker process:
+    chunk and its result are plain picklable values, workbook is assembled by parent process.
+    """
+
+    default_style: Style
+    config: Config
+    stylesheet: Optional[StyleSheet] = None
+
+    def __call__(self, chunk: RowChunk) -> List[RowSpec]:
+        table = HtmlTable({})
+        table.rows = chunk.rows
+        parser = TokenParser("", table)
+
+        # converters are picked per chunk, picked converter does not change values
+        values = ValueParser(self.config)
+        return [
+            RowSpec(
+                chunk.start_row_index + row_layout.row_index,
+                row_height(row_layout.row) if row_layout.row is not None else None,
+                render_row(
+                    parser, self.stylist, self.config, values, row_layout, chunk.start_row_index
+                ),
+            )
+            for row_layout in values.infer(iter(TableLayout(parser)))
+        ]
+
+    @property
+    def stylist(self) -> Stylist:
+        # stylist keeps workbook style arrays, so it is not sent between processes
+        stylist = self.__dict__.get("_stylist")
+        if stylist is None:
+            stylist = self.__dict__["_stylist"] = Stylist(
+                self.default_style, stylesheet=self.stylesheet
+            )
+        return stylist
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {key: value for key, value in self.__dict__.items() if key != "_stylist"}
+
+
+def render_chunks(
+    chunks: Iterable[RowChunk], renderer: ChunkRenderer, workers: int
+) -> Iterator[List[RowSpec]]:
+    """
+    Render chunks over process pool, results are yielded in chunk order.
+    Only a few chunks per worker are submitted at once, so rows are not all kept in memory.
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+            pending.append(executor.submit(renderer, chunk))
+
+        while pending:
+            yield pending.popleft().result()
@@ -1,46 +1,281 @@
-from dataclasses import dataclass
-from typing import Sequence, Optional
+from dataclasses import dataclass, field
+from typing import (
+    Sequence,
+    Optional,
+    Union,
+    Dict,
+    Type,
+    TYPE_CHECKING,
+    List,
+    Iterator,
+    Iterable,
+)
 
-from cached_property import cached_property
-from requests_html import HTML, Element
+try:
+    from functools import cached_property
+except ImportError:  # python 3.7, cached_property package imports asyncio, so it is fallback only
+    from cached_property import cached_property  # type: ignore
+
+from jinja2xlsx.config import Config
+from jinja2xlsx.css import StyleSheet, parse_stylesheet
+from jinja2xlsx.tokenizer import TableTokenizer, HtmlElement, HtmlTable, match_selector
+
+if TYPE_CHECKING:
+    from requests_html import HTML, Element
 
 
 @dataclass()
 class Parser:
     html_str: str
+    # table of already parsed html, first table is used if not set
+    table_element: Optional["Element"] = field(default=None, repr=False)
 
     @cached_property
-    def html(self) -> HTML:
+    def html(self) -> "HTML":
+        # requests_html (with pyppeteer, bs4, pyquery) is slow to import, so import it on demand
+        from requests_html import HTML
+
         return HTML(html=self.html_str)
 
     @cached_property
-    def table(self) -> Element:
+    def table(self) -> "Element":
+        if self.table_element is not None:
+            return self.table_element
+
         table = self.html.find("table", first=True)
         assert table
         return table
 
+    def tables(self, selector: str) -> List["Parser"]:
+        """Parser per table (except nested ones) matching selector, html is parsed once"""
+        return [
+            Parser(self.html_str, table)
+            for table in self.html.find(selector)
+            if next(table.element.iterancestors("table"), None) is None
+        ]
+
     @cached_property
-    def table_head(self) -> Element:
+    def stylesheet(self) -> StyleSheet:
+        """Rules of <style> blocks of document"""
+        return parse_stylesheet(
+            "\n".join(style.element.text_content() for style in self.html.find("style"))
+        )
+
+    @cached_property
+    def caption(self) -> Optional[str]:
+        caption = self.table.find("caption", first=True)
+        return caption.text if caption else None
+
+    @cached_property
+    def table_head(self) -> "Element":
         thead = self.table.find("thead", first=True)
         return thead
 
     @cached_property
-    def table_body(self) -> Element:
+    def table_body(self) -> "Element":
         tbody = self.table.find("tbody", first=True)
         assert tbody
         return tbody
 
     @cached_property
-    def rows(self) -> Sequence[Element]:
+    def table_bodies(self) -> Sequence["Element"]:
+        """Every tbody of table (not of nested tables), as rows of all of them are rendered"""
+        from requests_html import Element
+
+        assert self.table_body
+        return [
+            Element(element=child, url=self.table.url, default_encoding=self.table.encoding)
+            for child in self.table.element
+            if child.tag == "tbody"
+        ]
+
+    @cached_property
+    def rows(self) -> Sequence["Element"]:
         return [
             *(self.table_head.find("tr") if self.table_head else []),
-            *(self.table_body.find("tr")),
+            *(row for tbody in self.table_bodies for row in tbody.find("tr")),
         ]
 
+    def cells(self, row: "Element") -> Sequence["Element"]:
+        return [*row.find("th"), *row.find("td")]
+
+    def image(self, cell: "Element") -> Optional["Element"]:
+        return cell.find("img", first=True)
+
     @cached_property
-    def colgroup(self) -> Optional[Element]:
+    def colgroup(self) -> Optional["Element"]:
         return self.table.find("colgroup", first=True)
 
     @cached_property
-    def columns(self) -> Sequence[Element]:
+    def columns(self) -> Sequence["Element"]:
         return self.colgroup.find("col") if self.colgroup else []
+
+
+@dataclass()
+class TokenParser:
+    """
+    Same interface and rows and cells order as Parser,
+    but html is tokenized in single pass via stdlib html.parser
+    """
+
+    html_str: str
+    # table of already tokenized html, first table is used if not set
+    table_element: Optional[HtmlTable] = field(default=None, repr=False)
+
+    @cached_property
+    def tokenizer(self) -> TableTokenizer:
+        tokenizer = TableTokenizer()
+        tokenizer.feed(self.html_str)
+        tokenizer.close()
+        assert tokenizer.table_found
+        return tokenizer
+
+    @property
+    def table(self) -> HtmlTable:
+        if self.table_element is not None:
+            return self.table_element
+        return self.tokenizer.tables[0]
+
+    def tables(self, selector: str) -> List["TokenParser"]:
+        """Parser per table (except nested ones) matching selector, html is tokenized once"""
+        return [
+            TokenParser(self.html_str, table)
+            for table in self.tokenizer.tables
+            if match_selector(table, selector)
+        ]
+
+    @cached_property
+    def stylesheet(self) -> StyleSheet:
+        """Rules of <style> blocks of document"""
+        return parse_stylesheet("\n".join(self.tokenizer.styles))
+
+    @property
+    def caption(self) -> Optional[str]:
+        return self.table.caption.text if self.table.caption else None
+
+    @property
+    def rows(self) -> Sequence[HtmlElement]:
+        return self.table.rows
+
+    def cells(self, row: HtmlElement) -> Sequence[HtmlElement]:
+        return row.children
+
+    def image(self, cell: HtmlElement) -> Optional[HtmlElement]:
+        return next((child for child in cell.children if child.tag == "img"), None)
+
+    @property
+    def columns(self) -> Sequence[HtmlElement]:
+        return self.table.columns
+
+
+@dataclass()
+class IncrementalParser:
+    """
+    Same interface as TokenParser, but html is fed to tokenizer by chunks (like Template.generate()),
+    so first table rows are emitted while html is still produced.
+    Emitted rows are not kept, so rows can be iterated only once.
+    """
+
+    chunks: Iterable[str]
+    tokenizer: TableTokenizer = field(default_factory=TableTokenizer, repr=False)
+
+    def __post_init__(self) -> None:
+        self._chunks = iter(self.chunks)
+        self._closed = False
+
+    @property
+    def table(self) -> HtmlTable:
+        while not self.tokenizer.table_found and self._feed():
+            pass
+        assert self.tokenizer.table_found
+        return self.tokenizer.tables[0]
+
+    def tables(self, selector: str) -> List["IncrementalParser"]:
+        raise ValueError("Multiple tables are not supported by incremental parser")
+
+    @property
+    def stylesheet(self) -> StyleSheet:
+        """Rules of <style> blocks before table, since rows are emitted before html is over"""
+        self.table
+        return parse_stylesheet("\n".join(self.tokenizer.styles))
+
+    @property
+    def caption(self) -> Optional[str]:
+        # caption is first child of table
+        table = self.table
+        while not table.caption and not table.rows and self._feed():
+            pass
+        return table.caption.text if table.caption else None
+
+    @property
+    def rows(self) -> Iterator[HtmlElement]:
+        table = self.table
+        has_chunks = True
+        while has_chunks:
+            has_chunks = not self.tokenizer.table_closed and self._feed()
+            rows = table.rows[:]
+            del table.rows[:]
+            yield from rows
+
+    def cells(self, row: HtmlElement) -> Sequence[HtmlElement]:
+        return row.children
+
+    def image(self, cell: HtmlElement) -> Optional[HtmlElement]:
+        return next((child for child in cell.children if child.tag == "img"), None)
+
+    @property
+    def columns(self) -> Sequence[HtmlElement]:
+        # colgroup goes before rows
+        table = self.table
+        while not table.rows and not self.tokenizer.table_closed and self._feed():
+            pass
+        return table.columns
+
+    def _feed(self) -> bool:
+        """Feed next chunk to tokenizer, False if html is over"""
+        if self._closed:
+            return False
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.tokenizer.close()
+            self._closed = True
+            return False
+
+        self.tokenizer.feed(chunk)
+        return True
+
+
+TableParser = Union[Parser, TokenParser, IncrementalParser]
+PARSERS: Dict[str, Type[TableParser]] = {
+    "requests_html": Parser,
+    "tokenizer": TokenParser,
+}
+
+
+def find_sheet_name(parser: TableParser) -> Optional[str]:
+    """
+    >>> find_sheet_name(TokenParser('<table data-sheet-name="Sales"><caption>Q1</caption></table>'))
+    'Sales'
+    >>> find_sheet_name(TokenParser('<table><caption>Q1 sales</caption></table>'))
+    'Q1 sales'
+    """
+    return parser.table.attrs.get("data-sheet-name") or parser.caption
+
+
+def create_parser(html_str: str, config: Config) -> TableParser:
+    """
+    >>> create_parser("<table></table>", Config(parser="tokenizer"))
+    TokenParser(html_str='<table></table>')
+    >>> create_parser("<table></table>", Config(parser="bs4"))
+    Traceback (most recent call last):
+    ...
+    ValueError: Unknown parser: bs4, available parsers: requests_html, tokenizer
+    """
+    try:
+        parser_cls = PARSERS[config.parser]
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser: {config.parser}, available parsers: {', '.join(PARSERS)}"
+        )
+    return parser_cls(html_str)
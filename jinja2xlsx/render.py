@@ -1,93 +1,235 @@
 from dataclasses import dataclass
-from typing import Tuple
+from itertools import islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from openpyxl import Workbook
-from openpyxl.cell import MergedCell, Cell
 from openpyxl.worksheet.worksheet import Worksheet
 
 from jinja2xlsx.adjust import Adjuster
 from jinja2xlsx.config import Config
-from jinja2xlsx.image import ImageParse
-from jinja2xlsx.parse import Parser
-from jinja2xlsx.style import Stylist
-from jinja2xlsx.utils import CellGenerator, create_cell_range_str, parse_cell_value
+from jinja2xlsx.image import ImageLoader, find_image_tags, load_images_stage
+from jinja2xlsx.layout import PlacedCell, RowLayout, TableLayout
+from jinja2xlsx.observe import RenderObserver, observe_stage
+from jinja2xlsx.parse import TableParser
+from jinja2xlsx.style import Style, Stylist
+from jinja2xlsx.utils import create_cell_range_str
+from jinja2xlsx.values import TypedValue, ValueParser
+from jinja2xlsx.workbook import MediaWorkbook
+
+# images of rows are loaded concurrently by batches of rows
+IMAGE_BATCH_ROWS = 1000
+
+# first row, first column, last row, last column of merged range (0-based, inclusive)
+MergedRange = Tuple[int, int, int, int]
+
+
+class CellSpec(NamedTuple):
+    """
+    Content of sheet cell computed from html, written by every renderer its own way.
+    Plain picklable value, so it can be computed in worker process.
+    """
+
+    value: Any
+    number_format: Optional[str]
+    # set instead of value, if images are parsed and cell has image
+    image_tag: Optional[Any]
+    style: Style
+    # set for first cell of merged range only
+    merged_range: Optional[MergedRange]
 
 
 @dataclass
 class Renderer:
-    parser: Parser
+    """
+    Renders table in single pass over row layouts: value, style and row dimension
+    are decided and written once, no list of all cells is kept.
+    """
+
+    parser: TableParser
     stylist: Stylist
     config: Config
     workbook: Workbook = None
     sheet: Worksheet = None
+    # shared by sheets of workbook and already loaded (e.g. by DocumentRenderer),
+    # so images are loaded once, images missing in it are loaded on demand
+    images: ImageLoader = None  # type: ignore
+    observer: Optional[RenderObserver] = None
 
     def __call__(self) -> Workbook:
-        self.wb = Workbook()
-        self.sheet = self.wb.active
-
-        cells = list(self._generate_cells())
-        self._fill_cells(cells)
-        self._style_cells(cells)
-
-        adjuster = Adjuster(self.sheet)
-        adjuster.adjust_columns(self.parser.columns)
-        adjuster.adjust_rows(self.parser.rows)
-
-        return self.wb
-
-    def _generate_cells(self) -> CellGenerator:
-        for row_index, row in enumerate(self.parser.rows):
-            col_index = 0
-
-            html_cells = [*row.find("th"), *row.find("td")]
-            for html_cell in html_cells:
-                target_cell, col_index = self._find_free_cell(col_index, row_index)
-
-                colspan = int(html_cell.attrs.get("colspan", 1))
-                rowspan = int(html_cell.attrs.get("rowspan", 1))
-
-                if colspan > 1 or rowspan > 1:
-                    cell_range_str = create_cell_range_str(col_index, colspan, row_index, rowspan)
-                    self.sheet.merge_cells(cell_range_str)
-                    yield html_cell, None, self.sheet[cell_range_str]
-                else:
-                    yield html_cell, target_cell, None
-
-                col_index += colspan
-
-    def _find_free_cell(self, col_index: int, row_index: int) -> Tuple[Cell, int]:
-        target_cell = self.sheet.cell(row_index + 1, col_index + 1)
-
-        while True:
-            if isinstance(target_cell, MergedCell):
-                col_index += 1
-                target_cell = self.sheet.cell(row_index + 1, col_index + 1)
-            else:
-                break
-
-        return target_cell, col_index
-
-    def _fill_cells(self, cells: CellGenerator) -> None:
-        for html_cell, cell, cell_range in cells:
-            target_cell = None
-            if cell:
-                target_cell = cell
-            if cell_range:
-                target_cell = cell_range[0][0]
-            assert target_cell
-
-            image_tag = html_cell.find("img", first=True)
-            if image_tag and self.config.parse_img:
-                image = ImageParse(self.config)(image_tag)
-                self.sheet.add_image(image, target_cell.coordinate)
-            else:
-                target_cell.value = parse_cell_value(html_cell.text)
-
-    def _style_cells(self, cells: CellGenerator) -> None:
-        for html_cell, cell, cell_range in cells:
-            style = self.stylist.build_style_from_html(html_cell)
-
-            if cell:
-                self.stylist.style_single_cell(cell, style)
-            elif cell_range:
-                self.stylist.style_merged_cells(cell_range, style)
+        if self.workbook is None:
+            self.workbook = MediaWorkbook(use_shared_strings=self.config.shared_strings)
+        if self.sheet is None:
+            self.sheet = self.workbook.active
+        preloaded_images = self.images is not None
+        if self.images is None:
+            self.images = ImageLoader(self.config)
+
+        with observe_stage(self.observer, "parse"):
+            # html is parsed on first access to rows
+            self.parser.rows
+            if self.stylist.stylesheet is None:
+                self.stylist.stylesheet = self.parser.stylesheet
+
+        if self.config.parse_img and not preloaded_images:
+            # images are loaded concurrently before cells are written
+            load_images_stage(self.images, find_image_tags(self.parser), self.observer)
+
+        with observe_stage(self.observer, "cells") as stats:
+            cache_hits, cache_misses = self.stylist.cache_hits, self.stylist.cache_misses
+            rows = cells = 0
+
+            adjuster = Adjuster(self.sheet)
+            adjuster.adjust_columns(self.parser.columns)
+            values = ValueParser(self.config)
+            for row_layout in values.infer(iter(TableLayout(self.parser))):
+                if row_layout.row is not None:
+                    adjuster.adjust_row(row_layout.row_index, row_layout.row)
+                for placed_cell in row_layout.cells:
+                    self._render_cell(placed_cell, values)
+                rows += 1
+                cells += len(row_layout.cells)
+
+            stats["rows"], stats["cells"] = rows, cells
+            stats["style_cache_hits"] = self.stylist.cache_hits - cache_hits
+            stats["style_cache_misses"] = self.stylist.cache_misses - cache_misses
+
+        return self.workbook
+
+    def _render_cell(self, placed_cell: PlacedCell, values: ValueParser) -> None:
+        # merged cells are styled by openpyxl cell range, so cell specs of row are not used
+        html_cell, row_index, col_index, colspan, rowspan = placed_cell
+        style = self.stylist.build_style_from_html(html_cell, col_index)
+
+        if placed_cell.is_merged:
+            cell_range_str = create_cell_range_str(col_index, colspan, row_index, rowspan)
+            self.sheet.merge_cells(cell_range_str)
+            cell_range = self.sheet[cell_range_str]
+            target_cell = cell_range[0][0]
+            self.stylist.style_merged_cells(cell_range, style)
+        else:
+            target_cell = self.sheet.cell(row_index + 1, col_index + 1)
+            self.stylist.style_single_cell(target_cell, style)
+
+        (value, number_format), image_tag = render_cell_value(
+            self.parser, self.config, values, html_cell, col_index
+        )
+        if image_tag:
+            self.sheet.add_image(self.images.image(image_tag), target_cell.coordinate)
+        else:
+            target_cell.value = value
+            if number_format:
+                target_cell.number_format = number_format
+
+
+def render_cell_value(
+    parser: TableParser, config: Config, values: ValueParser, html_cell: Any, col_index: int
+) -> Tuple[TypedValue, Optional[Any]]:
+    """Typed value of html cell, or its image tag instead if images are parsed"""
+    if config.parse_img:
+        image_tag = parser.image(html_cell)
+        if image_tag:
+            return (None, None), image_tag
+    return values.parse(html_cell.text, col_index), None
+
+
+def render_row(
+    parser: TableParser,
+    stylist: Stylist,
+    config: Config,
+    values: ValueParser,
+    row_layout: RowLayout,
+    row_offset: int = 0,
+) -> List[Optional[CellSpec]]:
+    """
+    Cell specs of sheet row by column index, None for columns without cell.
+    Merged ranges start at row_offset + row index of layout (e.g. chunk of rows is rendered).
+    """
+    row_index = row_offset + row_layout.row_index
+    cells: Dict[int, CellSpec] = {}
+    for col_index, (placed_cell, style) in style_row(stylist, row_layout).items():
+        value, number_format, image_tag, merged_range = None, None, None, None
+        if placed_cell is not None:
+            (value, number_format), image_tag = render_cell_value(
+                parser, config, values, placed_cell.html_cell, col_index
+            )
+            if placed_cell.is_merged:
+                merged_range = (
+                    row_index,
+                    col_index,
+                    row_index + placed_cell.rowspan - 1,
+                    placed_cell.last_col_index,
+                )
+        cells[col_index] = CellSpec(value, number_format, image_tag, style, merged_range)
+
+    if not cells:
+        return []
+    return [cells.get(index) for index in range(max(cells) + 1)]
+
+
+def render_rows(
+    parser: TableParser,
+    stylist: Stylist,
+    config: Config,
+    images: ImageLoader,
+    values: ValueParser,
+) -> Iterator[Tuple[RowLayout, List[Optional[CellSpec]]]]:
+    """
+    Row layouts of table with their cell specs, rows are rendered lazily.
+    If images are parsed, rows are rendered by batches, so images of batch are loaded
+    concurrently before its rows are yielded.
+    """
+    row_layouts = values.infer(iter(TableLayout(parser)))
+    batch_size = IMAGE_BATCH_ROWS if config.parse_img else 1
+    for batch in iter(lambda: list(islice(row_layouts, batch_size)), []):
+        rows = [
+            (row_layout, render_row(parser, stylist, config, values, row_layout))
+            for row_layout in batch
+        ]
+        if config.parse_img:
+            images.load(
+                cell.image_tag for _, cells in rows for cell in cells if cell and cell.image_tag
+            )
+        yield from rows
+
+
+def style_row(
+    stylist: Stylist, row_layout: RowLayout
+) -> Dict[int, Tuple[Optional[PlacedCell], Style]]:
+    """
+    Style of each sheet cell of row by column index:
+    cells with value have their placed html cell, other cells of merged ranges have None
+    """
+    row_index = row_layout.row_index
+    styles: Dict[int, Tuple[Optional[PlacedCell], Style]] = {}
+
+    # merged cells from previous rows, then cells of row
+    for placed_cell in [*row_layout.spans, *row_layout.cells]:
+        style = stylist.build_style_from_html(placed_cell.html_cell, placed_cell.col_index)
+        if not placed_cell.is_merged:
+            styles[placed_cell.col_index] = (placed_cell, style)
+            continue
+
+        for col_index in range(placed_cell.col_index, placed_cell.last_col_index + 1):
+            is_first = row_index == placed_cell.row_index and col_index == placed_cell.col_index
+            merged_style = stylist.merged_cell_style(
+                style,
+                top=row_index == placed_cell.row_index,
+                bottom=row_index == placed_cell.last_row_index,
+                left=col_index == placed_cell.col_index,
+                right=col_index == placed_cell.last_col_index,
+                is_first=is_first,
+            )
+            styles[col_index] = (placed_cell if is_first else None, merged_style)
+
+    return styles
+
+
+def merged_range_str(merged_range: MergedRange) -> str:
+    """
+    >>> merged_range_str((0, 1, 2, 3))
+    'B1:D3'
+    """
+    first_row, first_col, last_row, last_col = merged_range
+    return create_cell_range_str(
+        first_col, last_col - first_col + 1, first_row, last_row - first_row + 1
+    )
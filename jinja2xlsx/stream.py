@@ -0,0 +1,134 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+from jinja2xlsx.adjust import Adjuster
+from jinja2xlsx.config import Config
+from jinja2xlsx.image import ImageLoader
+from jinja2xlsx.parse import Parser, TableParser
+from jinja2xlsx.render import CellSpec, merged_range_str, render_rows
+from jinja2xlsx.style import Stylist
+from jinja2xlsx.utils import create_cell_coordinate
+from jinja2xlsx.values import ValueParser
+from jinja2xlsx.workbook import MediaWorkbook
+
+
+@dataclass
+class StreamRenderer:
+    """
+    Renders rows straight into write-only workbook:
+    rows are flushed to disk as soon as they are parsed,
+    only merged cells with pending rowspans are kept in memory.
+    If images are parsed, rows are flushed by batches, so images of batch are loaded concurrently.
+    If Config.render_workers is set, values and styles of row chunks are computed
+    in worker processes and rows are written in order by current process
+    (unless table has fewer rows than Config.render_workers_min_rows or there is single cpu).
+    """
+
+    parser: TableParser
+    stylist: Stylist
+    config: Config
+    workbook: Workbook = None
+    sheet: WriteOnlyWorksheet = None
+    # shared by sheets of workbook, so images are loaded once
+    images: ImageLoader = None  # type: ignore
+
+    def __call__(self) -> Workbook:
+        if self.workbook is None:
+            self.workbook = MediaWorkbook(
+                write_only=True, use_shared_strings=self.config.shared_strings
+            )
+        if self.sheet is None:
+            self.sheet = self.workbook.create_sheet()
+        if self.images is None:
+            self.images = ImageLoader(self.config)
+
+        adjuster = Adjuster(self.sheet)
+        # column dimensions should be set before first row is written
+        adjuster.adjust_columns(self.parser.columns)
+
+        if self.config.render_workers and isinstance(self.parser, Parser):
+            raise ValueError("Config.render_workers requires tokenizer parser")
+        if self._use_workers():
+            self._render_chunks()
+            return self.workbook
+
+        values = ValueParser(self.config)
+        for row_layout, cells in render_rows(
+            self.parser, self.stylist, self.config, self.images, values
+        ):
+            if row_layout.row is not None:
+                adjuster.adjust_row(row_layout.row_index, row_layout.row)
+            # cells of row keep their styles, so style arrays can be looked up by identity
+            self._append_row(row_layout.row_index, cells, {})
+
+        return self.workbook
+
+    def _use_workers(self) -> bool:
+        if not self.config.render_workers or (os.cpu_count() or 1) == 1:
+            return False
+        rows = self.parser.rows
+        # rows of incremental parser are not counted before rendering
+        if isinstance(rows, list):
+            return len(rows) >= self.config.render_workers_min_rows
+        return True
+
+    def _render_chunks(self) -> None:
+        from jinja2xlsx.parallel import ChunkRenderer, render_chunks, split_row_chunks
+
+        chunks = split_row_chunks(
+            self.parser.rows, self.parser.cells, self.config.render_chunk_rows
+        )
+        renderer = ChunkRenderer(self.stylist.default_style, self.config, self.stylist.stylesheet)
+        for row_specs in render_chunks(chunks, renderer, self.config.render_workers):
+            # styles are unpickled as new objects per chunk, and comparing them to registered
+            # ones is slow, so style arrays are looked up by identity within chunk
+            style_arrays: Dict[int, StyleArray] = {}
+            if self.config.parse_img:
+                self.images.load(
+                    cell_spec.image_tag
+                    for row_spec in row_specs
+                    for cell_spec in row_spec.cells
+                    if cell_spec and cell_spec.image_tag
+                )
+
+            for row_spec in row_specs:
+                if row_spec.height:
+                    self.sheet.row_dimensions[row_spec.row_index + 1].height = row_spec.height
+                self._append_row(row_spec.row_index, row_spec.cells, style_arrays)
+
+    def _append_row(
+        self,
+        row_index: int,
+        cell_specs: Sequence[Optional[CellSpec]],
+        style_arrays: Dict[int, StyleArray],
+    ) -> None:
+        """Write row of cell specs, style arrays are cached by id of alive cell spec styles"""
+        row: List[Optional[Cell]] = []
+        for col_index, cell_spec in enumerate(cell_specs):
+            if cell_spec is None:
+                row.append(None)
+                continue
+
+            style_array = style_arrays.get(id(cell_spec.style))
+            if style_array is None:
+                style_array = self.stylist.register_style(self.workbook, cell_spec.style)
+                style_arrays[id(cell_spec.style)] = style_array
+            cell = WriteOnlyCell(self.sheet)
+            # number format is part of cell style, so cell is styled first
+            cell._style = StyleArray(style_array)
+            cell.value = cell_spec.value
+            if cell_spec.number_format:
+                cell.number_format = cell_spec.number_format
+            if cell_spec.image_tag:
+                image = self.images.image(cell_spec.image_tag)
+                self.sheet.add_image(image, create_cell_coordinate(col_index, row_index))
+            if cell_spec.merged_range:
+                self.sheet.merged_cells.add(merged_range_str(cell_spec.merged_range))
+            row.append(cell)
+        self.sheet.append(row)
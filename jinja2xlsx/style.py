@@ -1,24 +1,53 @@
-import dataclasses
-import re
+import threading
+from collections import OrderedDict
+from copy import copy
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, TYPE_CHECKING, Tuple, NamedTuple
+from weakref import WeakKeyDictionary
 
+from openpyxl import Workbook
 from openpyxl.cell import Cell
 from openpyxl.styles import Border, Side, Alignment, Font
 from openpyxl.styles.alignment import vertical_aligments
-from requests_html import Element
-
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.cell_style import StyleArray
+
+from jinja2xlsx.css import (
+    BOX_SIDES,
+    Declarations,
+    StyleSheet,
+    parse_color,
+    parse_declarations,
+    parse_length,
+)
 from jinja2xlsx.utils import union_dicts, CellRange
 
+if TYPE_CHECKING:
+    from requests_html import Element
+
 REMOVE_SIDE = Side()
 
 
-@dataclass()
+@dataclass(frozen=True)
 class Style:
     border: Border = field(default_factory=Border)
     alignment: Alignment = field(default_factory=Alignment)
     font: Font = field(default_factory=Font)
 
+    def __hash__(self) -> int:
+        # hashing openpyxl style objects is slow, style is immutable, so hash is computed once
+        try:
+            return self.__dict__["_hash"]
+        except KeyError:
+            style_hash = hash((self.border, self.alignment, self.font))
+            object.__setattr__(self, "_hash", style_hash)
+            return style_hash
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # str hashes differ between processes, so hash is not pickled
+        return {key: value for key, value in self.__dict__.items() if key != "_hash"}
+
     def union(self, style: 'Style') -> 'Style':
         """
         >>> from openpyxl.styles import Side
@@ -39,7 +68,7 @@ class Style:
         return Style(Border(**border_data), Alignment(**alignment_data), Font(**font_data))
 
 
-def extract_style(style_attr: str) -> Style:
+def extract_style(style_attr: Optional[str]) -> Style:
     """
     >>> style = extract_style("border: 1px solid black; text-align: center; font-weight: bold")
     >>> style.alignment.horizontal
@@ -54,30 +83,152 @@ def extract_style(style_attr: str) -> Style:
     if not style_attr:
         return Style()
 
-    style_dict = parse_style_attr(style_attr)
+    # border, alignment and font are built from same declarations, parsed once per style attr
+    declarations = parse_declarations(style_attr)
 
-    border = _build_border(style_dict)
-    alignment = _build_alignment(style_dict)
-    font = _build_font(style_dict)
+    border = _build_border(declarations)
+    alignment = _build_alignment(declarations)
+    font = _build_font(declarations)
 
     return Style(border, alignment, font)
 
 
+# (default style, style attr, tag)
+StyleKey = Tuple[Style, Optional[str], str]
+# (style, top, bottom, left, right, is first cell)
+MergedStyleKey = Tuple[Style, bool, bool, bool, bool, bool]
+
+
+class StyleCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+@dataclass()
+class StyleCache:
+    """
+    Bounded LRU cache of compiled styles.
+    Cached style is shared by all cells with same style attr, so it should not be mutated.
+
+    >>> cache = StyleCache(maxsize=1)
+    >>> _ = cache.put((Style(), "color: red", "td"), Style())
+    >>> cache.get((Style(), "color: red", "td")) is not None
+    True
+    >>> _ = cache.put((Style(), None, "td"), Style())
+    >>> cache.get((Style(), "color: red", "td")) is None
+    True
+    >>> cache.info()
+    StyleCacheInfo(hits=1, misses=1, maxsize=1, currsize=1)
+    """
+
+    maxsize: int = 1024
+    hits: int = 0
+    misses: int = 0
+    _styles: "OrderedDict[StyleKey, Style]" = field(default_factory=OrderedDict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get(self, key: StyleKey) -> Optional[Style]:
+        with self._lock:
+            style = self._styles.get(key)
+            if style is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._styles.move_to_end(key)
+            return style
+
+    def put(self, key: StyleKey, style: Style) -> Style:
+        with self._lock:
+            self._styles[key] = style
+            if len(self._styles) > self.maxsize:
+                self._styles.popitem(last=False)
+        return style
+
+    def info(self) -> StyleCacheInfo:
+        return StyleCacheInfo(self.hits, self.misses, self.maxsize, len(self._styles))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._styles.clear()
+            self.hits = self.misses = 0
+
+
+# shared by renders, since same templates are rendered over and over
+STYLE_CACHE = StyleCache()
+
+
 @dataclass()
 class Stylist:
     default_style: 'Style' = field(default_factory=Style)
+    cache: StyleCache = field(default_factory=lambda: STYLE_CACHE)
+    # rules of document <style> blocks, applied before inline style attrs
+    stylesheet: Optional[StyleSheet] = None
+    _style_arrays: "WeakKeyDictionary[Workbook, Dict[Style, StyleArray]]" = field(
+        default_factory=WeakKeyDictionary, repr=False
+    )
+    _merged_styles: Dict[MergedStyleKey, Style] = field(default_factory=dict, repr=False)
+    # lookups of this stylist, cache itself is shared by concurrent renders
+    cache_hits: int = field(default=0, repr=False)
+    cache_misses: int = field(default=0, repr=False)
 
-    def build_style_from_html(self, html_element: Element) -> Style:
+    def build_style_from_html(self, html_element: "Element", col_index: int = 0) -> Style:
         style_attr = html_element.attrs.get("style")
+        if self.stylesheet:
+            # rules are folded into style attr, so style is cached by resulting css text
+            style_attr = self.stylesheet.cascade(
+                html_element.tag, html_element.attrs.get("class"), col_index + 1, style_attr
+            )
+        key = (self.default_style, style_attr, html_element.tag)
+
+        style = self.cache.get(key)
+        if style is None:
+            self.cache_misses += 1
+            style = self.cache.put(key, self.compile_style(style_attr, html_element.tag))
+        else:
+            self.cache_hits += 1
+        return style
+
+    def compile_style(self, style_attr: Optional[str], tag: str) -> Style:
         style = extract_style(style_attr)
-        style.font.bold = style.font.bold or html_element.tag == "th"
+        style.font.bold = style.font.bold or tag == "th"
         style = self.default_style.union(style)
         return style
 
+    def cache_info(self) -> StyleCacheInfo:
+        return self.cache.info()
+
     def style_single_cell(self, cell: Cell, style: Style) -> None:
-        cell.border = style.border
-        cell.alignment = style.alignment
-        cell.font = style.font
+        # style array is copied, since openpyxl changes it in place on cell style change
+        cell._style = StyleArray(self.register_style(cell.parent.parent, style))
+
+    def register_style(self, workbook: Workbook, style: Style) -> StyleArray:
+        """
+        Add style border, alignment and font to workbook style tables once per distinct style,
+        so cells are styled by style ids instead of style table lookup per cell attribute
+
+        >>> workbook = Workbook()
+        >>> stylist = Stylist()
+        >>> style = Style(font=Font(bold=True))
+        >>> stylist.register_style(workbook, style) is stylist.register_style(workbook, style)
+        True
+        >>> workbook._fonts[stylist.register_style(workbook, style).fontId].bold
+        True
+        """
+        styles = self._style_arrays.get(workbook)
+        if styles is None:
+            styles = self._style_arrays[workbook] = {}
+
+        style_array = styles.get(style)
+        if style_array is None:
+            style_array = StyleArray()
+            style_array.borderId = workbook._borders.add(style.border)
+            style_array.alignmentId = workbook._alignments.add(style.alignment)
+            style_array.fontId = workbook._fonts.add(style.font)
+            workbook._cell_styles.add(style_array)
+            styles[style] = style_array
+        return style_array
 
     def style_merged_cells(self, cell_range: CellRange, style: Style) -> None:
         """
@@ -104,102 +255,144 @@ class Stylist:
             left_cell.border = left_cell.border + left
             right_cell.border = right_cell.border + right
 
-
-def parse_style_attr(style_str: Optional[str]) -> Dict:
-    """
-    >>> parse_style_attr("border: 1px solid black; text-align: center; font-weight: bold")
-    {'border': '1px solid black', 'text-align': 'center', 'font-weight': 'bold'}
-    >>> parse_style_attr("")
-    {}
-    >>> parse_style_attr(None)
-    {}
-    >>> parse_style_attr('border: 1px solid black; ')
-    {'border': '1px solid black'}
-    """
-    if not style_str:
-        return {}
-
-    try:
-        return {
-            style.strip(): value.strip()
-            for style, value in (style.split(":") for style in filter(None, map(str.strip, style_str.split(";"))))
-        }
-    except ValueError:
-        raise ValueError(f'Failed to parse style: {style_str}')
-
-
-@dataclasses.dataclass
-class ParseBorder:
-    style_dict: Dict[str, str]
-
-    def __call__(self) -> Border:
-        final_border = Border()
-
-        border_style_attrs = [
-            'border',
-            'border-left',
-            'border-right',
-            'border-top',
-            'border-bottom',
-        ]
-        border_style_attrs = [attr for attr in border_style_attrs if attr in self.style_dict]
-
-        for attr in border_style_attrs:
-            if attr == 'border':
-                final_border.left = self._parse_b_value(self.style_dict[attr])
-                final_border.right = self._parse_b_value(self.style_dict[attr])
-                final_border.top = self._parse_b_value(self.style_dict[attr])
-                final_border.bottom = self._parse_b_value(self.style_dict[attr])
+    def merged_cell_style(
+        self, style: Style, top: bool, bottom: bool, left: bool, right: bool, is_first: bool
+    ) -> Style:
+        """
+        Style of single cell inside merged range:
+        first cell has alignment and font of merged range, other cells have border only.
+        Styles are reused, so workbook style arrays are looked up by already hashed style.
+
+        >>> stylist = Stylist()
+        >>> style = Style(font=Font(bold=True))
+        >>> merged_style = stylist.merged_cell_style(style, True, True, True, False, is_first=True)
+        >>> merged_style.font.bold
+        True
+        >>> merged_style is stylist.merged_cell_style(style, True, True, True, False, is_first=True)
+        True
+        """
+        key = (style, top, bottom, left, right, is_first)
+        merged_style = self._merged_styles.get(key)
+        if merged_style is None:
+            border = self.merged_cell_border(style, top, bottom, left, right)
+            if is_first:
+                merged_style = Style(border, style.alignment, style.font)
             else:
-                side = attr.split('-')[1]
-                setattr(final_border, side, self._parse_b_value(self.style_dict[attr]))
-
-        return final_border
-
-    def _parse_b_value(self, b_value: str) -> Side:
-        if b_value == '1px solid black':
-            return Side('thin')
-        if re.match(r'\d+px solid black', b_value):
-            return Side('medium')
-        if b_value == '0' or b_value == 'none':
-            return Side()
+                merged_style = Style(border, font=DEFAULT_FONT)
+            self._merged_styles[key] = merged_style
+        return merged_style
 
+    def merged_cell_border(
+        self, style: Style, top: bool, bottom: bool, left: bool, right: bool
+    ) -> Border:
+        """
+        Border of single cell inside merged range, same as produced by style_merged_cells
 
-def _build_border(style_dict: Dict[str, str]) -> Border:
+        >>> style = Style(border=Border(left=Side("thin"), bottom=Side("medium")))
+        >>> border = Stylist().merged_cell_border(style, top=True, bottom=True, left=False, right=True)
+        >>> border.bottom.style
+        'medium'
+        >>> border.left.style is None
+        True
+        """
+        # same as border of not styled cell
+        border = copy(DEFAULT_BORDER)
+        if top:
+            border = border + Border(top=style.border.top)
+        if bottom:
+            border = border + Border(bottom=style.border.bottom)
+        if left:
+            border = border + Border(left=style.border.left)
+        if right:
+            border = border + Border(right=style.border.right)
+        return border
+
+
+# css border width keywords in pixels
+BORDER_WIDTH_PIXELS = {"thin": 1.0, "medium": 3.0, "thick": 5.0}
+# css border styles drawn as solid line of xlsx side style picked by width
+SOLID_BORDER_STYLES = ("solid", "groove", "ridge", "inset", "outset")
+
+
+def _build_border(declarations: Declarations) -> Border:
     """
-    >>> border = _build_border({"border": "1px solid black"})
+    >>> border = _build_border(parse_declarations("border: 1px solid black"))
     >>> border.left.style
     'thin'
     >>> border.left.style == border.right.style == border.top.style == border.bottom.style
     True
-    >>> border = _build_border({"border-right": "2px solid black"})
-    >>> border.right.style
-    'medium'
-    >>> border = _build_border({"border": "1px solid black", "border-bottom": "0"})
+    >>> border = _build_border(parse_declarations("border-right: 2px solid black"))
+    >>> border.right.style, border.left
+    ('medium', None)
+    >>> border = _build_border(parse_declarations("border: 1px solid black; border-bottom: 0"))
     >>> border.left == border.right == border.top == Side("thin")
     True
     >>> border.bottom == Side()
     True
-    >>> border = _build_border({"border": "1px solid black", "border-top": "none"})
+    >>> border = _build_border(parse_declarations("border: 1px solid black; border-top: none"))
     >>> border.left == border.right == border.bottom == Side("thin")
     True
     >>> border.top == Side()
     True
+    >>> border = _build_border(parse_declarations("border: thick dashed #f00"))
+    >>> border.left.style, border.left.color.rgb
+    ('mediumDashed', '00FF0000')
+    >>> border = _build_border(parse_declarations("border-left-width: wide; border-left-style: solid"))
+    >>> border.left.style
+    'medium'
+    >>> _build_border(parse_declarations("border-left-style: wavy")).left is None
+    True
     """
-    return ParseBorder(style_dict)()
+    return Border(**{side: _build_side(declarations, side) for side in BOX_SIDES})
+
+
+def _build_side(declarations: Declarations, side: str) -> Optional[Side]:
+    """Side of border, None if side is not styled, so it is taken from default style"""
+    style = declarations.get(f"border-{side}-style")
+    if style is None:
+        return None
+    style = style.lower()
+    if style in ("none", "hidden"):
+        return Side()
+
+    width = declarations.get(f"border-{side}-width", "medium").lower()
+    pixels = BORDER_WIDTH_PIXELS.get(width)
+    if pixels is None:
+        pixels = parse_length(width)
+    if pixels is None:
+        # unsupported width is skipped like not set one
+        pixels = BORDER_WIDTH_PIXELS["medium"]
+    if not pixels:
+        return Side()
+
+    # colors like currentcolor or transparent fall back to default border color
+    color = parse_color(declarations.get(f"border-{side}-color"))
+
+    if style in SOLID_BORDER_STYLES:
+        side_style = "thin" if pixels <= 1 else "medium" if pixels <= 3 else "thick"
+    elif style == "dashed":
+        side_style = "dashed" if pixels <= 1 else "mediumDashed"
+    elif style in ("dotted", "double"):
+        side_style = style
+    else:
+        # unsupported style is skipped like not set one
+        return None
 
+    # black is default color of xlsx border, so it is not written
+    return Side(side_style, color=None if color == "000000" else color)
 
-def _build_alignment(style_dict: Dict) -> Alignment:
+
+def _build_alignment(declarations: Declarations) -> Alignment:
     """
     >>> _build_alignment({'vertical-align': 'super'})
     Traceback (most recent call last):
     ...
     AssertionError: vertical-align should be in ('top', 'center', 'bottom', 'justify', 'distributed'), got: super
     """
-    h_align = style_dict.get("text-align")
+    h_align = declarations.get("text-align")
     # html-v-align: baseline | sub | super | text-top | text-bottom | middle | top | bottom | <percentage> | <length>
     # xlsx-v-align: "top", "center", "bottom", "justify", "distributed",
-    v_align = style_dict.get('vertical-align')
+    v_align = declarations.get('vertical-align')
     if v_align:
         if v_align == 'middle':
             v_align = 'center'
@@ -208,7 +401,7 @@ def _build_alignment(style_dict: Dict) -> Alignment:
 
 
     wrap_text: Optional[bool]
-    word_wrap = style_dict.get("word-wrap")
+    word_wrap = declarations.get("word-wrap")
     if word_wrap == "break-word":
         wrap_text = True
     elif word_wrap == "normal":
@@ -220,19 +413,33 @@ def _build_alignment(style_dict: Dict) -> Alignment:
     return alignment
 
 
-def _build_font(style_dict: Dict) -> Font:
+def _build_font(declarations: Declarations) -> Font:
     """
     >>> _build_font({'font-size': '8px'}).size == 8
     True
+    >>> font = _build_font(parse_declarations("font: italic 600 12pt 'Times New Roman', serif; color: red"))
+    >>> font.name, font.size, font.bold, font.italic, font.color.rgb
+    ('Times New Roman', 12.0, True, True, '00FF0000')
     """
-    bold = style_dict.get("font-weight") == "bold"
+    weight = declarations.get("font-weight", "").lower()
+    bold = weight in ("bold", "bolder") or (weight.isdigit() and int(weight) >= 600)
 
-    size: Optional[int] = None
-    size_str = style_dict.get('font-size')
-    if size_str:
-        size = int(re.findall(r'(\d+)px', size_str)[0])
+    font_data: Dict[str, Any] = {}
+    size_pixels = parse_length(declarations.get('font-size'))
+    if size_pixels:
+        # sizes in px are taken as points, so 8px font is 8pt in xlsx
+        pt = declarations['font-size'].strip().lower().endswith("pt")
+        font_data["size"] = size_pixels * 3 / 4 if pt else size_pixels
 
-    return Font(
-        bold=bold,
-        size=size,
-    )
+    if declarations.get("font-style", "").lower() in ("italic", "oblique"):
+        font_data["italic"] = True
+
+    family = declarations.get("font-family")
+    if family:
+        font_data["name"] = family.split(",")[0].strip().strip("\"'")
+
+    color = parse_color(declarations.get("color"))
+    if color:
+        font_data["color"] = color
+
+    return Font(bold=bold, **font_data)
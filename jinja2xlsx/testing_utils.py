@@ -1,8 +1,18 @@
+import io
+import math
 import os
+import re
+import threading
+import time
+from collections import Counter
 from contextlib import contextmanager
-from typing import List, Tuple, Iterator, TextIO
+from copy import copy
+from dataclasses import dataclass, field
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Tuple, Iterator, TextIO
 
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 
 from jinja2xlsx.config import TEST_DATA_DIR
 
@@ -19,3 +29,99 @@ def read_from_test_dir(file_: str) -> Iterator[TextIO]:
 
 def get_wb_values(wb: Workbook) -> List[Tuple]:
     return list(wb.active.values)
+
+
+def get_wb_styles(wb: Workbook) -> List[Tuple]:
+    return [
+        (copy(cell.border), copy(cell.font), copy(cell.alignment))
+        for row in wb.active.iter_rows()
+        for cell in row
+    ]
+
+
+def reload_wb(wb: Workbook) -> Workbook:
+    stream = io.BytesIO()
+    wb.save(stream)
+    return load_workbook(stream)
+
+
+def assert_same_wb(actual_wb: Workbook, expected_wb: Workbook) -> None:
+    # styles are compared after save and load, since default styles differ in memory
+    actual_wb, expected_wb = reload_wb(actual_wb), reload_wb(expected_wb)
+    actual_sheet, expected_sheet = actual_wb.active, expected_wb.active
+
+    assert get_wb_values(actual_wb) == get_wb_values(expected_wb)
+    assert get_wb_styles(actual_wb) == get_wb_styles(expected_wb)
+    assert actual_sheet.merged_cells == expected_sheet.merged_cells
+    assert len(actual_sheet._images) == len(expected_sheet._images)
+    for key, row_dimension in expected_sheet.row_dimensions.items():
+        assert actual_sheet.row_dimensions[key].height == row_dimension.height
+    for key, column_dimension in expected_sheet.column_dimensions.items():
+        assert actual_sheet.column_dimensions[key].width == column_dimension.width
+
+
+def generate_table_html(rows: int, columns: int = 5) -> str:
+    body = "".join(
+        "<tr>"
+        + "".join(
+            f'<td style="border: 1px solid black">{row}.{col}</td>' for col in range(columns)
+        )
+        + "</tr>"
+        for row in range(rows)
+    )
+    return f"<table><tbody>{body}</tbody></table>"
+
+
+def scale_table_html(html_str: str, rows: int) -> str:
+    """
+    Repeat tbody rows until table has at least given number of rows
+
+    >>> scale_table_html("<table><tbody><tr><td>1</td></tr></tbody></table>", 3)
+    '<table><tbody><tr><td>1</td></tr><tr><td>1</td></tr><tr><td>1</td></tr></tbody></table>'
+    """
+    body_match = re.search(r"<tbody[^>]*>([\s\S]*)</tbody>", html_str)
+    assert body_match
+    body = body_match.group(1)
+    repeats = math.ceil(rows / max(body.count("<tr"), 1))
+    head, tail = html_str[: body_match.start(1)], html_str[body_match.end(1) :]  # noqa: E203
+    return head + body * repeats + tail
+
+
+@dataclass
+class RequestLog:
+    # request path => requests count
+    paths: Counter = field(default_factory=Counter)
+    in_flight: int = 0
+    max_in_flight: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@contextmanager
+def serve_test_dir(delay: float = 0) -> Iterator[Tuple[str, RequestLog]]:
+    """Serve test_data dir via local http server, yields base url and log of served requests"""
+    log = RequestLog()
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self) -> None:
+            with log.lock:
+                log.paths[self.path] += 1
+                log.in_flight += 1
+                log.max_in_flight = max(log.max_in_flight, log.in_flight)
+            try:
+                time.sleep(delay)
+                super().do_GET()
+            finally:
+                with log.lock:
+                    log.in_flight -= 1
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=TEST_DATA_DIR))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", log
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,301 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# https://developer.mozilla.org/en-US/docs/Web/HTML/Inline_elements#Elements
+INLINE_TAGS = {
+    'a', 'abbr', 'acronym', 'b', 'bdo', 'big', 'br', 'button', 'cite',
+    'code', 'dfn', 'em', 'i', 'img', 'input', 'kbd', 'label', 'map',
+    'object', 'q', 'samp', 'script', 'select', 'small', 'span', 'strong',
+    'sub', 'sup', 'textarea', 'time', 'tt', 'var',
+}  # fmt: skip
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+ROW_GROUP_TAGS = {'thead', 'tbody', 'tfoot'}
+CELL_TAGS = {'td', 'th'}
+TABLE_STRUCTURE_TAGS = {'tr', 'col', 'colgroup', 'caption'} | CELL_TAGS | ROW_GROUP_TAGS
+WHITESPACE_RE = re.compile('[\x20\x09\x0c\u200b\x0a\x0d]+')
+# compound selector part: tag, #id, .class, [attr] or [attr=value]
+SELECTOR_PART_RE = re.compile(
+    r"(?P<tag>^[\w-]+)|#(?P<id>[\w-]+)|\.(?P<class>[\w-]+)"
+    r"|\[(?P<attr>[\w-]+)(?:=[\"']?(?P<value>[^\"'\]]*)[\"']?)?\]"
+)
+
+# text part is str, None is block boundary, True is line break
+TextPart = Union[str, None, bool]
+
+
+class HtmlElement:
+    """
+    Lightweight element produced by TableTokenizer,
+    has the same tag / attrs / text interface as requests_html Element
+    """
+
+    __slots__ = ("tag", "attrs", "text", "children")
+
+    def __init__(self, tag: str, attrs: Dict[str, str]) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.text = ""
+        self.children: List[HtmlElement] = []
+
+    def __repr__(self) -> str:
+        return f"<HtmlElement {self.tag!r} attrs={self.attrs!r}>"
+
+
+class HtmlTable(HtmlElement):
+    """Table element with its rows, colgroup columns and caption"""
+
+    __slots__ = ("rows", "columns", "caption")
+
+    def __init__(self, attrs: Dict[str, str]) -> None:
+        super().__init__("table", attrs)
+        self.rows: List[HtmlElement] = []
+        self.columns: List[HtmlElement] = []
+        self.caption: Optional[HtmlElement] = None
+
+
+class TableTokenizer(HTMLParser):
+    """
+    Single-pass tokenizer of html tables:
+    emits tables with rows (with cells, cell text and images) and colgroup columns,
+    nested tables are part of their cell text. Same as requests_html Parser,
+    th cells of row are before td ones and rows of tfoot are skipped.
+    Texts of <style> blocks are collected to styles.
+    Html can be fed by chunks, completed rows are available in rows right after their end tag.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tables: List[HtmlTable] = []
+        self.styles: List[str] = []
+
+        self._table: Optional[HtmlTable] = None
+        self._table_depth = 0
+        self._skip_text_depth = 0
+        self._row: Optional[HtmlElement] = None
+        self._cell: Optional[HtmlElement] = None
+        self._text_parts: List[TextPart] = []
+        self._in_style = False
+        self._in_tfoot = False
+
+    @property
+    def table_found(self) -> bool:
+        return bool(self.tables)
+
+    @property
+    def table_closed(self) -> bool:
+        """First table is completely tokenized"""
+        return self.table_found and self.tables[0] is not self._table
+
+    @property
+    def rows(self) -> List[HtmlElement]:
+        """Rows of first table"""
+        return self.tables[0].rows if self.tables else []
+
+    @property
+    def columns(self) -> List[HtmlElement]:
+        """Columns of first table"""
+        return self.tables[0].columns if self.tables else []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "style":
+            self._in_style = True
+            self.styles.append("")
+        if tag == "table":
+            self._table_depth += 1
+            if self._table_depth == 1:
+                self._table = HtmlTable(_to_dict(attrs))
+                self.tables.append(self._table)
+                return
+
+        if self._table_depth == 1 and (self._cell is None or tag in TABLE_STRUCTURE_TAGS):
+            self._handle_table_starttag(tag, attrs)
+        elif self._cell is not None:
+            self._handle_cell_starttag(tag, attrs)
+
+    def _handle_table_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        assert self._table is not None
+
+        if tag == "caption":
+            self._close_row()
+            self._cell = HtmlElement(tag, _to_dict(attrs))
+        elif tag == "tr":
+            self._close_row()
+            self._row = HtmlElement(tag, _to_dict(attrs))
+        elif tag in CELL_TAGS:
+            self._close_cell()
+            if self._row is None:
+                self._row = HtmlElement("tr", {})
+            self._cell = HtmlElement(tag, _to_dict(attrs))
+        elif tag == "col":
+            self._table.columns.append(HtmlElement(tag, _to_dict(attrs)))
+        elif tag in ROW_GROUP_TAGS:
+            self._close_row()
+            self._in_tfoot = tag == "tfoot"
+
+    def _handle_cell_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        assert self._cell is not None
+
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_text_depth += 1
+        if tag == "img":
+            self._cell.children.append(HtmlElement(tag, _to_dict(attrs)))
+
+        if tag == "br":
+            self._text_parts.append(True)
+        elif tag not in INLINE_TAGS:
+            self._text_parts.append(None)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "style":
+            self._in_style = False
+        if not self._table_depth:
+            return
+
+        if tag == "table":
+            self._table_depth -= 1
+            if not self._table_depth:
+                self._close_row()
+                self._table = None
+                self._in_tfoot = False
+                return
+
+        if self._table_depth == 1:
+            if tag in CELL_TAGS or tag == "caption":
+                self._close_cell()
+                return
+            if tag == "tr" or tag in ROW_GROUP_TAGS:
+                self._close_row()
+                if tag == "tfoot":
+                    self._in_tfoot = False
+                return
+
+        if self._cell is not None:
+            if tag in SKIPPED_TEXT_TAGS:
+                self._skip_text_depth = max(self._skip_text_depth - 1, 0)
+            if tag not in INLINE_TAGS:
+                self._text_parts.append(None)
+
+    def handle_data(self, data: str) -> None:
+        if self._in_style:
+            # style text may be fed by chunks
+            self.styles[-1] += data
+            return
+        if self._cell is not None and not self._skip_text_depth:
+            self._text_parts.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._close_row()
+
+    def _close_cell(self) -> None:
+        if self._cell is None:
+            return
+
+        self._cell.text = join_text_parts(self._text_parts)
+        if self._cell.tag == "caption":
+            assert self._table is not None
+            self._table.caption = self._cell
+        else:
+            assert self._row is not None
+            self._row.children.append(self._cell)
+        self._cell = None
+        self._text_parts = []
+        self._skip_text_depth = 0
+
+    def _close_row(self) -> None:
+        self._close_cell()
+        if self._row is None:
+            return
+
+        assert self._table is not None
+        if not self._in_tfoot:
+            # stable sort, so th and td cells keep their order
+            self._row.children.sort(key=lambda cell: cell.tag != "th")
+            self._table.rows.append(self._row)
+        self._row = None
+
+
+def join_text_parts(parts: Sequence[TextPart]) -> str:
+    """
+    Same as pyquery text extraction: squash whitespaces, block elements are separated by newline
+
+    >>> join_text_parts(["  Total\\n  sum ", None, "10", None])
+    'Total sum\\n10'
+    >>> join_text_parts(["a", True, "b"])
+    'a\\nb'
+    >>> join_text_parts([None, "  ", None])
+    ''
+    """
+    output: List[TextPart] = []
+    buffer: List[str] = []
+
+    def flush() -> None:
+        text = WHITESPACE_RE.sub(" ", "".join(buffer)).strip()
+        if text:
+            output.append(text)
+        buffer.clear()
+
+    for part in parts:
+        if isinstance(part, str):
+            buffer.append(part)
+        else:
+            flush()
+            # squash repeating block boundaries
+            if part is True or not output or output[-1] is not None:
+                output.append(part)
+    flush()
+
+    # strip leading and trailing boundaries
+    while output and not isinstance(output[0], str):
+        output.pop(0)
+    while output and not isinstance(output[-1], str):
+        output.pop()
+
+    return "".join(part if isinstance(part, str) else "\n" for part in output).strip()
+
+
+def match_selector(element: HtmlElement, selector: str) -> bool:
+    """
+    Match element by comma separated compound selectors of tag, #id, .class, [attr], [attr=value]
+
+    >>> table = HtmlElement("table", {"class": "report wide", "data-sheet-name": "Sales"})
+    >>> match_selector(table, "table.report")
+    True
+    >>> match_selector(table, "#totals, [data-sheet-name=Sales]")
+    True
+    >>> match_selector(table, "table.narrow")
+    False
+    >>> match_selector(table, "div table")
+    Traceback (most recent call last):
+    ...
+    ValueError: Unsupported selector: div table
+    """
+    return any(
+        _match_compound_selector(element, compound_selector.strip())
+        for compound_selector in selector.split(",")
+    )
+
+
+def _match_compound_selector(element: HtmlElement, selector: str) -> bool:
+    parts = list(SELECTOR_PART_RE.finditer(selector))
+    if not selector or "".join(part.group(0) for part in parts) != selector:
+        raise ValueError(f"Unsupported selector: {selector}")
+
+    for part in parts:
+        if part["tag"] and part["tag"] != element.tag:
+            return False
+        if part["id"] and element.attrs.get("id") != part["id"]:
+            return False
+        if part["class"] and part["class"] not in element.attrs.get("class", "").split():
+            return False
+        if part["attr"] and (
+            part["attr"] not in element.attrs
+            or (part["value"] is not None and element.attrs[part["attr"]] != part["value"])
+        ):
+            return False
+    return True
+
+
+def _to_dict(attrs: List[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+    return {name: value or "" for name, value in attrs}
@@ -1,12 +1,10 @@
 import re
-from typing import Dict, Optional, Any, Tuple, Iterable
+from typing import Dict, Any, Tuple
 
 from openpyxl.cell import Cell
 from openpyxl.utils import get_column_letter
-from requests_html import Element
 
 CellRange = Tuple[Tuple[Cell]]
-CellGenerator = Iterable[Tuple[Element, Optional[Cell], Optional[CellRange]]]
 
 
 def union_dicts(dict_1: Dict, dict_2: Dict, with_none_drop: bool = True) -> Dict:
@@ -22,19 +20,6 @@ def union_dicts(dict_1: Dict, dict_2: Dict, with_none_drop: bool = True) -> Dict
     return {**dict_1, **new_dict_2}
 
 
-def try_extract_pixels(pixel_str: Optional[str]) -> Optional[float]:
-    """
-    >>> try_extract_pixels("100px")
-    100.0
-    >>> try_extract_pixels("") is None
-    True
-    """
-    if not pixel_str:
-        return None
-
-    return float(re.findall(r"(\d+)px", pixel_str)[0])
-
-
 def parse_cell_value(cell_text: str) -> Any:
     """
     >>> parse_cell_value("") is None
@@ -60,6 +45,14 @@ def parse_cell_value(cell_text: str) -> Any:
     return cell_text
 
 
+def create_cell_coordinate(col_index: int, row_index: int) -> str:
+    """
+    >>> create_cell_coordinate(1, 0)
+    'B1'
+    """
+    return f"{get_column_letter(col_index + 1)}{row_index + 1}"
+
+
 def create_cell_range_str(col_index: int, colspan: int, row_index: int, rowspan: int) -> str:
     start_column = get_column_letter(col_index + 1)
     start_row = row_index + 1
@@ -69,6 +62,18 @@ def create_cell_range_str(col_index: int, colspan: int, row_index: int, rowspan:
     return cell_range
 
 
+def create_sheet_title(name: str) -> str:
+    """
+    Remove chars which are not allowed in sheet title, title is limited by 31 chars
+
+    >>> create_sheet_title("Sales: 2020/2021 [draft]")
+    'Sales 20202021 draft'
+    >>> len(create_sheet_title("Sales" * 10))
+    31
+    """
+    return re.sub(r"[\\/*?:\[\]]", "", name).strip()[:31]
+
+
 def width_pixels_to_xlsx_units(pixels: float) -> float:
     return pixels / 7.5
 
@@ -0,0 +1,248 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from jinja2xlsx.config import Config
+from jinja2xlsx.layout import RowLayout
+from jinja2xlsx.utils import parse_cell_value
+
+# first rows of table used to pick converter of each column
+TYPE_SAMPLE_ROWS = 100
+
+CURRENCY_SYMBOLS = "$€£¥₽"
+MINUS_SIGNS = "-−"
+# first chars (besides decimal separator) of texts which can be converted,
+# other texts are kept as is without checks
+NUMBER_START_CHARS = frozenset("0123456789" + MINUS_SIGNS + CURRENCY_SYMBOLS)
+
+
+# value, excel number format (general if None), plain tuple is cheaper than named one per cell
+TypedValue = Tuple[Any, Optional[str]]
+
+Converter = Callable[[str], Optional[TypedValue]]
+
+
+class ValueConverters:
+    """
+    Converters of cell text to typed value, each returns None if text is not of its type.
+    Converters match disjoint sets of texts, so converter picked for column never changes result.
+
+    >>> converters = ValueConverters(decimal_separator=",")
+    >>> converters.detect("−1 234,50 ₽")
+    (-1234.5, '#,##0.00" ₽"')
+    >>> converters.detect("12,5%")
+    (0.125, '0.0%')
+    >>> converters.detect("02.01.2020 15:30")
+    (datetime.datetime(2020, 1, 2, 15, 30), 'dd.mm.yyyy hh:mm')
+    >>> converters.detect("+7 (999) 999-99-99")
+    ('+7 (999) 999-99-99', None)
+    """
+
+    def __init__(self, decimal_separator: str = ".") -> None:
+        self.decimal_separator = decimal_separator
+        # fraction can start text, like ".5"
+        self.start_chars = NUMBER_START_CHARS | {decimal_separator}
+        thousands_separators = re.escape(".,".replace(decimal_separator, "") + " \xa0\u202f")
+        number = (
+            rf"(?P<sign>[{MINUS_SIGNS}])?"
+            rf"(?P<integer>\d{{1,3}}(?P<thousands>[{thousands_separators}])\d{{3}}"
+            rf"(?:(?P=thousands)\d{{3}})*|\d+)"
+            rf"(?:{re.escape(decimal_separator)}(?P<fraction>\d+))?"
+        )
+        self._decimal_re = re.compile(
+            rf"(?P<prefix>[{CURRENCY_SYMBOLS}]\s?)?{number}(?P<suffix>\s?[{CURRENCY_SYMBOLS}])?"
+        )
+        self._percent_re = re.compile(rf"{number}\s?%")
+        self._date_re = re.compile(
+            r"(?:(?P<year>\d{4})-(?P<month>\d\d)-(?P<day>\d\d)"
+            r"|(?P<dotted_day>\d\d)\.(?P<dotted_month>\d\d)\.(?P<dotted_year>\d{4}))"
+            r"(?:[ T](?P<hour>\d\d):(?P<minute>\d\d)(?::(?P<second>\d\d))?)?"
+        )
+        # order of detection, text is kept as is if no converter matches
+        self.converters: Sequence[Converter] = (
+            self.int_value,
+            self.float_value,
+            self.decimal_value,
+            self.percent_value,
+            self.date_value,
+        )
+
+    def detect(self, text: str) -> TypedValue:
+        if not text:
+            return None, None
+        if text[0] not in self.start_chars:
+            return text, None
+
+        for converter in self.converters:
+            typed_value = converter(text)
+            if typed_value is not None:
+                return typed_value
+        return text, None
+
+    def pick(self, texts: Sequence[str]) -> Optional[Converter]:
+        """Converter matching most of texts, None if no converter matches"""
+        best_converter, best_matches = None, 0
+        for converter in self.converters:
+            matches = sum(converter(text) is not None for text in texts)
+            if matches > best_matches:
+                best_converter, best_matches = converter, matches
+        return best_converter
+
+    def int_value(self, text: str) -> Optional[TypedValue]:
+        digits = text[1:] if text[0] in MINUS_SIGNS else text
+        if not (digits.isascii() and digits.isdigit()):
+            return None
+        try:
+            value = int(digits)
+        except ValueError:  # too long to be converted
+            return None
+        return -value if digits is not text else value, None
+
+    def float_value(self, text: str) -> Optional[TypedValue]:
+        """
+        >>> converters = ValueConverters()
+        >>> converters.float_value("-1.5"), converters.float_value(".5"), converters.float_value("5.")
+        ((-1.5, None), (0.5, None), (5.0, None))
+        >>> converters.float_value(".") is None
+        True
+        """
+        integer, separator, fraction = text.partition(self.decimal_separator)
+        digits = integer[1:] if integer[:1] in MINUS_SIGNS else integer
+        # integer or fraction can be omitted, same as without type inference
+        number = digits + fraction
+        if not separator or not (number.isascii() and number.isdigit()):
+            return None
+        value = float(f"{digits}.{fraction}")
+        return -value if digits is not integer else value, None
+
+    def decimal_value(self, text: str) -> Optional[TypedValue]:
+        """Number with thousands separators or currency symbol"""
+        match = self._decimal_re.fullmatch(text)
+        if not match or not (match["thousands"] or match["prefix"] or match["suffix"]):
+            return None
+        if match["prefix"] and match["suffix"]:
+            return None
+
+        number_format = _number_format(match)
+        if match["prefix"]:
+            number_format = f'"{match["prefix"]}"{number_format}'
+        if match["suffix"]:
+            number_format = f'{number_format}"{match["suffix"]}"'
+        return _number_value(match), number_format
+
+    def percent_value(self, text: str) -> Optional[TypedValue]:
+        match = self._percent_re.fullmatch(text)
+        if not match:
+            return None
+        return _number_value(match) / 100, f"{_number_format(match)}%"
+
+    def date_value(self, text: str) -> Optional[TypedValue]:
+        match = self._date_re.fullmatch(text)
+        if not match:
+            return None
+
+        if match["year"]:
+            year, month, day = match["year"], match["month"], match["day"]
+            number_format = "yyyy-mm-dd"
+        else:
+            year, month, day = match["dotted_year"], match["dotted_month"], match["dotted_day"]
+            number_format = "dd.mm.yyyy"
+
+        try:
+            if match["hour"] is None:
+                return date(int(year), int(month), int(day)), number_format
+
+            number_format += " hh:mm:ss" if match["second"] else " hh:mm"
+            value = datetime(
+                int(year),
+                int(month),
+                int(day),
+                int(match["hour"]),
+                int(match["minute"]),
+                int(match["second"] or 0),
+            )
+        except ValueError:  # not existing date like 31.02.2020
+            return None
+        return value, number_format
+
+
+def _number_value(match: "re.Match[str]") -> float:
+    integer = int(re.sub(r"\D", "", match["integer"]))
+    value = float(f"{integer}.{match['fraction']}") if match["fraction"] else integer
+    return -value if match["sign"] else value
+
+
+def _number_format(match: "re.Match[str]") -> str:
+    number_format = "#,##0" if match["thousands"] else "0"
+    if match["fraction"]:
+        number_format += "." + "0" * len(match["fraction"])
+    return number_format
+
+
+@lru_cache()
+def get_converters(decimal_separator: str) -> ValueConverters:
+    return ValueConverters(decimal_separator)
+
+
+@dataclass
+class ValueParser:
+    """
+    Converts cell texts of table to typed values.
+    If Config.infer_types is set, converter of each column is picked once by first rows,
+    and cells are tried by it first, so most cells are converted without detection.
+
+    >>> value_parser = ValueParser(Config(infer_types=True))
+    >>> value_parser.parse("1,234.5", col_index=0)
+    (1234.5, '#,##0.0')
+    >>> ValueParser(Config()).parse("1,234.5", col_index=0)
+    ('1,234.5', None)
+    """
+
+    config: Config
+    _column_converters: Dict[int, Converter] = field(default_factory=dict, repr=False)
+    _strings: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.converters = get_converters(self.config.decimal_separator)
+
+    def infer(self, row_layouts: Iterator[RowLayout]) -> Iterator[RowLayout]:
+        """Pick converter of each column by sample of first rows, all rows are passed through"""
+        if not self.config.infer_types:
+            return row_layouts
+
+        sample = list(islice(row_layouts, TYPE_SAMPLE_ROWS))
+        column_texts: Dict[int, List[str]] = defaultdict(list)
+        for row_layout in sample:
+            for placed_cell in row_layout.cells:
+                text = placed_cell.html_cell.text
+                if text and text[0] in self.converters.start_chars:
+                    column_texts[placed_cell.col_index].append(text)
+
+        for col_index, texts in column_texts.items():
+            converter = self.converters.pick(texts)
+            if converter is not None:
+                self._column_converters[col_index] = converter
+        return chain(sample, row_layouts)
+
+    def parse(self, text: str, col_index: int) -> TypedValue:
+        if not self.config.infer_types:
+            value, number_format = parse_cell_value(text), None
+        else:
+            value, number_format = self._convert(text, col_index)
+
+        if self.config.shared_strings and type(value) is str:
+            # equal strings of table share one object, as they share entry of shared string table
+            value = self._strings.setdefault(value, value)
+        return value, number_format
+
+    def _convert(self, text: str, col_index: int) -> TypedValue:
+        converter = self._column_converters.get(col_index)
+        if converter is not None and text:
+            typed_value = converter(text)
+            if typed_value is not None:
+                return typed_value
+        return self.converters.detect(text)
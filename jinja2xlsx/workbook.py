@@ -0,0 +1,226 @@
+import datetime
+from typing import Any, BinaryIO, List, Optional, Union
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell
+from openpyxl.cell._writer import write_cell
+from openpyxl.comments.comment_sheet import CommentRecord
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.extended import ExtendedProperties
+from openpyxl.packaging.relationship import Relationship
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.workbook._writer import WorkbookWriter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.constants import (
+    ARC_APP,
+    ARC_CORE,
+    ARC_CUSTOM,
+    ARC_ROOT_RELS,
+    ARC_SHARED_STRINGS,
+    ARC_STYLE,
+    ARC_THEME,
+    ARC_WORKBOOK,
+    ARC_WORKBOOK_RELS,
+    CPROPS_TYPE,
+    SHARED_STRINGS,
+    SHEET_MAIN_NS,
+)
+from openpyxl.xml.functions import Element, SubElement, tostring, whitespace, xmlfile
+
+
+class SharedStringsWorksheetWriter(WorksheetWriter):
+    """
+    Writes string cells as indexes of workbook shared string table instead of inline strings
+    (openpyxl 3.1 writes inline strings, earlier versions used shared string table),
+    so repeated strings are stored in file once
+    """
+
+    def write_row(self, xf: Any, row: List[Cell], row_idx: int) -> None:
+        """Same as openpyxl WorksheetWriter.write_row"""
+        attrs = {'r': f"{row_idx}"}
+        dims = self.ws.row_dimensions
+        attrs.update(dims.get(row_idx, {}))
+
+        with xf.element("row", attrs):
+            for cell in row:
+                if cell._comment is not None:
+                    comment = CommentRecord.from_cell(cell)
+                    self.ws._comments.append(comment)
+                if cell._value is None and not cell.has_style and not cell._comment:
+                    continue
+
+                if cell.data_type == "s" and isinstance(cell._value, str) and cell._value:
+                    self._write_shared_string_cell(xf, cell)
+                else:
+                    write_cell(xf, self.ws, cell, cell.has_style)
+
+    def _write_shared_string_cell(self, xf: Any, cell: Cell) -> None:
+        attrs = {"r": cell.coordinate}
+        if cell.has_style:
+            attrs["s"] = f"{cell.style_id}"
+        attrs["t"] = "s"
+        if cell.hyperlink:
+            self.ws._hyperlinks.append(cell.hyperlink)
+
+        element = Element("c", attrs)
+        SubElement(element, "v").text = f"{self.ws.parent.shared_strings.add(cell._value)}"
+        xf.write(element)
+
+
+class SharedStringsWriteOnlyWorksheet(WriteOnlyWorksheet):
+    """Write-only worksheet which rows are written via SharedStringsWorksheetWriter"""
+
+    _writer: Optional[WorksheetWriter] = None
+
+    def _get_writer(self) -> None:
+        if self._writer is None:
+            writer = SharedStringsWorksheetWriter(self)
+            writer.write_top()
+            self._writer = writer
+
+
+class SharedStringsPart:
+    path = f"/{ARC_SHARED_STRINGS}"
+    mime_type = SHARED_STRINGS
+
+
+class SharedStringsWorkbookWriter(WorkbookWriter):
+    def write_rels(self) -> bytes:
+        self.rels.append(Relationship(type="sharedStrings", Target="sharedStrings.xml"))
+        return super().write_rels()
+
+
+class MediaExcelWriter(ExcelWriter):
+    """
+    Writes each media part once, so images with same path share it.
+    If workbook uses shared strings, string cells refer to shared string table.
+    """
+
+    workbook: "MediaWorkbook"
+
+    def write_data(self) -> None:
+        """Same as openpyxl ExcelWriter.write_data, but shared string table is written"""
+        archive = self._archive
+
+        props = ExtendedProperties()
+        archive.writestr(ARC_APP, tostring(props.to_tree()))
+
+        archive.writestr(ARC_CORE, tostring(self.workbook.properties.to_tree()))
+        if self.workbook.loaded_theme:
+            archive.writestr(ARC_THEME, self.workbook.loaded_theme)
+        else:
+            archive.writestr(ARC_THEME, theme_xml)
+
+        if len(self.workbook.custom_doc_props) >= 1:
+            archive.writestr(ARC_CUSTOM, tostring(self.workbook.custom_doc_props.to_tree()))
+
+            class CustomOverride:
+                path = "/" + ARC_CUSTOM
+                mime_type = CPROPS_TYPE
+
+            self.manifest.append(CustomOverride())
+
+        self._write_worksheets()
+        self._write_chartsheets()
+        self._write_images()
+        self._write_charts()
+
+        self._write_external_links()
+        # strings are added to table while worksheets are written
+        has_shared_strings = self._write_shared_strings()
+
+        stylesheet = write_stylesheet(self.workbook)
+        archive.writestr(ARC_STYLE, tostring(stylesheet))
+
+        writer = (
+            SharedStringsWorkbookWriter(self.workbook)
+            if has_shared_strings
+            else WorkbookWriter(self.workbook)
+        )
+        archive.writestr(ARC_ROOT_RELS, writer.write_root_rels())
+        archive.writestr(ARC_WORKBOOK, writer.write())
+        archive.writestr(ARC_WORKBOOK_RELS, writer.write_rels())
+
+        self._merge_vba()
+
+        self.manifest._write(archive, self.workbook)
+
+    def write_worksheet(self, ws: Worksheet) -> None:
+        """Same as openpyxl ExcelWriter.write_worksheet, but with shared strings writer"""
+        if self.workbook.write_only or not self.workbook.use_shared_strings:
+            super().write_worksheet(ws)
+            return
+
+        ws._drawing = SpreadsheetDrawing()
+        ws._drawing.charts = ws._charts
+        ws._drawing.images = ws._images
+        writer = SharedStringsWorksheetWriter(ws)
+        writer.write()
+
+        ws._rels = writer._rels
+        self._archive.write(writer.out, ws.path[1:])
+        self.manifest.append(ws)
+        writer.cleanup()
+
+    def _write_shared_strings(self) -> bool:
+        shared_strings = self.workbook.shared_strings
+        if not shared_strings:
+            return False
+
+        # strings are streamed to archive, so table is not serialized in memory at once
+        with self._archive.open(ARC_SHARED_STRINGS, "w") as part, xmlfile(part) as xf:
+            with xf.element("sst", xmlns=SHEET_MAIN_NS, uniqueCount=f"{len(shared_strings)}"):
+                for string in shared_strings:
+                    element = Element("si")
+                    text = SubElement(element, "t")
+                    text.text = string
+                    whitespace(text)
+                    xf.write(element)
+
+        self.manifest.append(SharedStringsPart())
+        return True
+
+    def _write_images(self) -> None:
+        written_paths = set()
+        for image in self._images:
+            if image.path in written_paths:
+                continue
+            self._archive.writestr(image.path[1:], image._data())
+            written_paths.add(image.path)
+
+
+class MediaWorkbook(Workbook):
+    """
+    Workbook which is saved via MediaExcelWriter.
+    If use_shared_strings is set, strings are written to shared string table.
+    """
+
+    def __init__(self, write_only: bool = False, use_shared_strings: bool = True) -> None:
+        super().__init__(write_only=write_only)
+        self.use_shared_strings = use_shared_strings
+
+    def create_sheet(self, title: Optional[str] = None, index: Optional[int] = None) -> Any:
+        if not (self.write_only and self.use_shared_strings):
+            return super().create_sheet(title, index)
+
+        sheet = SharedStringsWriteOnlyWorksheet(parent=self, title=title)
+        self._add_sheet(sheet=sheet, index=index)
+        return sheet
+
+    def save(self, filename: Union[str, BinaryIO]) -> None:
+        """Same as openpyxl save_workbook"""
+        if self.read_only:
+            raise TypeError("""Workbook is read-only""")
+        if self.write_only and not self.worksheets:
+            self.create_sheet()
+
+        archive = ZipFile(filename, 'w', ZIP_DEFLATED, allowZip64=True)
+        self.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(
+            tzinfo=None
+        )
+        MediaExcelWriter(self, archive).save()
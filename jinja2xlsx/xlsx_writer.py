@@ -0,0 +1,466 @@
+import mimetypes
+from itertools import islice
+from typing import Any, BinaryIO, Dict, IO, List, Optional, Sequence, Set, Tuple, Union, cast
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZIP_DEFLATED, ZipFile
+
+# constants and helpers below are openpyxl internals, checked against openpyxl 3.1.2+
+# (pyproject.toml requires ^3.1.2), xml they produce is the same as openpyxl writes
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE, TIME_TYPES
+from openpyxl.compat import NUMERIC_TYPES, safe_string
+from openpyxl.drawing.image import Image
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import get_rels_path
+from openpyxl.styles import Alignment, Border, Font, DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.constants import (
+    ARC_CONTENT_TYPES,
+    ARC_ROOT_RELS,
+    ARC_SHARED_STRINGS,
+    ARC_STYLE,
+    ARC_THEME,
+    ARC_WORKBOOK,
+    ARC_WORKBOOK_RELS,
+    CONTYPES_NS,
+    DRAWING_TYPE,
+    PKG_REL_NS,
+    REL_NS,
+    SHARED_STRINGS,
+    SHEET_MAIN_NS,
+    STYLES_TYPE,
+    THEME_TYPE,
+    WORKSHEET_TYPE,
+    XLSX,
+)
+from openpyxl.xml.functions import tostring
+
+from jinja2xlsx.style import Style
+from jinja2xlsx.utils import create_sheet_title
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# buffered sheet xml is written to archive by chunks of this size
+FLUSH_SIZE = 64 * 1024
+
+# cell value and style id, None for columns without cell
+SheetCell = Optional[Tuple[Any, int]]
+
+
+class StyleTable:
+    """
+    Distinct fonts, borders, alignments and number formats of written cells,
+    each distinct combination is single cell style (xf) referenced by cells by id
+
+    >>> styles = StyleTable()
+    >>> style = Style(font=Font(bold=True))
+    >>> styles.style_id(style), styles.style_id(style), styles.style_id(style, "0.00%")
+    (1, 1, 2)
+    """
+
+    def __init__(self) -> None:
+        self.fonts = IndexedList([DEFAULT_FONT])
+        self.borders = IndexedList([DEFAULT_BORDER])
+        self.number_formats: IndexedList = IndexedList()
+        # font id, border id, alignment, number format id of each cell style
+        self.cell_styles: List[Tuple[int, int, Optional[Alignment], int]] = [(0, 0, None, 0)]
+        self._ids: Dict[Tuple[Style, Optional[str]], int] = {}
+
+    def style_id(self, style: Style, number_format: Optional[str] = None) -> int:
+        key = (style, number_format)
+        style_id = self._ids.get(key)
+        if style_id is None:
+            alignment = style.alignment if style.alignment != Alignment() else None
+            self.cell_styles.append(
+                (
+                    self.fonts.add(style.font),
+                    self.borders.add(style.border),
+                    alignment,
+                    self._number_format_id(number_format),
+                )
+            )
+            style_id = self._ids[key] = len(self.cell_styles) - 1
+        return style_id
+
+    def _number_format_id(self, number_format: Optional[str]) -> int:
+        if not number_format:
+            return 0
+        if number_format in BUILTIN_FORMATS_REVERSE:
+            return BUILTIN_FORMATS_REVERSE[number_format]
+        return BUILTIN_FORMATS_MAX_SIZE + self.number_formats.add(number_format)
+
+    def to_xml(self) -> str:
+        parts = [XML_HEADER, f'<styleSheet xmlns="{SHEET_MAIN_NS}">']
+        if self.number_formats:
+            parts.append(f'<numFmts count="{len(self.number_formats)}">')
+            parts += (
+                f'<numFmt numFmtId="{index}" formatCode={quoteattr(number_format)}/>'
+                for index, number_format in enumerate(
+                    self.number_formats, BUILTIN_FORMATS_MAX_SIZE
+                )
+            )
+            parts.append("</numFmts>")
+
+        parts.append(f'<fonts count="{len(self.fonts)}">')
+        parts += (_to_xml(font) for font in self.fonts)
+        parts.append("</fonts>")
+        parts.append(
+            '<fills count="2"><fill><patternFill/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+        )
+        parts.append(f'<borders count="{len(self.borders)}">')
+        parts += (_to_xml(border) for border in self.borders)
+        parts.append("</borders>")
+        parts.append(
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+            "</cellStyleXfs>"
+        )
+
+        parts.append(f'<cellXfs count="{len(self.cell_styles)}">')
+        for font_id, border_id, alignment, number_format_id in self.cell_styles:
+            attrs = f'numFmtId="{number_format_id}" fontId="{font_id}" fillId="0" '
+            attrs += f'borderId="{border_id}" xfId="0"'
+            attrs += ' applyNumberFormat="1"' if number_format_id else ""
+            attrs += ' applyFont="1"' if font_id else ""
+            attrs += ' applyBorder="1"' if border_id else ""
+            if alignment is None:
+                parts.append(f"<xf {attrs}/>")
+            else:
+                parts.append(f'<xf {attrs} applyAlignment="1">{_to_xml(alignment)}</xf>')
+        parts.append("</cellXfs>")
+
+        parts.append(
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            "</styleSheet>"
+        )
+        return "".join(parts)
+
+
+def _to_xml(style_object: Union[Font, Border, Alignment]) -> str:
+    return tostring(style_object.to_tree()).decode()
+
+
+class SheetWriter:
+    """
+    Writes worksheet xml straight to archive part while rows are rendered:
+    column widths should be set before first row, merged ranges and images are written on close
+    """
+
+    def __init__(self, writer: "XlsxWriter", index: int, part: IO[bytes]) -> None:
+        self.writer = writer
+        self.index = index
+        self.images: List[Image] = []
+        self._part = part
+        self._column_widths: Dict[int, float] = {}
+        self._merged_ranges: List[str] = []
+        self._buffer: List[str] = []
+        self._buffer_size = 0
+        self._started = False
+
+    def set_column_width(self, col_index: int, width: float) -> None:
+        assert not self._started, "Column widths should be set before rows are written"
+        self._column_widths[col_index] = width
+
+    def merge_cells(self, cell_range_str: str) -> None:
+        self._merged_ranges.append(cell_range_str)
+
+    def add_image(self, image: Image, anchor: str) -> None:
+        image.anchor = anchor
+        self.images.append(image)
+
+    def write_row(
+        self, row_index: int, cells: Sequence[SheetCell], height: Optional[float] = None
+    ) -> None:
+        if not self._started:
+            self._write_head()
+
+        row_number = row_index + 1
+        row_attrs = f' ht="{height}" customHeight="1"' if height else ""
+        chunks = [f'<row r="{row_number}"{row_attrs}>']
+        for col_index, cell in enumerate(cells):
+            if cell is not None:
+                value, style_id = cell
+                chunks.append(
+                    self._cell_xml(
+                        f"{get_column_letter(col_index + 1)}{row_number}", value, style_id
+                    )
+                )
+        chunks.append("</row>")
+        self._write("".join(chunks))
+
+    def close(self) -> None:
+        if not self._started:
+            self._write_head()
+
+        self._write("</sheetData>")
+        if self._merged_ranges:
+            self._write(f'<mergeCells count="{len(self._merged_ranges)}">')
+            self._write("".join(f'<mergeCell ref="{ref}"/>' for ref in self._merged_ranges))
+            self._write("</mergeCells>")
+        self._write(
+            '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+        )
+        if self.images:
+            self._write('<drawing r:id="rId1"/>')
+        self._write("</worksheet>")
+        self._flush()
+        self._part.close()
+
+    def _write_head(self) -> None:
+        self._started = True
+        selected = ' tabSelected="1"' if self.index == 1 else ""
+        self._write(
+            f'{XML_HEADER}<worksheet xmlns="{SHEET_MAIN_NS}" xmlns:r="{REL_NS}">'
+            f'<sheetViews><sheetView workbookViewId="0"{selected}/></sheetViews>'
+            '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+        )
+        if self._column_widths:
+            self._write("<cols>")
+            for col_index in sorted(self._column_widths):
+                self._write(
+                    f'<col min="{col_index + 1}" max="{col_index + 1}" '
+                    f'width="{self._column_widths[col_index]}" customWidth="1"/>'
+                )
+            self._write("</cols>")
+        self._write("<sheetData>")
+
+    def _cell_xml(self, ref: str, value: Any, style_id: int) -> str:
+        """Same data types as openpyxl Cell infers for value"""
+        if value is None and not style_id:
+            return ""
+        style_attr = f' s="{style_id}"' if style_id else ""
+        if value is None or value == "":
+            return f'<c r="{ref}"{style_attr}/>'
+
+        if isinstance(value, str):
+            # same checks as openpyxl Cell.check_string
+            value = value[:32767]
+            if ILLEGAL_CHARACTERS_RE.search(value):
+                raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+            if len(value) > 1 and value.startswith("="):
+                return f'<c r="{ref}"{style_attr}><f>{escape(value[1:])}</f><v></v></c>'
+            if value in ERROR_CODES:
+                return f'<c r="{ref}"{style_attr} t="e"><v>{value}</v></c>'
+            if self.writer.shared_strings is not None:
+                index = self.writer.shared_strings.add(value)
+                return f'<c r="{ref}"{style_attr} t="s"><v>{index}</v></c>'
+            return f'<c r="{ref}"{style_attr} t="inlineStr"><is>{_text_xml(value)}</is></c>'
+
+        if isinstance(value, bool):
+            return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, NUMERIC_TYPES):
+            return f'<c r="{ref}"{style_attr} t="n"><v>{safe_string(value)}</v></c>'
+        if isinstance(value, TIME_TYPES):
+            return f'<c r="{ref}"{style_attr} t="n"><v>{safe_string(to_excel(value))}</v></c>'
+        raise ValueError(f"Cannot convert {value!r} to Excel")
+
+    def _write(self, xml: str) -> None:
+        self._buffer.append(xml)
+        self._buffer_size += len(xml)
+        if self._buffer_size >= FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._part.write("".join(self._buffer).encode())
+        self._buffer.clear()
+        self._buffer_size = 0
+
+
+def _text_xml(text: str) -> str:
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f"<t{space}>{escape(text)}</t>"
+
+
+class ChunkStream:
+    """
+    Write-only binary stream which keeps written bytes until they are popped,
+    so xlsx archive can be sent by chunks while it is written.
+    Stream is not seekable, so zip archive is written with data descriptors.
+
+    >>> stream = ChunkStream()
+    >>> stream.write(b"PK"), stream.size, stream.pop(), stream.size
+    (2, 2, b'PK', 0)
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+class XlsxWriter:
+    """
+    Writes xlsx package straight to zip archive without openpyxl workbook and cell objects:
+    sheets are written one by one while they are rendered,
+    styles, shared strings and workbook parts are written on close.
+    """
+
+    def __init__(
+        self, output: Union[str, BinaryIO, ChunkStream], shared_strings: bool = True
+    ) -> None:
+        self.styles = StyleTable()
+        self.shared_strings: Optional[IndexedList] = IndexedList() if shared_strings else None
+        # zipfile needs only write and flush of stream
+        self._archive = ZipFile(cast(BinaryIO, output), "w", ZIP_DEFLATED, allowZip64=True)
+        self._sheet_titles: List[str] = []
+        self._sheet: Optional[SheetWriter] = None
+        self._drawing_count = 0
+        self._media_paths: Set[str] = set()
+        # part name => content type
+        self._overrides: Dict[str, str] = {}
+
+    def sheet(self, title: Optional[str] = None) -> SheetWriter:
+        """Start next sheet, previous sheet is closed"""
+        self._close_sheet()
+
+        index = len(self._sheet_titles) + 1
+        self._sheet_titles.append(self._unique_title(title or ("Sheet" if index == 1 else "")))
+        path = f"xl/worksheets/sheet{index}.xml"
+        self._overrides[f"/{path}"] = WORKSHEET_TYPE
+        self._sheet = SheetWriter(self, index, self._archive.open(path, "w", force_zip64=True))
+        return self._sheet
+
+    def close(self) -> None:
+        if not self._sheet_titles:
+            self.sheet()
+        self._close_sheet()
+
+        archive = self._archive
+        archive.writestr(ARC_STYLE, self.styles.to_xml())
+        self._overrides[f"/{ARC_STYLE}"] = STYLES_TYPE
+        archive.writestr(ARC_THEME, theme_xml)
+        self._overrides[f"/{ARC_THEME}"] = THEME_TYPE
+
+        workbook_rels = [
+            (f"worksheets/sheet{index}.xml", f"{REL_NS}/worksheet")
+            for index in range(1, len(self._sheet_titles) + 1)
+        ]
+        workbook_rels += [
+            ("styles.xml", f"{REL_NS}/styles"),
+            ("theme/theme1.xml", f"{REL_NS}/theme"),
+        ]
+        if self.shared_strings:
+            self._write_shared_strings()
+            workbook_rels.append(("sharedStrings.xml", f"{REL_NS}/sharedStrings"))
+
+        sheets = "".join(
+            f'<sheet name={quoteattr(title)} sheetId="{index}" r:id="rId{index}"/>'
+            for index, title in enumerate(self._sheet_titles, 1)
+        )
+        archive.writestr(
+            ARC_WORKBOOK,
+            f'{XML_HEADER}<workbook xmlns="{SHEET_MAIN_NS}" xmlns:r="{REL_NS}">'
+            '<workbookPr/><bookViews><workbookView activeTab="0"/></bookViews>'
+            f'<sheets>{sheets}</sheets><calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>',
+        )
+        self._overrides[f"/{ARC_WORKBOOK}"] = XLSX
+        archive.writestr(ARC_WORKBOOK_RELS, _rels_xml(workbook_rels))
+        archive.writestr(ARC_ROOT_RELS, _rels_xml([(ARC_WORKBOOK, f"{REL_NS}/officeDocument")]))
+
+        self._write_content_types()
+        archive.close()
+
+    def abort(self) -> None:
+        """Close archive of not finished workbook, so no open parts are left if rendering failed"""
+        sheet, self._sheet = self._sheet, None
+        if sheet is not None:
+            sheet._part.close()
+        self._archive.close()
+
+    def _unique_title(self, title: str) -> str:
+        """Same titles as openpyxl gives to new sheets"""
+        title = create_sheet_title(title) or "Sheet"
+        if title not in self._sheet_titles:
+            return title
+        index = 1
+        while f"{title}{index}" in self._sheet_titles:
+            index += 1
+        return f"{title}{index}"
+
+    def _close_sheet(self) -> None:
+        sheet, self._sheet = self._sheet, None
+        if sheet is None:
+            return
+
+        sheet.close()
+        if sheet.images:
+            self._write_drawing(sheet)
+
+    def _write_drawing(self, sheet: SheetWriter) -> None:
+        self._drawing_count += 1
+        drawing = SpreadsheetDrawing()
+        drawing._id = self._drawing_count
+        drawing.images = sheet.images
+
+        self._archive.writestr(drawing.path[1:], tostring(drawing._write()))
+        self._archive.writestr(get_rels_path(drawing.path)[1:], tostring(drawing._write_rels()))
+        self._overrides[drawing.path] = DRAWING_TYPE
+        self._archive.writestr(
+            f"xl/worksheets/_rels/sheet{sheet.index}.xml.rels",
+            _rels_xml([(drawing.path, f"{REL_NS}/drawing")]),
+        )
+
+        for image in sheet.images:
+            if image.path not in self._media_paths:
+                self._archive.writestr(image.path[1:], image._data())
+                self._media_paths.add(image.path)
+
+    def _write_shared_strings(self) -> None:
+        assert self.shared_strings is not None
+        with self._archive.open(ARC_SHARED_STRINGS, "w", force_zip64=True) as part:
+            part.write(
+                f'{XML_HEADER}<sst xmlns="{SHEET_MAIN_NS}" '
+                f'uniqueCount="{len(self.shared_strings)}">'.encode()
+            )
+            strings_iter = iter(self.shared_strings)
+            for strings in iter(lambda: list(islice(strings_iter, 1000)), []):
+                part.write(
+                    "".join(f"<si>{_text_xml(string)}</si>" for string in strings).encode()
+                )
+            part.write(b"</sst>")
+        self._overrides[f"/{ARC_SHARED_STRINGS}"] = SHARED_STRINGS
+
+    def _write_content_types(self) -> None:
+        extensions = {"rels": "application/vnd.openxmlformats-package.relationships+xml"}
+        extensions["xml"] = "application/xml"
+        for path in self._media_paths:
+            extension = path.rsplit(".", 1)[-1]
+            extensions[extension] = mimetypes.types_map.get(f".{extension}", "image/png")
+
+        defaults = "".join(
+            f'<Default Extension="{extension}" ContentType="{content_type}"/>'
+            for extension, content_type in extensions.items()
+        )
+        overrides = "".join(
+            f'<Override PartName="{part_name}" ContentType="{content_type}"/>'
+            for part_name, content_type in self._overrides.items()
+        )
+        self._archive.writestr(
+            ARC_CONTENT_TYPES,
+            f'{XML_HEADER}<Types xmlns="{CONTYPES_NS}">{defaults}{overrides}</Types>',
+        )
+
+
+def _rels_xml(rels: List[Tuple[str, str]]) -> str:
+    relationships = "".join(
+        f'<Relationship Id="rId{index}" Type="{rel_type}" Target="{target}"/>'
+        for index, (target, rel_type) in enumerate(rels, 1)
+    )
+    return f'{XML_HEADER}<Relationships xmlns="{PKG_REL_NS}">{relationships}</Relationships>'
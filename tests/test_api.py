@@ -1,13 +1,77 @@
+import asyncio
+import base64
+import io
+import os
+import subprocess
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, cast
+from zipfile import ZipFile
+
 import pytest
+from jinja2 import Template
+from PIL import Image as PILImage
+from memory_profiler import memory_usage
 from openpyxl import load_workbook
 from openpyxl.styles import Alignment, Border, Side, Font
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 
-from jinja2xlsx.api import render
+from jinja2xlsx.aio import render_async
+from jinja2xlsx.api import (
+    render,
+    render_stream,
+    render_to,
+    render_iter,
+    render_template,
+    compile_table,
+    build_model,
+    render_model,
+)
+from jinja2xlsx.batch import render_batch
 from jinja2xlsx.config import Config
-from jinja2xlsx.style import Style
-from jinja2xlsx.testing_utils import read_from_test_dir, get_wb_values, get_test_file_path
+from jinja2xlsx.css import StyleSheet, parse_declarations, parse_stylesheet
+from jinja2xlsx.image_cache import DiskImageCache
+from jinja2xlsx.layout import TableLayout
+from jinja2xlsx.model import TableModel
+from jinja2xlsx.observe import RenderObserver, StageStats, StatsCollector
+from jinja2xlsx.parse import IncrementalParser, Parser, TokenParser
+from jinja2xlsx.render import Renderer
+from jinja2xlsx.stream import StreamRenderer
+from jinja2xlsx.style import STYLE_CACHE, Style, Stylist, StyleCache, StyleCacheInfo
+from jinja2xlsx.testing_utils import (
+    read_from_test_dir,
+    get_wb_values,
+    assert_same_wb,
+    get_test_file_path,
+    generate_table_html,
+    serve_test_dir,
+    reload_wb,
+)
+from jinja2xlsx.tokenizer import HtmlElement
 from jinja2xlsx.utils import width_pixels_to_xlsx_units, height_pixels_to_xlsx_units
 
+# test_data files which do not require network
+OFFLINE_TEST_FILES = [
+    "table.html",
+    "table_with_colgroup.html",
+    "table_with_complex_style.html",
+    "table_with_image.html",
+    "table_with_inline_styles.html",
+    "table_with_merged_cells.html",
+    "table_with_merged_cells_styled.html",
+    "table_with_multiple_borders.html",
+    "table_with_row_height.html",
+    "table_with_side_borders.html",
+    "table_with_th.html",
+    "table_with_wrap.html",
+]
+
 
 def test_xlsx_table_creation_from_html_table() -> None:
     with read_from_test_dir("table.html") as f:
@@ -161,6 +225,94 @@ def test_xlsx_creation_from_table_with_relative_image_and_no_base_url() -> None:
         render(html_table, config=Config(parse_img=True, parse_img_url=True))
 
 
+@pytest.mark.parametrize("render_func", [render, render_stream])
+def test_image_urls_are_fetched_once_with_bounded_concurrency(
+    render_func: Callable[..., Any],
+) -> None:
+    with open(get_test_file_path("image.png"), "rb") as f:
+        base64_src = f"data:image/png;base64,{base64.b64encode(f.read()).decode()}"
+
+    with serve_test_dir(delay=0.05) as (base_url, log):
+        # query is ignored by test server, so all urls serve same image
+        rows = "".join(
+            f'<tr><td><img src="{base_url}/image.png?{index % 10}"></td>'
+            f'<td><img src="/image.png?{index % 10}"></td>'
+            f'<td><img src="{base64_src}"></td></tr>'
+            for index in range(50)
+        )
+        config = Config(parse_img=True, base_url=base_url, image_workers=4, parser="tokenizer")
+        wb = render_func(f"<table>{rows}</table>", config=config)
+        # write-only workbook keeps rows in temp file until saved
+        wb.save(io.BytesIO())
+
+    assert log.paths == {f"/image.png?{index}": 1 for index in range(10)}
+    assert 1 < log.max_in_flight <= 4
+    assert len(wb.worksheets[0]._images) == 150
+
+
+def test_cached_images_are_not_downloaded_again(tmp_path: Path) -> None:
+    config = Config(parse_img=True, image_cache_dir=str(tmp_path), parser="tokenizer")
+
+    with serve_test_dir() as (base_url, log):
+        html_table = f'<table><tr><td><img src="{base_url}/image.png"></td></tr></table>'
+        render(html_table, config=config)
+
+    assert log.paths == {"/image.png": 1}
+    # server is stopped, so image can be taken only from cache
+    wb = render(html_table, config=config)
+    assert len(wb.active._images) == 1
+
+
+def test_image_cache_put_ignores_entry_evicted_by_other_process(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = DiskImageCache(str(tmp_path), max_size=25)
+    replace_file = os.replace
+
+    def replace_and_evict(src: str, dst: str) -> None:
+        replace_file(src, dst)
+        os.unlink(dst)
+
+    monkeypatch.setattr(os, "replace", replace_and_evict)
+    cache.put("http://localhost/cat.png", b"cat")
+
+    assert cache.get("http://localhost/cat.png") is None
+
+
+def test_image_cache_evicts_least_recently_used_images(tmp_path: Path) -> None:
+    cache = DiskImageCache(str(tmp_path), max_size=25)
+    cache.put("http://localhost/first.png", b"1" * 10)
+    cache.put("http://localhost/second.png", b"2" * 10)
+    assert cache.get("http://localhost/first.png")
+    cache.put("http://localhost/third.png", b"3" * 10)
+
+    cache.evict()
+
+    assert cache.get("http://localhost/first.png") == b"1" * 10
+    assert cache.get("http://localhost/second.png") is None
+    assert cache.get("http://localhost/third.png") == b"3" * 10
+
+
+def test_images_are_downscaled_and_embedded_once() -> None:
+    image_stream = io.BytesIO()
+    PILImage.new("RGB", (200, 100), "red").save(image_stream, format="png")
+    src = f"data:image/png;base64,{base64.b64encode(image_stream.getvalue()).decode()}"
+    html_table = "<table>{}</table>".format(
+        f'<tr><td><img src="{src}" width="40"></td></tr>' * 100
+    )
+
+    wb = render(html_table, config=Config(parse_img=True, image_resize=True, parser="tokenizer"))
+    output = io.BytesIO()
+    wb.save(output)
+
+    with ZipFile(output) as archive:
+        media = [name for name in archive.namelist() if name.startswith("xl/media/")]
+        assert len(media) == 1
+        with PILImage.open(io.BytesIO(archive.read(media[0]))) as image:
+            assert image.size == (40, 20)
+    assert len(load_workbook(output).active._images) == 100
+
+
 def test_xlsx_creation_from_table_with_th() -> None:
     with read_from_test_dir("table_with_th.html") as f:
         html_table = f.read()
@@ -168,3 +320,933 @@ def test_xlsx_creation_from_table_with_th() -> None:
 
     assert wb.active.cell(row=1, column=1).font.bold
     assert wb.active.cell(row=1, column=1).value == "Номер заказа"
+
+
+@pytest.mark.parametrize("file_", OFFLINE_TEST_FILES)
+def test_stream_render_is_same_as_render(file_: str) -> None:
+    with read_from_test_dir(file_) as f:
+        html_table = f.read()
+
+    config = Config(parse_img=True)
+    stream = io.BytesIO()
+    render_stream(html_table, stream, config=config)
+
+    assert_same_wb(load_workbook(stream), render(html_table, config=config))
+
+
+def test_stream_render_memory_usage_has_ceiling(tmp_path: Path) -> None:
+    parser = Parser(generate_table_html(5_000))
+    # html parsing is out of scope
+    assert parser.rows
+    renderer = StreamRenderer(parser, Stylist(), Config())
+
+    def render_to_file() -> None:
+        renderer().save(str(tmp_path / "table.xlsx"))
+
+    baseline = memory_usage(-1, max_usage=True)
+    peak = memory_usage((render_to_file,), max_usage=True)
+
+    # Renderer takes ~ 55 MB for the same table
+    assert peak - baseline < 30
+
+
+@pytest.mark.parametrize("file_", OFFLINE_TEST_FILES)
+def test_tokenizer_parser_render_is_same_as_requests_html_parser_render(file_: str) -> None:
+    with read_from_test_dir(file_) as f:
+        html_table = f.read()
+
+    actual_wb = render(html_table, config=Config(parse_img=True, parser="tokenizer"))
+    expected_wb = render(html_table, config=Config(parse_img=True))
+
+    assert_same_wb(actual_wb, expected_wb)
+
+
+def test_tokenizer_parser_rows_and_cells_are_in_same_order_as_requests_html_parser() -> None:
+    html_table = """<table>
+        <thead><tr><td>Name</td><th>Price</th></tr></thead>
+        <tbody><tr><td>Tea</td><th>10</th></tr></tbody>
+        <tbody><tr><td>Coffee</td><td>20</td></tr></tbody>
+        <tfoot><tr><td>Total</td><td>30</td></tr></tfoot>
+    </table>"""
+
+    actual_wb = render(html_table, config=Config(parser="tokenizer"))
+    expected_wb = render(html_table)
+
+    assert_same_wb(actual_wb, expected_wb)
+    assert get_wb_values(actual_wb) == [("Price", "Name"), (10, "Tea"), ("Coffee", 20)]
+
+
+def test_tokenizer_parser_keeps_cell_text_and_images() -> None:
+    parser = TokenParser("""<table>
+            <tr><td>Total<br>sum</td><td><div>10</div><div>&amp; 20</div></td></tr>
+            <tr><td><script>alert(1)</script><img src="cat.png"></td></tr>
+        </table>""")
+
+    first_row, second_row = parser.rows
+    assert [cell.text for cell in parser.cells(first_row)] == ["Total\nsum", "10\n& 20"]
+    image = parser.image(parser.cells(second_row)[0])
+    assert image and image.attrs["src"] == "cat.png"
+
+
+def test_package_import_time_is_within_budget() -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import jinja2xlsx"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    package_import_time_us = next(
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.split("|")[-1].strip() == "jinja2xlsx"
+    )
+
+    assert package_import_time_us < 50_000
+
+
+def test_api_import_does_not_import_html_and_http_libs() -> None:
+    modules = ["requests_html", "requests", "pyquery", "bs4", "pyppeteer"]
+    code = f"import sys, jinja2xlsx.api; print([m for m in {modules} if m in sys.modules])"
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_identical_cell_styles_are_compiled_once() -> None:
+    parser = TokenParser(generate_table_html(100))
+    stylist = Stylist(cache=StyleCache())
+
+    styles = [
+        stylist.build_style_from_html(cell) for row in parser.rows for cell in parser.cells(row)
+    ]
+
+    assert stylist.cache_info() == StyleCacheInfo(hits=499, misses=1, maxsize=1024, currsize=1)
+    assert all(style is styles[0] for style in styles)
+
+
+def test_style_tables_lookups_do_not_depend_on_cells_count(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    lookups: Counter = Counter()
+    add = IndexedList.add
+
+    def counting_add(self: IndexedList, value: Any) -> int:
+        lookups[type(value).__name__] += 1
+        return add(self, value)
+
+    monkeypatch.setattr(IndexedList, "add", counting_add)
+
+    render(generate_table_html(10), config=Config(parser="tokenizer"))
+    small_table_lookups = lookups.copy()
+    lookups.clear()
+    wb = render(generate_table_html(100), config=Config(parser="tokenizer"))
+
+    assert lookups == small_table_lookups
+    assert wb.active.cell(100, 5).border.left == Side("thin")
+
+
+def test_table_layout_places_cells_around_rowspans() -> None:
+    with read_from_test_dir("table_with_merged_cells.html") as f:
+        layout = TableLayout(TokenParser(f.read()))
+
+    placements = [
+        [(cell.row_index, cell.col_index) for cell in row_layout.cells] for row_layout in layout
+    ]
+
+    assert placements == [
+        [(0, 0), (0, 1), (0, 2), (0, 3)],
+        [(1, 0), (1, 2), (1, 3)],
+        [(2, 2)],
+        [(3, 0), (3, 2)],
+        [(4, 2)],
+    ]
+
+
+MULTIPLE_TABLES_HTML = """
+<table data-sheet-name="Sales: 2020" class="report">
+    <caption>Ignored caption</caption>
+    <tbody><tr><td>1</td><td>2</td></tr></tbody>
+</table>
+<p>Some text</p>
+<table class="report">
+    <caption>Q1 costs</caption>
+    <tbody><tr><td>3</td><td>5</td></tr></tbody>
+</table>
+<table><tbody><tr><td>4</td></tr></tbody></table>
+"""
+
+
+@pytest.mark.parametrize("parser", ["requests_html", "tokenizer"])
+def test_every_table_is_rendered_to_its_own_sheet(parser: str) -> None:
+    wb = render(MULTIPLE_TABLES_HTML, config=Config(table_selector="table", parser=parser))
+
+    assert wb.sheetnames == ["Sales 2020", "Q1 costs", "Sheet"]
+    assert [list(sheet.values) for sheet in wb.worksheets] == [
+        [(1, 2)],
+        [(3, 5)],
+        [(4,)],
+    ]
+
+
+@pytest.mark.parametrize("parser", ["requests_html", "tokenizer"])
+def test_tables_are_selected_by_selector(parser: str) -> None:
+    wb = render_stream(
+        MULTIPLE_TABLES_HTML, config=Config(table_selector="table.report", parser=parser)
+    )
+
+    wb = reload_wb(wb)
+    assert wb.sheetnames == ["Sales 2020", "Q1 costs"]
+
+
+ROWS_TEMPLATE_STR = """<table>
+    <colgroup><col width="100"></colgroup>
+    <tbody>
+    {% for row in rows %}
+        <tr><td style="border: 1px solid black">{{ row }}</td><td>{{ text }}</td></tr>
+    {% endfor %}
+    </tbody>
+</table>"""
+ROWS_TEMPLATE = Template(ROWS_TEMPLATE_STR)
+
+
+@pytest.mark.parametrize("file_", OFFLINE_TEST_FILES)
+def test_template_render_is_same_as_render(file_: str) -> None:
+    with read_from_test_dir(file_) as f:
+        html_table = f.read()
+
+    actual_wb = render_template(Template(html_table), config=Config(parse_img=True))
+    expected_wb = render(html_table, config=Config(parse_img=True))
+
+    assert_same_wb(actual_wb, expected_wb)
+
+
+def test_template_rows_are_written_while_template_is_rendered(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    events = []
+
+    def generate_rows() -> Iterator[int]:
+        for index in range(100):
+            events.append("row generated")
+            yield index
+
+    append = WriteOnlyWorksheet.append
+
+    def spy_append(self: WriteOnlyWorksheet, row: Any) -> None:
+        events.append("row written")
+        append(self, row)
+
+    monkeypatch.setattr(WriteOnlyWorksheet, "append", spy_append)
+
+    wb = render_template(ROWS_TEMPLATE, {"rows": generate_rows(), "text": "text"})
+
+    assert events.index("row written") < len(events) - 1 - events[::-1].index("row generated")
+    assert list(reload_wb(wb).active.values)[-1] == (99, "text")
+
+
+def test_template_render_does_not_keep_html_in_memory(tmp_path: Path) -> None:
+    context = {"rows": range(1000), "text": "text " * 2000}
+    html_size = len(ROWS_TEMPLATE.render(context))
+
+    tracemalloc.start()
+    try:
+        render_template(ROWS_TEMPLATE, context, str(tmp_path / "table.xlsx"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < html_size / 2
+
+
+COMPILED_TABLE_HTML = """<table>
+    <colgroup><col width="100"><col width="50"><col></colgroup>
+    <thead>
+        <tr><th colspan="3" style="border: 1px solid black; text-align: center">Report</th></tr>
+        <tr><th rowspan="2" style="border: 1px solid black">Name</th><th colspan="2">Price</th></tr>
+        <tr><th>Old</th><th>New</th></tr>
+    </thead>
+    <tbody>
+        {}
+    </tbody>
+</table>"""
+COMPILED_ROW_HTML = (
+    '<tr style="height: 20px"><td style="border: 1px solid black">{}</td><td>{}</td>'
+    '<td style="border: 1px solid black; font-weight: bold">{}</td></tr>'
+)
+
+
+def test_compiled_table_render_is_same_as_render() -> None:
+    rows = [("Tea", 10, 12), ("Coffee", 20, 25.5)]
+    compiled_table = compile_table(
+        COMPILED_TABLE_HTML.format(COMPILED_ROW_HTML.format("", "", "")),
+        config=Config(parser="tokenizer"),
+    )
+    cache_info = compiled_table.stylist.cache_info()
+
+    actual_wbs = [compiled_table.render(rows) for _ in range(2)]
+    # styles are compiled once
+    assert compiled_table.stylist.cache_info() == cache_info
+
+    expected_wb = render(
+        COMPILED_TABLE_HTML.format("".join(COMPILED_ROW_HTML.format(*row) for row in rows))
+    )
+
+    for actual_wb in actual_wbs:
+        assert_same_wb(actual_wb, expected_wb)
+
+
+def test_compiled_table_data_row_can_not_have_rowspan() -> None:
+    with pytest.raises(ValueError):
+        compile_table(
+            COMPILED_TABLE_HTML.format('<tr><td rowspan="2"></td></tr>'),
+            config=Config(parser="tokenizer"),
+        )
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch_renders_jobs_to_files_and_reports_failures(tmp_path: Path, workers: int) -> None:
+    jobs = [
+        ("<table><tr><td>1</td></tr></table>", str(tmp_path / "first.xlsx")),
+        ("<p>no table</p>", str(tmp_path / "failed.xlsx")),
+        ("<table><tr><td>3</td></tr></table>", str(tmp_path / "third.xlsx")),
+    ]
+
+    results = sorted(
+        render_batch(jobs, config=Config(parser="tokenizer"), workers=workers),
+        key=lambda result: result.job_index,
+    )
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert "AssertionError" in (results[1].error or "")
+    assert all(result.seconds > 0 for result in results)
+    assert get_wb_values(load_workbook(tmp_path / "third.xlsx")) == [(3,)]
+
+
+def test_batch_renders_template_contexts(tmp_path: Path) -> None:
+    jobs = [
+        ({"rows": range(index), "text": f"customer {index}"}, str(tmp_path / f"{index}.xlsx"))
+        for index in range(1, 5)
+    ]
+
+    results = list(render_batch(jobs, template_str=ROWS_TEMPLATE_STR, workers=2))
+
+    assert all(result.ok for result in results)
+    assert list(load_workbook(tmp_path / "4.xlsx").active.values)[-1] == (3, "customer 4")
+
+
+def test_batch_reports_job_which_can_not_be_sent_to_worker(tmp_path: Path) -> None:
+    jobs: List[Tuple[Dict[str, Any], str]] = [
+        ({"rows": range(index), "text": f"customer {index}"}, str(tmp_path / f"{index}.xlsx"))
+        for index in range(1, 5)
+    ]
+    # lambdas are not picklable
+    jobs[1][0]["callback"] = lambda: 1
+
+    results = sorted(
+        render_batch(jobs, template_str=ROWS_TEMPLATE_STR, workers=2),
+        key=lambda result: result.job_index,
+    )
+
+    assert [result.job_index for result in results] == [0, 1, 2, 3]
+    assert [result.ok for result in results] == [True, False, True, True]
+    assert results[1].output == jobs[1][1]
+    assert "pickle" in (results[1].error or "").lower()
+    assert list(load_workbook(tmp_path / "4.xlsx").active.values)[-1] == (3, "customer 4")
+
+
+@pytest.mark.parametrize("file_", OFFLINE_TEST_FILES)
+def test_parallel_stream_render_is_same_as_render(
+    file_: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with read_from_test_dir(file_) as f:
+        html_table = f.read()
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+
+    # single row chunks, so chunks are split around every rowspan
+    config = Config(
+        parse_img=True,
+        parser="tokenizer",
+        render_workers=2,
+        render_chunk_rows=1,
+        render_workers_min_rows=0,
+    )
+    actual_wb = render_stream(html_table, config=config)
+
+    assert_same_wb(actual_wb, render(html_table, config=Config(parse_img=True)))
+
+
+def test_parallel_stream_render_requires_tokenizer() -> None:
+    with pytest.raises(ValueError):
+        render_stream(generate_table_html(10), config=Config(render_workers=2))
+
+
+@pytest.mark.parametrize("cpu_count, min_rows", [(2, 100), (1, 0)])
+def test_stream_render_falls_back_to_current_process(
+    cpu_count: int, min_rows: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def fail_render_chunks(*args: Any) -> None:
+        raise AssertionError("worker processes should not be started")
+
+    monkeypatch.setattr(os, "cpu_count", lambda: cpu_count)
+    monkeypatch.setattr("jinja2xlsx.parallel.render_chunks", fail_render_chunks)
+    html_table = generate_table_html(10)
+    config = Config(parser="tokenizer", render_workers=2, render_workers_min_rows=min_rows)
+
+    assert_same_wb(render_stream(html_table, config=config), render(html_table))
+
+
+def test_render_does_not_keep_list_of_cells() -> None:
+    parser = TokenParser(generate_table_html(2000))
+    assert parser.rows
+    # warm up style cache and lazy imports
+    Renderer(TokenParser(generate_table_html(10)), Stylist(), Config())()
+
+    tracemalloc.start()
+    try:
+        Renderer(parser, Stylist(), Config())()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # only workbook is allocated, no intermediate cell tuples
+    assert peak - retained < retained / 20
+
+
+def test_render_releases_rows_after_they_are_written() -> None:
+    template = Template(
+        '<table><tbody>{% for row in rows %}<tr data-note="{{ note }}"><td>{{ row }}</td></tr>'
+        "{% endfor %}</tbody></table>"
+    )
+    context = {"rows": range(1000), "note": "note " * 2000}
+    html_size = len(template.render(context))
+
+    tracemalloc.start()
+    try:
+        wb = Renderer(IncrementalParser(template.generate(context)), Stylist(), Config())()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < html_size / 10
+    assert wb.active.max_row == 1000
+
+
+TYPED_TABLE_HTML = """<table><tbody>
+    <tr><th>Count</th><th>Price</th><th>Discount</th><th>Date</th><th>Phone</th></tr>
+    <tr><td>1</td><td>1 000,50 ₽</td><td>5%</td><td>01.01.2020</td><td>+7 (999) 999-99-99</td></tr>
+    <tr><td>-2</td><td>50 ₽</td><td>12,5%</td><td>02.01.2020 15:30</td><td>9999999</td></tr>
+</tbody></table>"""
+
+
+@pytest.mark.parametrize(
+    "render_typed",
+    [
+        lambda config: render(TYPED_TABLE_HTML, config=config),
+        lambda config: render_stream(TYPED_TABLE_HTML, config=config),
+        lambda config: render_stream(
+            TYPED_TABLE_HTML,
+            config=replace(
+                config, parser="tokenizer", render_workers=1, render_workers_min_rows=0
+            ),
+        ),
+        lambda config: render_to_wb(TYPED_TABLE_HTML, config),
+    ],
+)
+def test_cell_types_are_inferred_with_number_formats(
+    render_typed: Callable, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    wb = reload_wb(render_typed(Config(infer_types=True, decimal_separator=",")))
+
+    rows = [[(cell.value, cell.number_format) for cell in row] for row in wb.active.iter_rows()]
+    assert rows[0][0] == ("Count", "General")
+    assert rows[1] == [
+        (1, "General"),
+        (1000.5, '#,##0.00" ₽"'),
+        (0.05, "0%"),
+        (datetime(2020, 1, 1), "dd.mm.yyyy"),
+        ("+7 (999) 999-99-99", "General"),
+    ]
+    assert rows[2] == [
+        (-2, "General"),
+        (50, '0" ₽"'),
+        (0.125, "0.0%"),
+        (datetime(2020, 1, 2, 15, 30), "dd.mm.yyyy hh:mm"),
+        (9999999, "General"),
+    ]
+
+
+def test_cell_types_are_not_inferred_by_default() -> None:
+    wb = render(TYPED_TABLE_HTML)
+
+    assert [cell.value for cell in wb.active[2]][:3] == [1, "1 000,50 ₽", "5%"]
+
+
+def test_numbers_without_integer_or_fraction_are_inferred_as_without_inference() -> None:
+    html_str = "<table><tbody><tr><td>.5</td><td>5.</td><td>.</td></tr></tbody></table>"
+
+    wb = render(html_str, config=Config(infer_types=True))
+
+    assert get_wb_values(wb) == get_wb_values(render(html_str)) == [(0.5, 5.0, ".")]
+
+
+def generate_status_table_html(rows: int) -> str:
+    statuses = ["Paid", "Cancelled", "Waiting for payment"]
+    body = "".join(
+        f"<tr><td>{row}</td><td>{statuses[row % len(statuses)]}</td></tr>" for row in range(rows)
+    )
+    return f"<table><tbody>{body}</tbody></table>"
+
+
+@pytest.mark.parametrize(
+    "render_to_stream",
+    [
+        lambda html_str, output, config: render(html_str, config=config).save(output),
+        render_stream,
+        render_to,
+    ],
+)
+def test_repeated_strings_are_written_to_shared_string_table(render_to_stream: Callable) -> None:
+    html_str = generate_status_table_html(3000)
+    shared_stream, inline_stream = io.BytesIO(), io.BytesIO()
+    render_to_stream(html_str, shared_stream, config=Config(parser="tokenizer"))
+    render_to_stream(html_str, inline_stream, config=Config(shared_strings=False))
+
+    with ZipFile(shared_stream) as archive:
+        shared_strings_xml = archive.read("xl/sharedStrings.xml").decode()
+        assert 'uniqueCount="3"' in shared_strings_xml
+        assert "sharedStrings" in archive.read("[Content_Types].xml").decode()
+    assert len(shared_stream.getvalue()) < len(inline_stream.getvalue())
+    assert get_wb_values(load_workbook(shared_stream)) == get_wb_values(
+        load_workbook(inline_stream)
+    )
+
+
+def test_repeated_strings_share_one_object() -> None:
+    sheet = render(generate_status_table_html(6)).active
+
+    assert sheet["B1"].value == sheet["B4"].value == "Paid"
+    assert sheet["B1"].value is sheet["B4"].value
+
+
+def render_to_wb(html_str: str, config: Config) -> Any:
+    stream = io.BytesIO()
+    render_to(html_str, stream, config=config)
+    return load_workbook(stream)
+
+
+@pytest.mark.parametrize("shared_strings", [True, False])
+@pytest.mark.parametrize("file_", OFFLINE_TEST_FILES)
+def test_render_to_is_same_as_render(file_: str, shared_strings: bool) -> None:
+    with read_from_test_dir(file_) as f:
+        html_table = f.read()
+
+    actual_wb = render_to_wb(html_table, Config(parse_img=True, shared_strings=shared_strings))
+
+    assert_same_wb(actual_wb, render(html_table, config=Config(parse_img=True)))
+
+
+@pytest.mark.parametrize("parser", ["requests_html", "tokenizer"])
+def test_render_to_writes_every_table_to_its_own_sheet(parser: str) -> None:
+    config = Config(table_selector="table", parser=parser)
+    wb = render_to_wb(MULTIPLE_TABLES_HTML, config)
+
+    expected_wb = render(MULTIPLE_TABLES_HTML, config=config)
+    assert wb.sheetnames == expected_wb.sheetnames
+    assert [list(sheet.values) for sheet in wb.worksheets] == [
+        list(sheet.values) for sheet in expected_wb.worksheets
+    ]
+
+
+class WriteOnlyStream(io.RawIOBase):
+    """Binary stream without seek and tell, like http response or pipe"""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self.data += data
+        return len(data)
+
+
+def test_render_to_writes_to_not_seekable_stream() -> None:
+    stream = WriteOnlyStream()
+    render_to(generate_table_html(100), cast(BinaryIO, stream))
+
+    expected_wb = render(generate_table_html(100))
+    assert_same_wb(load_workbook(io.BytesIO(stream.data)), expected_wb)
+
+
+def test_render_iter_yields_chunks_while_rows_are_rendered() -> None:
+    html_str = generate_table_html(5000)
+    chunks = render_iter(html_str, config=Config(parser="tokenizer"), chunk_size=1024)
+
+    first_chunk = next(chunks)
+    assert first_chunk.startswith(b"PK")
+    assert len(first_chunk) >= 1024
+    xlsx_bytes = first_chunk + b"".join(chunks)
+
+    assert get_wb_values(load_workbook(io.BytesIO(xlsx_bytes))) == get_wb_values(render(html_str))
+
+
+def test_async_render_downloads_images_without_blocking_event_loop() -> None:
+    async def render_with_ticks(base_url: str) -> Any:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        wb = await render_async(html_str, config=config)
+        ticker.cancel()
+        return wb, ticks
+
+    with serve_test_dir(delay=0.3) as (base_url, log):
+        html_str = "".join(
+            f'<table><tbody><tr><td><img src="/image.png?{index}"></td><td>{index}</td></tr>'
+            "</tbody></table>"
+            for index in range(2)
+        )
+        config = Config(parse_img=True, base_url=base_url, table_selector="table")
+        wb, ticks = asyncio.run(render_with_ticks(base_url))
+
+    assert log.paths == {"/image.png?0": 1, "/image.png?1": 1}
+    # images are downloaded concurrently, while event loop keeps running other tasks
+    assert ticks >= 20
+    assert [len(sheet._images) for sheet in wb.worksheets] == [1, 1]
+    expected_wb = render(html_str, config=replace(config, parse_img=False))
+    assert [list(sheet.values) for sheet in wb.worksheets] == [
+        list(sheet.values) for sheet in expected_wb.worksheets
+    ]
+
+
+def test_async_image_cache_is_read_and_written_outside_event_loop(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache_threads = []
+    for method_name in ["get", "put", "evict"]:
+        method = getattr(DiskImageCache, method_name)
+
+        def record_thread(*args: Any, _method: Callable = method) -> Any:
+            cache_threads.append(threading.current_thread())
+            return _method(*args)
+
+        monkeypatch.setattr(DiskImageCache, method_name, record_thread)
+
+    with serve_test_dir() as (base_url, log):
+        html_str = '<table><tbody><tr><td><img src="/image.png"></td></tr></tbody></table>'
+        config = Config(
+            parse_img=True, base_url=base_url, parser="tokenizer", image_cache_dir=str(tmp_path)
+        )
+        wb = asyncio.run(render_async(html_str, config=config))
+
+    assert len(wb.active._images) == 1
+    assert len(cache_threads) == 3
+    assert threading.main_thread() not in cache_threads
+
+
+def test_async_render_is_cancelled_by_timeout(tmp_path: Path) -> None:
+    output = tmp_path / "table.xlsx"
+
+    with serve_test_dir(delay=1) as (base_url, log):
+        html_str = '<table><tr><td><img src="/image.png"></td></tr></table>'
+        config = Config(parse_img=True, base_url=base_url, parser="tokenizer")
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(render_async(html_str, str(output), config=config, timeout=0.2))
+
+    assert not output.exists()
+
+
+def test_render_observer_gets_stage_events_with_stats() -> None:
+    image_size = Path(get_test_file_path("image.png")).stat().st_size
+    collector = StatsCollector()
+
+    with serve_test_dir() as (base_url, log):
+        html_str = (
+            f'<table><tr><td><img src="{base_url}/image.png"></td><td>1</td></tr>'
+            f'<tr><td colspan="2">2</td></tr><tr><td>3</td><td>4</td></tr></table>'
+        )
+        config = Config(parse_img=True, parser="tokenizer", table_selector="table")
+        render(html_str, config=config, observer=collector)
+
+    summary = collector.summary()
+    assert list(summary["stages"]) == ["parse", "images", "cells"]
+    assert summary["stages"]["images"]["fetched_urls"] == 1
+    assert summary["stages"]["images"]["fetched_bytes"] == image_size
+    cells_stats = summary["stages"]["cells"]
+    assert (cells_stats["rows"], cells_stats["cells"]) == (3, 5)
+    assert cells_stats["style_cache_hits"] + cells_stats["style_cache_misses"] == 5
+    assert summary["seconds"] == sum(stats["seconds"] for stats in summary["stages"].values())
+
+
+def test_render_observer_gets_images_stage_of_multiple_tables_once() -> None:
+    finished_stages = []
+
+    class StageLog(RenderObserver):
+        def stage_finished(self, stage: str, seconds: float, stats: StageStats) -> None:
+            finished_stages.append(stage)
+
+    with serve_test_dir() as (base_url, log):
+        table_html = f'<table><tr><td><img src="{base_url}/image.png"></td></tr></table>'
+        config = Config(parse_img=True, parser="tokenizer", table_selector="table")
+        wb = render(table_html * 2, config=config, observer=StageLog())
+
+    assert len(wb.worksheets) == 2
+    assert finished_stages == ["parse", "images", "parse", "cells", "parse", "cells"]
+
+
+def test_render_observer_gets_stage_start_before_finish() -> None:
+    events = []
+
+    class EventLog(RenderObserver):
+        def stage_started(self, stage: str) -> None:
+            events.append(f"{stage} started")
+
+        def stage_finished(self, stage: str, seconds: float, stats: StageStats) -> None:
+            events.append(f"{stage} finished")
+
+    render(generate_table_html(3), observer=EventLog())
+
+    assert events == ["parse started", "parse finished", "cells started", "cells finished"]
+
+
+def test_render_observer_parse_stage_includes_stylesheet(monkeypatch: pytest.MonkeyPatch) -> None:
+    events = []
+
+    def logged_parse_stylesheet(css_text: str) -> StyleSheet:
+        events.append("stylesheet parsed")
+        return parse_stylesheet(css_text)
+
+    class EventLog(RenderObserver):
+        def stage_started(self, stage: str) -> None:
+            events.append(f"{stage} started")
+
+        def stage_finished(self, stage: str, seconds: float, stats: StageStats) -> None:
+            events.append(f"{stage} finished")
+
+    monkeypatch.setattr("jinja2xlsx.parse.parse_stylesheet", logged_parse_stylesheet)
+    html_str = "<style>td { color: red }</style>" + generate_table_html(3)
+    for config in [Config(), Config(table_selector="table")]:
+        events.clear()
+        render(html_str, config=config, observer=EventLog())
+        assert events[:3] == ["parse started", "stylesheet parsed", "parse finished"]
+
+
+def test_render_observer_counts_style_cache_lookups_of_own_render() -> None:
+    other_render_stylist = Stylist()
+
+    class ConcurrentRender(StatsCollector):
+        def stage_started(self, stage: str) -> None:
+            # other render looks up shared style cache while cells of this one are rendered
+            if stage == "cells":
+                for _ in range(10):
+                    other_render_stylist.build_style_from_html(cast(Any, HtmlElement("td", {})))
+
+    collector = ConcurrentRender()
+    render(generate_table_html(3), observer=collector)
+
+    cells_stats = collector.summary()["stages"]["cells"]
+    assert cells_stats["style_cache_hits"] + cells_stats["style_cache_misses"] == 15
+
+
+def test_css_shorthands_and_colors_are_rendered_to_cell_styles() -> None:
+    html_str = (
+        '<table><tbody><tr>'
+        '<td style="border: 2px dashed #00f; border-left: thin solid rgb(255, 0, 0); '
+        'font: italic bold 12pt/20px \'Times New Roman\', serif; color: #f00">1</td>'
+        '<td style="background: url(http://example.com/a;b.png); font-family: Arial, sans-serif; '
+        'padding: 1px 2px">2</td>'
+        '</tr></tbody></table>'
+    )
+
+    wb = render(html_str)
+
+    cell = wb.active.cell(1, 1)
+    assert cell.border.left == Side("thin", color="FF0000")
+    assert cell.border.top == cell.border.bottom == Side("mediumDashed", color="0000FF")
+    assert cell.font == Font("Times New Roman", 12, bold=True, italic=True, color="FF0000")
+    assert wb.active.cell(1, 2).font == Font("Arial", bold=False)
+
+
+@pytest.mark.parametrize(
+    "style_attr, color",
+    [
+        ("border: 1px solid lightgray", "00D3D3D3"),
+        ("border: 1px solid transparent", None),
+        ("border: 1px solid currentColor", None),
+        ("border: 1px solid", None),
+        ("border-color: lightgray; border-style: solid; border-width: 1px", "00D3D3D3"),
+        ("border-color: transparent; border-style: solid; border-width: 1px", None),
+    ],
+)
+def test_border_colors_outside_known_ones_fall_back_to_default_color(
+    style_attr: str, color: Optional[str]
+) -> None:
+    wb = render(f'<table><tbody><tr><td style="{style_attr}">1</td></tr></tbody></table>')
+
+    border = wb.active.cell(1, 1).border
+    assert border.left.style == border.bottom.style == "thin"
+    assert (border.left.color.rgb if border.left.color else None) == color
+
+
+@pytest.mark.parametrize(
+    "style_attr, border, font",
+    [
+        ("font: inherit", Border(), Font()),
+        ("font: bold 1.5rem Arial", Border(), Font("Arial", 24, bold=True)),
+        ("border: 1px solid black !important", Border(*[Side("thin")] * 4), Font()),
+        ("border-left-width: 1rem; border-left-style: solid", Border(Side("thick")), Font()),
+        ("border: 1px wavy black; font-weight: bold", Border(), Font(bold=True)),
+        ("border-left-style: wavy; border-left-width: wide", Border(), Font()),
+        ("border: initial; padding: 1px 2px 3px 4px 5px", Border(), Font()),
+    ],
+)
+def test_unsupported_css_values_are_skipped(style_attr: str, border: Border, font: Font) -> None:
+    wb = render(f'<table><tbody><tr><td style="{style_attr}">1</td></tr></tbody></table>')
+
+    cell = wb.active.cell(1, 1)
+    assert cell.value == 1
+    assert cell.border == border
+    assert cell.font == font
+
+
+def test_identical_style_attrs_are_parsed_once() -> None:
+    STYLE_CACHE.clear()
+    parse_declarations.cache_clear()
+    html_str = (
+        '<table><tbody><tr style="height: 20px">'
+        '<td style="border: 1px solid black">1</td><th style="border: 1px solid black">2</th>'
+        '</tr></tbody></table>'
+    )
+
+    render(html_str, config=Config(parser="tokenizer"))
+
+    # cell style attr is parsed once for td and th, both compiled styles are built from it
+    assert parse_declarations.cache_info().misses == 2
+
+
+STYLESHEET_HTML = """<html><head><style>
+    td, th { border: 1px solid black }
+    .total { font-weight: bold }
+    td:nth-child(2) { text-align: right }
+    @media print { td { text-align: center } }
+</style></head><body><table><tbody>
+    <tr><th>Name</th><th>Price</th></tr>
+    <tr><td colspan="2">Tea</td></tr>
+    <tr><td>Coffee</td><td>20</td></tr>
+    <tr><td class="total">Total</td><td class="total" style="text-align: left">10</td></tr>
+</tbody></table></body></html>"""
+
+
+@pytest.mark.parametrize("parser", ["requests_html", "tokenizer"])
+def test_stylesheet_rules_are_applied_before_inline_styles(parser: str) -> None:
+    wb = render(STYLESHEET_HTML, config=Config(parser=parser))
+
+    sheet = wb.active
+    assert sheet.cell(1, 1).border.left == Side("thin")
+    assert sheet.cell(1, 2).alignment.horizontal is None
+    assert sheet.cell(2, 1).alignment.horizontal is None
+    assert sheet.cell(3, 2).alignment.horizontal == "right"
+    assert sheet.cell(4, 1).font.bold and sheet.cell(4, 2).font.bold
+    # inline style overrides rule
+    assert sheet.cell(4, 2).alignment.horizontal == "left"
+
+
+def test_stylesheet_rules_are_applied_by_every_renderer(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    config = Config(parser="tokenizer")
+    expected_wb = render(STYLESHEET_HTML, config=config)
+
+    assert_same_wb(render_stream(STYLESHEET_HTML, config=config), expected_wb)
+    assert_same_wb(render_template(Template(STYLESHEET_HTML)), expected_wb)
+    assert_same_wb(render_to_wb(STYLESHEET_HTML, config), expected_wb)
+    parallel_config = replace(
+        config, render_workers=2, render_chunk_rows=1, render_workers_min_rows=0
+    )
+    assert_same_wb(render_stream(STYLESHEET_HTML, config=parallel_config), expected_wb)
+
+
+def test_stylesheet_rules_are_matched_once_per_distinct_cell_key() -> None:
+    stylesheet = parse_stylesheet("td { color: red } td:nth-child(even) { color: blue }")
+    parser = TokenParser(generate_table_html(100))
+    stylist = Stylist(cache=StyleCache(), stylesheet=stylesheet)
+
+    for row_layout in TableLayout(parser):
+        for placed_cell in row_layout.cells:
+            stylist.build_style_from_html(placed_cell.html_cell, placed_cell.col_index)
+
+    # index is keyed by (tag, classes, column), not by cell, odd and even columns share style
+    assert len(stylesheet._index) == 5
+    assert stylist.cache_info().misses == 2
+
+
+@pytest.mark.parametrize("file_", OFFLINE_TEST_FILES)
+def test_model_render_is_same_as_render(file_: str) -> None:
+    with read_from_test_dir(file_) as f:
+        html_table = f.read()
+    stream = io.BytesIO()
+
+    render_model(build_model(html_table, config=Config(parse_img=True)), stream)
+
+    assert_same_wb(load_workbook(stream), render(html_table, config=Config(parse_img=True)))
+
+
+def test_model_cells_are_same_as_rendered_with_inferred_types() -> None:
+    config = Config(infer_types=True, decimal_separator=",", parser="tokenizer")
+    model_stream, stream = io.BytesIO(), io.BytesIO()
+
+    render_model(build_model(TYPED_TABLE_HTML, config=config), model_stream)
+    render_to(TYPED_TABLE_HTML, stream, config=config)
+
+    assert_same_wb(load_workbook(model_stream), load_workbook(stream))
+
+
+def test_model_is_built_from_rows_and_dicts() -> None:
+    stream = io.BytesIO()
+    rows = [("Tea", 10, datetime(2020, 1, 31, 12)), ("Coffee", 20.5, None)]
+    records = [{"name": "Tea", "price": 10}, {"name": "Coffee", "price": 20.5, "note": "new"}]
+
+    render_model(
+        [
+            TableModel.from_rows(iter(rows), header=["Name", "Price", "Date"], title="Rows"),
+            TableModel.from_dicts(records, title="Dicts"),
+        ],
+        stream,
+    )
+
+    wb = load_workbook(stream)
+    assert wb.sheetnames == ["Rows", "Dicts"]
+    assert list(wb["Rows"].values) == [("Name", "Price", "Date"), *rows]
+    assert wb["Rows"]["A1"].font.bold and not wb["Rows"]["A2"].font.bold
+    assert wb["Rows"]["C2"].number_format == "yyyy-mm-dd h:mm:ss"
+    # columns are taken from first record
+    assert list(wb["Dicts"].values) == [("name", "price"), ("Tea", 10), ("Coffee", 20.5)]
+
+
+def test_model_takes_order_of_magnitude_less_memory_than_html_cells() -> None:
+    html_str = generate_table_html(2000, 10)
+    config = Config(parser="tokenizer")
+
+    def retained_size(build: Callable[[], Any]) -> int:
+        tracemalloc.start()
+        try:
+            result = build()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert result
+        return size
+
+    model_size = retained_size(lambda: build_model(html_str, config=config))
+    layouts_size = retained_size(lambda: list(TableLayout(TokenParser(html_str))))
+
+    assert model_size * 10 < layouts_size